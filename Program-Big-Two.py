@@ -1,13 +1,48 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, font
 import random
-from collections import Counter
+import argparse
+import asyncio
+import gzip
+import json
+import math
+import mmap
+import multiprocessing
+import os
+import queue
+import shlex
+import shutil
+import signal
+import subprocess
+import struct
+import sys
+import threading
+import time
+import weakref
+from array import array
+from collections import Counter, deque, namedtuple
 from functools import partial
+from itertools import combinations, islice
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy hanya wajib untuk training
+    np = None
+
+# Urutan dasar kartu. Index kartu = rank_index * 4 + suit_index (0..51)
+RANK_ORDER = ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', '2']
+SUIT_ORDER = ['♠', '♣', '♦', '♥']
+RANK_VALUES = {v: i + 3 for i, v in enumerate(RANK_ORDER)}
+SUIT_VALUES = {s: i + 1 for i, s in enumerate(SUIT_ORDER)}
+
+FIVE_CARD_TYPES = ['straight', 'flush', 'full_house', 'four_of_a_kind', 'straight_flush']
 
 class Card:
     def __init__(self, suit, value):
         self.suit = suit
         self.value = value
+        self.id = RANK_ORDER.index(value) * 4 + SUIT_ORDER.index(suit)
 
     def __str__(self):
         return f"{self.value}{self.suit}"
@@ -16,14 +51,13 @@ class Card:
         return self.__str__()
 
     def get_numeric_value(self):
-        mapping = {
-            '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10,
-            'J': 11, 'Q': 12, 'K': 13, 'A': 14, '2': 15
-        }
-        return mapping[self.value]
+        return RANK_VALUES[self.value]
 
     def get_suit_value(self):
-        return {'♠': 1, '♣': 2, '♦': 3, '♥': 4}[self.suit]
+        return SUIT_VALUES[self.suit]
+
+# Satu objek Card per index, dipakai saat mengubah bitmask kembali ke kartu
+CARDS = [Card(SUIT_ORDER[i % 4], RANK_ORDER[i // 4]) for i in range(52)]
 
 class SpecialSkill:
     def __init__(self, name, description, effect_type, value=0):
@@ -58,11 +92,93 @@ class Player:
             return True
         return False
 
-    def sort_cards(self):
-        self.cards.sort(key=lambda c: (c.get_numeric_value(), c.get_suit_value()))
+    def sort_cards(self, key=None):
+        self.cards.sort(key=key or (lambda c: (c.get_numeric_value(), c.get_suit_value())))
+
+class RuleConfig:
+    """Rule variant settings, compiled once into lookup tables by compile()"""
+    def __init__(self, num_players=4, cards_per_hand=None, suit_order=('♠', '♣', '♦', '♥'),
+                 flush_beats_straight=False, twos_in_straights=True, skill_interval=4,
+                 disabled_skills=(), sniper_cards=1, chaos_cards=1):
+        if not 2 <= num_players <= 8:
+            raise ValueError("num_players must be between 2 and 8")
+        if cards_per_hand is None:
+            cards_per_hand = min(13, 52 // num_players)
+        if cards_per_hand < 1 or num_players * cards_per_hand > 52:
+            raise ValueError(f"Cannot deal {cards_per_hand} cards to {num_players} players from one deck")
+        if sorted(suit_order) != sorted(SUIT_ORDER):
+            raise ValueError("suit_order must list each suit exactly once")
+
+        self.num_players = num_players
+        self.cards_per_hand = cards_per_hand
+        self.suit_order = tuple(suit_order)
+        # True: kombinasi 5 kartu beda jenis boleh saling mengalahkan
+        # (straight < flush < full house < four of a kind < straight flush)
+        self.flush_beats_straight = flush_beats_straight
+        self.twos_in_straights = twos_in_straights
+        # Variasi skill: tiap berapa ronde skill dibagi, skill yang dimatikan,
+        # jumlah kartu yang dibuang Sniper dan yang dioper Chaos
+        if skill_interval < 1 or sniper_cards < 1 or chaos_cards < 1:
+            raise ValueError("skill_interval, sniper_cards and chaos_cards must be at least 1")
+        self.skill_interval = skill_interval
+        self.disabled_skills = tuple(disabled_skills)
+        self.sniper_cards = sniper_cards
+        self.chaos_cards = chaos_cards
+        self._compiled = None
+
+    def to_dict(self):
+        """Constructor arguments, e.g. for saving with a recorded game"""
+        return {'num_players': self.num_players, 'cards_per_hand': self.cards_per_hand,
+                'suit_order': list(self.suit_order), 'flush_beats_straight': self.flush_beats_straight,
+                'twos_in_straights': self.twos_in_straights, 'skill_interval': self.skill_interval,
+                'disabled_skills': list(self.disabled_skills), 'sniper_cards': self.sniper_cards,
+                'chaos_cards': self.chaos_cards}
+
+    def compile(self):
+        if self._compiled is None:
+            self._compiled = CompiledRules(self)
+        return self._compiled
+
+class CompiledRules:
+    """Lookup tables built from a RuleConfig, indexed by Card.id"""
+    def __init__(self, config):
+        self.config = config
+        self.num_players = config.num_players
+        self.cards_per_hand = config.cards_per_hand
+        # Meja dibersihkan setelah semua pemain lain pass
+        self.pass_limit = config.num_players - 1
+
+        suit_rank = {s: i + 1 for i, s in enumerate(config.suit_order)}
+        self.rank_value = [i // 4 + 3 for i in range(52)]
+        self.suit_value = [suit_rank[SUIT_ORDER[i % 4]] for i in range(52)]
+        self.sort_key = [self.rank_value[i] * 8 + self.suit_value[i] for i in range(52)]
+        # Kartu pembuka = kartu terendah (3 dari suit terendah)
+        self.opening_id = SUIT_ORDER.index(config.suit_order[0])
+
+        # Bitmask rank (13 bit) -> nilai kartu tertinggi straight
+        self.straight_top = {}
+        for low in range(9):
+            top = low + 4
+            if top == 12 and not config.twos_in_straights:
+                continue
+            self.straight_top[0b11111 << low] = top + 3
+
+        if config.flush_beats_straight:
+            self.five_card_rank = {t: i for i, t in enumerate(FIVE_CARD_TYPES)}
+        else:
+            self.five_card_rank = {}
+
+    def card_key(self, card):
+        return self.sort_key[card.id]
 
 class GameLogic:
-    def __init__(self):
+    MASK_COMBO_CACHE_SIZE = 1 << 16
+
+    def __init__(self, rules=None):
+        self.rules = rules or RuleConfig()
+        self.compiled = self.rules.compile()
+        self.opening_id = self.compiled.opening_id
+        self._mask_combo_cache = {}
         self.suits = ['♠', '♣', '♦', '♥']
         self.values = ['3','4','5','6','7','8','9','10','J','Q','K','A','2']
         self.special_skills = [
@@ -75,102 +191,3996 @@ class GameLogic:
             SpecialSkill("💎 Draw Lucky", "Draw the lowest card from deck", "draw_lucky"),
             SpecialSkill("🃏 Wild Play", "Play any card regardless of rules", "wild_play"),
         ]
+        known = {s.effect_type for s in self.special_skills}
+        unknown = set(self.rules.disabled_skills) - known
+        if unknown:
+            raise ValueError(f"Unknown skills: {', '.join(sorted(unknown))}")
+        self.special_skills = [s for s in self.special_skills if s.effect_type not in self.rules.disabled_skills]
 
-    def create_deck(self):
+    def create_deck(self, rng=random):
         deck = [Card(s, v) for s in self.suits for v in self.values]
-        random.shuffle(deck)
+        rng.shuffle(deck)
         return deck
 
     def get_combo_type(self, cards):
         if not cards:
             return None, 0
-            
-        vals = [c.get_numeric_value() for c in cards]
-        suits = [c.suit for c in cards]
+
+        rank_value = self.compiled.rank_value
         n = len(cards)
-        
+
         if n == 1:
-            return 'single', vals[0]
-        if n == 2 and vals[0] == vals[1]:
-            return 'pair', vals[0]
-        if n == 3 and len(set(vals)) == 1:
-            return 'triple', vals[0]
+            return 'single', rank_value[cards[0].id]
+        if n == 2 and cards[0].id >> 2 == cards[1].id >> 2:
+            return 'pair', rank_value[cards[0].id]
+        if n == 3 and cards[0].id >> 2 == cards[1].id >> 2 == cards[2].id >> 2:
+            return 'triple', rank_value[cards[0].id]
         if n == 5:
-            is_flush = len(set(suits)) == 1
-            sorted_vals = sorted(vals)
-            is_straight = all(sorted_vals[i] + 1 == sorted_vals[i+1] for i in range(4))
-            counts = sorted(Counter(vals).values())
-            
-            if is_straight and is_flush:
-                return 'straight_flush', max(vals)
-            if counts == [1, 4]:
-                return 'four_of_a_kind', max(vals, key=vals.count)
-            if counts == [2, 3]:
-                return 'full_house', max(vals, key=vals.count)
-            if is_flush:
-                return 'flush', max(vals)
-            if is_straight:
-                return 'straight', max(vals)
+            rank_mask = 0
+            suit_mask = 0
+            for c in cards:
+                rank_mask |= 1 << (c.id >> 2)
+                suit_mask |= 1 << (c.id & 3)
+            distinct = bin(rank_mask).count('1')
+
+            if distinct == 5:
+                top = rank_mask.bit_length() + 2
+                is_flush = suit_mask & (suit_mask - 1) == 0
+                straight_top = self.compiled.straight_top.get(rank_mask)
+                if straight_top and is_flush:
+                    return 'straight_flush', straight_top
+                if is_flush:
+                    return 'flush', top
+                if straight_top:
+                    return 'straight', straight_top
+            elif distinct == 2:
+                first = cards[0].id >> 2
+                count = sum(1 for c in cards if c.id >> 2 == first)
+                other = (rank_mask & ~(1 << first)).bit_length() + 2
+                if count in (1, 4):
+                    return 'four_of_a_kind', first + 3 if count == 4 else other
+                return 'full_house', first + 3 if count == 3 else other
         return None, 0
 
     def is_valid_play(self, cards, last_cards, last_type, last_val, is_first_round, wild_play=False):
         if not cards:
             return False
-            
+
         combo, value = self.get_combo_type(cards)
         if not combo:
             return False
-            
+
         # Wild play skill bypasses all rules except first round 3♠
         if wild_play and not is_first_round:
             return True
-            
-        # Rule for 3♠ only applies to the first round of the game
-        if is_first_round and not any(c.value == '3' and c.suit == '♠' for c in cards):
+
+        # Rule for 3♠ (kartu pembuka) only applies to the first round of the game
+        if is_first_round and not any(c.id == self.opening_id for c in cards):
             return False
-            
+
         if not last_cards:
             return True
-            
-        # After three passes, any valid combination is allowed
+
+        # After all other players pass, any valid combination is allowed
         if not last_type:
             return True
-            
+
         # Compare combination type and value
         if combo != last_type:
+            five_rank = self.compiled.five_card_rank
+            if combo in five_rank and last_type in five_rank:
+                return five_rank[combo] > five_rank[last_type]
             return False
-            
+
         return value > last_val
 
-class BigTwoGame:
-    def __init__(self):
+    def find_valid_plays(self, cards, last_cards, last_type, last_val, is_first_round, wild_play=False):
+        """All valid plays from cards: singles, pairs, triples, then 5-card combos"""
+        valid_plays = []
+        if not cards:
+            return valid_plays
+
+        # 1. Singles
+        for card in cards:
+            if self.is_valid_play([card], last_cards, last_type, last_val, is_first_round, wild_play):
+                valid_plays.append([card])
+
+        # 2. Pairs
+        for i in range(len(cards)):
+            for j in range(i + 1, len(cards)):
+                if cards[i].id >> 2 == cards[j].id >> 2:
+                    combo = [cards[i], cards[j]]
+                    if self.is_valid_play(combo, last_cards, last_type, last_val, is_first_round, wild_play):
+                        valid_plays.append(combo)
+
+        # 3. Triples
+        value_counts = Counter(card.value for card in cards)
+        for value, count in value_counts.items():
+            if count >= 3:
+                triple_cards = [card for card in cards if card.value == value][:3]
+                if self.is_valid_play(triple_cards, last_cards, last_type, last_val, is_first_round, wild_play):
+                    valid_plays.append(triple_cards)
+
+        # 4. Five-card combinations (hanya jika bisa mengalahkan meja)
+        can_play_five = (wild_play or not last_cards or not last_type
+                         or last_type in FIVE_CARD_TYPES)
+        if len(cards) >= 5 and can_play_five:
+            for combo in combinations(cards, 5):
+                combo_list = list(combo)
+                if self.is_valid_play(combo_list, last_cards, last_type, last_val, is_first_round, wild_play):
+                    valid_plays.append(combo_list)
+
+        return valid_plays
+
+    def choose_best_play(self, valid_plays):
+        """Greedy AI choice: most cards first, then lowest total value"""
+        if not valid_plays:
+            return None
+
+        # Strategy: Prefer to play more cards to reduce hand size
+        valid_plays = sorted(valid_plays, key=lambda play: len(play), reverse=True)
+
+        # Among plays with same number of cards, prefer lower value cards
+        best_play = valid_plays[0]
+        same_length_plays = [play for play in valid_plays if len(play) == len(best_play)]
+
+        if len(same_length_plays) > 1:
+            # Prefer plays with lower total value
+            same_length_plays.sort(key=lambda play: sum(c.get_numeric_value() for c in play))
+            best_play = same_length_plays[0]
+
+        return best_play
+
+    def card_name(self, card_id):
+        return f"{RANK_ORDER[card_id // 4]}{SUIT_ORDER[card_id % 4]}"
+
+    def mask_cards(self, mask):
+        """Cards of a 52-bit mask, in hand order"""
+        cards = []
+        while mask:
+            low = mask & -mask
+            cards.append(CARDS[low.bit_length() - 1])
+            mask ^= low
+        cards.sort(key=self.compiled.card_key)
+        return cards
+
+    def mask_combo(self, mask):
+        combo = self._mask_combo_cache.get(mask)
+        if combo is None:
+            # Dikosongkan saat penuh, seperti cache SkillPlanner, supaya sesi panjang tidak terus membesar
+            if len(self._mask_combo_cache) >= self.MASK_COMBO_CACHE_SIZE:
+                self._mask_combo_cache.clear()
+            combo = self._mask_combo_cache[mask] = self.get_combo_type(self.mask_cards(mask))
+        return combo
+
+class AIParams:
+    """Tunable numbers of the AI skill policy, loaded from / saved to a JSON file"""
+    # name: (default, low, high). Nilai int dicari sebagai int
+    SPACE = {
+        'skill_chance': (0.6, 0.0, 1.0),
+        'base_balanced': (0.2, 0.0, 1.0),
+        'base_aggressive': (0.3, 0.0, 1.0),
+        'base_defensive': (0.4, 0.0, 1.0),
+        'skip_factor': (0.7, 0.0, 2.0),
+        'wild_factor': (1.5, 0.0, 3.0),
+        'aggressive_cards': (3, 1, 8),
+        'defensive_margin': (2, 0, 6),
+        'shield_min_cards': (8, 0, 13),
+        'sniper_max_cards': (5, 1, 13),
+        'wild_max_cards': (4, 1, 13),
+    }
+
+    def __init__(self, **values):
+        unknown = set(values) - set(self.SPACE)
+        if unknown:
+            raise ValueError(f"Unknown AI parameters: {', '.join(sorted(unknown))}")
+        for name, (default, low, high) in self.SPACE.items():
+            value = values.get(name, default)
+            if not low <= value <= high:
+                raise ValueError(f"AI parameter {name}={value} is outside [{low}, {high}]")
+            setattr(self, name, type(default)(value))
+
+    @classmethod
+    def sample(cls, rng):
+        values = {}
+        for name, (default, low, high) in cls.SPACE.items():
+            values[name] = rng.randint(low, high) if isinstance(default, int) else rng.uniform(low, high)
+        return cls(**values)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.SPACE}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+
+DEFAULT_AI_PARAMS = AIParams()
+# File parameter hasil 'tune', dibaca otomatis saat game dibuka
+AI_PARAMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai_params.json')
+
+class GreedyAI:
+    """The built-in AI: greedy play and a random skill with params.skill_chance (60%).
+
+    Every seat AI has the same two methods; choose_skill returns
+    (skill, target_index or None) or None to skip using a skill.
+    """
+    name = 'greedy'
+    ponderable = True  # jawaban AIPonderer (greedy) boleh dipakai untuk kursi ini
+
+    def __init__(self, params=None):
+        self.params = params or DEFAULT_AI_PARAMS
+
+    def choose_play(self, engine):
+        return engine.ai_find_best_play(engine.players[engine.current].cards)
+
+    def choose_skill(self, engine):
+        ai_player = engine.players[engine.current]
+        if ai_player.special_skills and engine.ai_rng.random() < self.params.skill_chance:
+            return engine.ai_rng.choice(ai_player.special_skills), None
+        return None
+
+class TunedAI(GreedyAI):
+    """Greedy play; skills go through the strategy rules of should_ai_use_skill"""
+    name = 'tuned'
+
+    def choose_skill(self, engine):
+        index = engine.current
+        ai_player = engine.players[index]
+        if not ai_player.special_skills or engine.ai_rng.random() >= self.params.skill_chance:
+            return None
+        strategy = engine.ai_strategy(index)
+        for skill in ai_player.special_skills:
+            if engine.should_ai_use_skill(skill, index, strategy):
+                return skill, None
+        return None
+
+# AI dengan beat table memblok lawan yang tinggal sekian kartu
+BLOCK_HAND_SIZE = 2
+
+# Turn events. Only one is ever pending (see TurnScheduler)
+EV_TURN, EV_AI_PLAY, EV_NEXT = 0, 1, 2
+START_DELAY, TURN_DELAY, SKILL_DELAY = 1000, 1500, 2000
+
+class TurnScheduler:
+    """Holds the one pending turn event and processes events iteratively.
+
+    Headless code calls step() in a loop. The Tk client attaches a GameClock,
+    and post() then schedules a single dispatch after the event's delay.
+    Events are plain ints, so a turn allocates nothing else.
+    """
+    def __init__(self, engine):
+        self.engine = engine
+        self.pending = None
+        self.clock = None
+        self.scheduled = False
+        self.replaced = 0  # post() while a turn was already pending (should stay 0)
+
+    def attach(self, clock):
+        self.clock = clock
+
+    def reset(self):
+        self.pending = None
+        self.scheduled = False
+
+    def post(self, kind, delay=0):
+        if self.pending is not None:
+            self.replaced += 1
+        self.pending = kind
+        if self.clock is not None and not self.scheduled:
+            self.scheduled = True
+            self.clock.after(delay, self.dispatch)
+
+    def dispatch(self):
+        self.scheduled = False
+        self.step()
+
+    def step(self):
+        kind, self.pending = self.pending, None
+        if kind is not None:
+            self.engine.handle_event(kind)
+
+class GameEngine:
+    """Game state and turn rules without any Tk code.
+
+    BigTwoGame builds on this class and overrides the hooks (update, notify,
+    on_skill_acquired, on_peek, game_over) to show things on screen; simulations
+    use it directly with every seat played by the AI.
+    """
+    TARGETED_SKILLS = ['force_discard', 'skip', 'swap', 'peek']
+
+    def __init__(self, rules=None, seed=None, human=False):
+        self.rules = rules or RuleConfig()
+        self.compiled = self.rules.compile()
+        self.logic = GameLogic(self.rules)
+        self.reseed(seed)
+        self.players = [Player("You", True)] if human else [Player("AI Player 0")]
+        self.players += [Player(f"AI Player {i}") for i in range(1, self.rules.num_players)]
+        self.current = 0
+        self.last_cards = []
+        self.last_type = None
+        self.last_val = 0
+        self.pass_count = 0
+        self.over = False
+        self.winner = None
+        self.is_first_round = True
+        self.starter_index = None
+        self.first_play_made = False
+        self.round_count = 0
+        self.skill_phase = False
+        self.available_skills = []
+        self.pending_skill = None
+        self.deck = []
+        self.wild_play_active = False
+        self.turns_played = 0
+        self.games_dealt = 0
+        # EventLog / EventBus opsional; game_id dan event_seq untuk record yang ditulis
+        self.event_log = None
+        self.event_bus = None
+        # BeatTable opsional untuk keputusan risiko AI
+        self.beat_table = None
+        self.game_id = 0
+        self.event_seq = 0
+        self.scheduler = TurnScheduler(self)
+        # Strategi AI per kursi (lihat GreedyAI)
+        self.seat_ai = [GreedyAI()] * len(self.players)
+
+    def reseed(self, seed):
+        """rng drives the cards and skill effects, ai_rng the AI's random choices.
+        Keeping them apart lets a replay reproduce a game from its seed and actions alone."""
+        self.rng = random.Random(seed)
+        self.ai_rng = random.Random(None if seed is None else f"ai:{seed}")
+
+    # --- Hooks (no-op tanpa UI) ---
+
+    def update(self):
+        pass
+
+    def mark_dirty(self, *regions):
+        """Note which parts of the table changed: 'hand', 'center', 'labels', 'skills', 'seatN'"""
+        pass
+
+    def seat_region(self, player_index):
+        return 'hand' if self.players[player_index].is_human else f'seat{player_index}'
+
+    def notify(self, title, message, user_index):
+        pass
+
+    def on_skill_acquired(self, player_index, skill):
+        pass
+
+    def on_peek(self, user_index, target_player):
+        pass
+
+    def game_over(self, winner_index):
+        self.over = True
+        self.winner = winner_index
+        self.log_event(EVT_GAME_OVER, winner_index)
+
+    def log_event(self, kind, player, cards=(), target=None, skill=None):
+        """Append one record to the event log and publish it on the event bus, if there are any"""
+        if self.event_log is None and self.event_bus is None:
+            return
+        combo = value = 0
+        if kind == EVT_PLAY:
+            combo, value = self.logic.get_combo_type(cards)
+            combo = COMBO_TYPES.index(combo)
+        fields = (self.game_id, self.event_seq & 0xFFFF, kind, player,
+                  NO_INDEX if target is None else target,
+                  NO_INDEX if skill is None else SKILL_EFFECTS.index(skill.effect_type),
+                  combo, value, cards_mask(cards), self.turns_played)
+        if self.event_log is not None:
+            self.event_log.write(*fields)
+        if self.event_bus is not None:
+            self.event_bus.publish(Event(*fields))
+        self.event_seq += 1
+
+    # --- State ---
+
+    def deal(self):
+        self.over = False
+        self.winner = None
+        self.is_first_round = True
+        self.first_play_made = False
+        self.starter_index = None
+        self.round_count = 0
+        self.skill_phase = False
+        self.available_skills = []
+        self.pending_skill = None
+        self.wild_play_active = False
+        self.turns_played = 0
+        self.games_dealt += 1
+        self.current, self.last_cards, self.last_type, self.last_val, self.pass_count = 0, [], None, 0, 0
+
+        self.deck = self.logic.create_deck(self.rng)
+
+        for p in self.players:
+            p.cards.clear()
+            p.special_skills.clear()
+            p.shield_active = False
+            p.skip_next_turn = False
+
+        for _ in range(self.rules.cards_per_hand):
+            for p in self.players:
+                if self.deck:
+                    p.add_card(self.deck.pop())
+
+        for p in self.players:
+            p.sort_cards(self.compiled.card_key)
+
+        # Kartu pembuka: 3 suit terendah, atau kartu terendah yang dibagikan
+        dealt = [c for p in self.players for c in p.cards]
+        opening = min(dealt, key=self.compiled.card_key)
+        self.logic.opening_id = opening.id
+
+        for i, p in enumerate(self.players):
+            if opening in p.cards:
+                self.current = i
+                self.starter_index = i
+                break
+
+        if self.event_log is not None or self.event_bus is not None:
+            self.game_id = self.event_log.begin_game() if self.event_log is not None else self.games_dealt - 1
+            self.event_seq = 0
+            for i, p in enumerate(self.players):
+                self.log_event(EVT_DEAL, i, p.cards, target=self.starter_index)
+
+        self.mark_dirty('labels', 'skills', 'center', *(self.seat_region(i) for i in range(len(self.players))))
+
+    def final_scores(self):
+        scores = []
+        for player in self.players:
+            score = sum(card.get_numeric_value() for card in player.cards)
+            scores.append((player.name, score, len(player.cards)))
+        return scores
+
+    def clear_table(self):
+        self.log_event(EVT_TABLE_CLEAR, self.current)
+        self.last_cards = []
+        self.last_type = None
+        self.last_val = 0
+        self.pass_count = 0
+        self.mark_dirty('center', 'labels')
+
+    def commit_play(self, cards):
+        """Play cards for the current player. Returns True if they went out"""
+        player = self.players[self.current]
+        self.log_event(EVT_PLAY, self.current, cards)
+        player.remove_cards(cards)
+        self.last_cards = cards[:]
+        self.last_type, self.last_val = self.logic.get_combo_type(cards)
+        self.pass_count = 0
+        self.wild_play_active = False
+        self.turns_played += 1
+        self.mark_dirty(self.seat_region(self.current), 'center', 'labels')
+
+        if self.is_first_round:
+            self.is_first_round = False
+            self.first_play_made = True
+
+        if not player.cards:
+            self.game_over(self.current)
+            return True
+        return False
+
+    def commit_pass(self):
+        self.log_event(EVT_PASS, self.current)
+        self.pass_count += 1
+        self.turns_played += 1
+        self.mark_dirty('labels')
+
+        # After everyone else passes, clear the table
+        if self.pass_count >= self.compiled.pass_limit:
+            self.clear_table()
+            self.round_count += 1
+            self.check_skill_round()
+
+    def advance_turn(self):
+        """Move to the next player, skipping players marked to skip"""
+        n = len(self.players)
+        self.mark_dirty('labels')
+        while True:
+            self.current = (self.current + 1) % n
+
+            # Only increment round count when a full rotation is completed
+            if self.current == self.starter_index and not self.is_first_round:
+                self.round_count += 1
+                self.check_skill_round()
+
+            player = self.players[self.current]
+            if not player.skip_next_turn:
+                return
+            self.log_event(EVT_SKIPPED, self.current)
+            player.skip_next_turn = False
+            self.pass_count += 1
+            if self.pass_count >= self.compiled.pass_limit:
+                self.clear_table()
+                # Increment round count only when passes clear the table
+                self.round_count += 1
+                self.check_skill_round()
+
+    def check_skill_round(self):
+        """Give every player a random skill every 4 rounds"""
+        if not self.first_play_made:
+            return False
+
+        skill_round = (self.round_count % self.rules.skill_interval == 0) and (self.round_count > 0)
+        if not skill_round or self.skill_phase:
+            return False
+
+        self.skill_phase = True
+        pool = self.logic.special_skills
+        selected_skills = self.rng.sample(pool, min(len(self.players), len(pool)))
+        for i, player in enumerate(self.players):
+            if selected_skills:
+                skill = self.rng.choice(selected_skills)
+                player.add_skill(skill)
+                selected_skills.remove(skill)
+                self.log_event(EVT_SKILL_ACQUIRED, i, skill=skill)
+                self.on_skill_acquired(i, skill)
+        self.skill_phase = False
+        self.mark_dirty('skills', 'labels')
+        return True
+
+    # --- Skills ---
+
+    def choose_skill_target(self, skill, user_index):
+        available_targets = [i for i in range(len(self.players)) if i != user_index]
+        return self.ai_rng.choice(available_targets) if available_targets else None
+
+    def execute_targeted_skill(self, skill, user_index, target_index):
+        """Execute a targeted skill effect"""
+        target_player = self.players[target_index]
+        user = self.players[user_index]
+        self.log_event(EVT_SKILL_USED, user_index, target=target_index, skill=skill)
+        self.mark_dirty('skills', 'labels', self.seat_region(user_index), self.seat_region(target_index))
+
+        # Check if target has shield
+        if target_player.shield_active and skill.effect_type in ['force_discard', 'skip', 'swap']:
+            target_player.shield_active = False  # Shield is consumed
+            self.notify("Shield!", f"{target_player.name}'s shield blocked the {skill.name}!", user_index)
+            return
+
+        if skill.effect_type == 'force_discard':
+            discarded = []
+            for _ in range(self.rules.sniper_cards):
+                if target_player.cards:
+                    highest_card = max(target_player.cards, key=lambda c: c.get_numeric_value())
+                    target_player.remove_cards([highest_card])
+                    discarded.append(highest_card)
+            if discarded:
+                self.notify("Sniper Hit!", f"Forced {target_player.name} to discard "
+                            f"{' '.join(str(c) for c in discarded)}!", user_index)
+
+        elif skill.effect_type == 'skip':
+            target_player.skip_next_turn = True
+            self.notify("Skip!", f"{target_player.name} will skip their next turn!", user_index)
+
+        elif skill.effect_type == 'swap':
+            if len(target_player.cards) >= 2 and len(user.cards) >= 2:
+                # Swap 2 random cards
+                user_cards = self.rng.sample(user.cards, 2)
+                target_cards = self.rng.sample(target_player.cards, 2)
+
+                user.remove_cards(user_cards)
+                target_player.remove_cards(target_cards)
+
+                for card in target_cards:
+                    user.add_card(card)
+                for card in user_cards:
+                    target_player.add_card(card)
+
+                user.sort_cards(self.compiled.card_key)
+                target_player.sort_cards(self.compiled.card_key)
+                self.notify("Swap!", f"Swapped 2 cards with {target_player.name}!", user_index)
+
+        elif skill.effect_type == 'peek':
+            self.on_peek(user_index, target_player)
+
+    def apply_skill_effect(self, skill, user_index, target_index=None):
+        """Apply the effect of a special skill"""
+        self.mark_dirty('skills', 'labels', self.seat_region(user_index))
+        if skill.effect_type in self.TARGETED_SKILLS:
+            if target_index is None:
+                target_index = self.choose_skill_target(skill, user_index)
+            if target_index is not None:
+                self.execute_targeted_skill(skill, user_index, target_index)
+            return
+
+        self.log_event(EVT_SKILL_USED, user_index, skill=skill)
+        if skill.effect_type == 'shield':
+            self.players[user_index].shield_active = True
+            self.notify("Shield Up!", "You are now protected from negative effects!", user_index)
+
+        elif skill.effect_type == 'chaos':
+            # All players pass chaos_cards (1) cards to the next player
+            count = self.rules.chaos_cards
+            if all(len(p.cards) >= count for p in self.players):
+                cards_to_pass = []
+                for player in self.players:
+                    passed = []
+                    for _ in range(count):
+                        card_to_pass = self.rng.choice(player.cards)
+                        passed.append(card_to_pass)
+                        player.remove_cards([card_to_pass])
+                    cards_to_pass.append(passed)
+
+                for i, cards in enumerate(cards_to_pass):
+                    for card in cards:
+                        self.players[(i + 1) % len(self.players)].add_card(card)
+
+                for player in self.players:
+                    player.sort_cards(self.compiled.card_key)
+                self.mark_dirty(*(self.seat_region(i) for i in range(len(self.players))))
+                noun = "1 card" if count == 1 else f"{count} cards"
+                self.notify("Chaos!", f"All players passed {noun} to the next player!", user_index)
+
+        elif skill.effect_type == 'draw_lucky':
+            if self.deck:
+                # Kartu terendah menurut urutan aturan (rank lalu suit), sama dengan GameState
+                lowest_card = min(self.deck, key=self.compiled.card_key)
+                self.deck.remove(lowest_card)
+                self.players[user_index].add_card(lowest_card)
+                self.players[user_index].sort_cards(self.compiled.card_key)
+                self.notify("Lucky Draw!", f"You drew the lucky card: {lowest_card}!", user_index)
+
+        elif skill.effect_type == 'wild_play':
+            if self.players[user_index].is_human:
+                self.wild_play_active = True
+                self.notify("Wild Play!", "You can now play any card combination, ignoring normal rules!", user_index)
+            else:
+                self.ai_wild_play(user_index)
+
+    # --- AI ---
+
+    def ai_find_best_play(self, cards, wild_play=False):
+        """Find the best play for AI with enhanced strategy"""
+        valid_plays = self.logic.find_valid_plays(cards, self.last_cards, self.last_type, self.last_val,
+                                                  self.is_first_round, wild_play)
+        best_play = self.logic.choose_best_play(valid_plays)
+        # Dengan beat table: kalau lawan hampir habis, jawab meja dengan kombinasi
+        # yang paling kecil kemungkinannya dikalahkan, bukan yang termurah
+        if best_play and not wild_play and self.beat_table_blocks():
+            same_length = [play for play in valid_plays if len(play) == len(best_play)]
+            best_play = min(same_length, key=self.beaten_probability)
+        return best_play
+
+    def beat_table_blocks(self):
+        """True when ai_find_best_play answers the table by beat table instead of cheapest play"""
+        return bool(self.beat_table and self.last_type in BEAT_TYPES
+                    and min((len(p.cards) for i, p in enumerate(self.players) if i != self.current and p.cards),
+                            default=BLOCK_HAND_SIZE + 1) <= BLOCK_HAND_SIZE)
+
+    def beaten_probability(self, cards, player_index=None):
+        """Chance an opponent of player_index can beat this single/pair/triple (beat table lookup)"""
+        player_index = self.current if player_index is None else player_index
+        combo, value = self.logic.get_combo_type(cards)
+        others = [len(p.cards) for i, p in enumerate(self.players) if i != player_index and p.cards]
+        unseen = sum(others) + len(self.deck)
+        return self.beat_table.probability(combo, value - 3, unseen, others)
+
+    def hand_beat_risk(self, player_index):
+        """Average beaten probability of the player's singles; high means a weak hand"""
+        cards = self.players[player_index].cards
+        if not cards:
+            return 0.0
+        return sum(self.beaten_probability([c], player_index) for c in cards) / len(cards)
+
+    def ai_find_triple(self, cards):
+        """Find a triple combination"""
+        value_counts = Counter(card.value for card in cards)
+        for value, count in value_counts.items():
+            if count >= 3:
+                return [card for card in cards if card.value == value][:3]
+        return None
+
+    def ai_wild_play(self, ai_index):
+        """AI player uses wild play skill"""
+        ai_player = self.players[ai_index]
+        if ai_player.cards:
+            # AI plays their highest single card or best combination
+            if len(ai_player.cards) >= 5:
+                valid_play = self.ai_find_best_play(ai_player.cards, wild_play=True)
+            elif len(ai_player.cards) >= 3:
+                valid_play = self.ai_find_triple(ai_player.cards)
+            else:
+                valid_play = [max(ai_player.cards, key=lambda c: c.get_numeric_value())]
+
+            if valid_play:
+                self.log_event(EVT_PLAY, ai_index, valid_play)
+                ai_player.remove_cards(valid_play)
+                self.last_cards = valid_play[:]
+                self.last_type, self.last_val = self.logic.get_combo_type(valid_play)
+                self.pass_count = 0
+                self.turns_played += 1
+                self.mark_dirty('center', 'labels')
+
+                if not ai_player.cards:
+                    self.game_over(ai_index)
+
+    def ai_take_skill(self):
+        """Let the current seat's AI use a skill. Returns the skill used"""
+        choice = self.seat_ai[self.current].choose_skill(self)
+        if choice:
+            skill, target_index = choice
+            if self.players[self.current].use_skill(skill):
+                self.apply_skill_effect(skill, self.current, target_index)
+                return skill
+        return None
+
+    def ai_choose_play(self):
+        return self.seat_ai[self.current].choose_play(self)
+
+    def ai_take_play(self):
+        """Play the greedy best combination or pass for the current AI"""
+        valid_play = self.ai_choose_play()
+        if valid_play:
+            return self.commit_play(valid_play)
+        self.commit_pass()
+        return False
+
+    def seat_params(self, ai_index):
+        return getattr(self.seat_ai[ai_index], 'params', None) or DEFAULT_AI_PARAMS
+
+    def ai_strategy(self, ai_index):
+        """'aggressive', 'defensive' or 'balanced' from the seat's hand size"""
+        params = self.seat_params(ai_index)
+
+        # Analyze game state
+        total_cards_left = sum(len(p.cards) for p in self.players)
+        avg_cards = total_cards_left / len(self.players)
+        ai_card_count = len(self.players[ai_index].cards)
+
+        if ai_card_count <= params.aggressive_cards:
+            # Aggressive - try to win
+            return "aggressive"
+        elif ai_card_count > avg_cards + params.defensive_margin:
+            # Defensive - try to catch up
+            return "defensive"
+        # Balanced
+        return "balanced"
+
+    def enhanced_ai_strategy(self, ai_index):
+        """Enhanced AI strategy with skill usage"""
+        ai_player = self.players[ai_index]
+        strategy = self.ai_strategy(ai_index)
+
+        # Use skills based on strategy
+        if ai_player.special_skills:
+            for skill in ai_player.special_skills[:]:  # Copy list to avoid modification during iteration
+                if self.should_ai_use_skill(skill, ai_index, strategy):
+                    ai_player.use_skill(skill)
+                    self.apply_skill_effect(skill, ai_index)
+                    self.update()
+                    return True
+
+        return False
+
+    def should_ai_use_skill(self, skill, ai_index, strategy):
+        """Determine if AI should use a specific skill"""
+        ai_player = self.players[ai_index]
+        params = self.seat_params(ai_index)
+
+        # Basic probability based on strategy
+        if strategy == "aggressive":
+            base_prob = params.base_aggressive
+        elif strategy == "defensive":
+            base_prob = params.base_defensive
+        else:
+            base_prob = params.base_balanced
+
+        # Skill-specific logic
+        if skill.effect_type == "shield":
+            # Use shield if vulnerable (many cards)
+            return len(ai_player.cards) > params.shield_min_cards and self.ai_rng.random() < base_prob
+
+        elif skill.effect_type == "force_discard":
+            # Use sniper against player with few cards
+            min_cards = min(len(p.cards) for i, p in enumerate(self.players) if i != ai_index)
+            return min_cards <= params.sniper_max_cards and self.ai_rng.random() < base_prob
+
+        elif skill.effect_type == "skip":
+            # Use skip strategically
+            return self.ai_rng.random() < base_prob * params.skip_factor
+
+        elif skill.effect_type == "wild_play":
+            # Use wild play when stuck or to make aggressive play
+            chance = base_prob * params.wild_factor
+            if self.beat_table:
+                # Lebih mungkin dipakai kalau kartu di tangan mudah dikalahkan
+                chance *= 0.5 + self.hand_beat_risk(ai_index)
+            return len(ai_player.cards) <= params.wild_max_cards and self.ai_rng.random() < chance
+
+        else:
+            # General usage
+            return self.ai_rng.random() < base_prob
+
+    # --- Turn flow ---
+
+    def turn_delay(self):
+        """Pause before an AI turn (ms); only used when a clock drives the scheduler"""
+        return TURN_DELAY
+
+    def on_human_turn(self):
+        pass
+
+    def start_turns(self, delay=0):
+        self.scheduler.reset()
+        if self.players[self.current].is_human:
+            self.on_human_turn()
+        else:
+            self.scheduler.post(EV_TURN, delay)
+
+    def handle_event(self, kind):
+        """Process one turn event and post the follow-up event, if any"""
+        if self.over:
+            return
+
+        if kind == EV_NEXT:
+            self.advance_turn()
+            self.update()
+            if self.players[self.current].is_human:
+                self.on_human_turn()
+            else:
+                self.scheduler.post(EV_TURN, self.turn_delay())
+
+        elif kind == EV_TURN:
+            if self.players[self.current].is_human:
+                return
+            turns = self.turns_played
+            skill = self.ai_take_skill()
+            if self.over:
+                return
+            if skill:
+                # Beri waktu untuk efek skill terlihat
+                self.update()
+                # AI wild play already counts as this turn's play
+                self.scheduler.post(EV_NEXT if self.turns_played != turns else EV_AI_PLAY, SKILL_DELAY)
+            else:
+                self.scheduler.post(EV_AI_PLAY)
+
+        elif kind == EV_AI_PLAY:
+            if not self.ai_take_play():
+                self.scheduler.post(EV_NEXT)
+
+    # --- Headless loop ---
+
+    def play_game(self, max_turns=5000, deal=True):
+        """Deal (unless deal=False: the caller already did) and play one game with
+        every seat as AI. Returns the winner index"""
+        if deal:
+            self.deal()
+        self.start_turns()
+        scheduler = self.scheduler
+        while scheduler.pending is not None and self.turns_played < max_turns:
+            scheduler.step()
+        return self.winner
+
+def cards_mask(cards):
+    mask = 0
+    for c in cards:
+        mask |= 1 << c.id
+    return mask
+
+# Bit layout GameState.flags
+F_CURRENT, F_PASS, F_TYPE, F_VAL, F_FIRST, F_WILD = 0, 3, 6, 10, 14, 15
+F_OVER, F_WINNER, F_STARTER, F_SHIELD, F_SKIP, F_ROUND = 16, 17, 20, 23, 31, 39
+COMBO_TYPES = [None, 'single', 'pair', 'triple'] + FIVE_CARD_TYPES
+
+# Action encoding: 0 = pass, 52-bit card mask = play, SKILL_ACTION | skill << 4 | target = skill
+PASS_ACTION = 0
+SKILL_ACTION = 1 << 56
+SKILL_COUNT_BITS = 3  # jumlah per jenis skill, maksimal 7
+SKILL_BITS = 8 * SKILL_COUNT_BITS  # 8 jenis skill per pemain
+
+class GameState:
+    """Immutable packed game state for search and what-if analysis.
+
+    Hands, table and deck are 52-bit masks, everything else is packed into
+    flags and skills ints, so clone() is free and apply() returns a new state.
+    Skill rounds, swap and chaos draw from the rng passed to apply().
+    """
+    __slots__ = ('logic', 'hands', 'table', 'deck', 'flags', 'skills')
+
+    def __init__(self, logic, hands, table, deck, flags, skills):
+        self.logic = logic
+        self.hands = hands
+        self.table = table
+        self.deck = deck
+        self.flags = flags
+        self.skills = skills
+
+    @classmethod
+    def from_engine(cls, engine):
+        skill_index = {s.effect_type: i for i, s in enumerate(engine.logic.special_skills)}
+        shields = skips = skills = 0
+        for i, p in enumerate(engine.players):
+            shields |= p.shield_active << i
+            skips |= p.skip_next_turn << i
+            for skill in p.special_skills:
+                shift = i * SKILL_BITS + skill_index[skill.effect_type] * SKILL_COUNT_BITS
+                if (skills >> shift) & 7 < 7:
+                    skills += 1 << shift
+        flags = (engine.current << F_CURRENT | engine.pass_count << F_PASS
+                 | COMBO_TYPES.index(engine.last_type) << F_TYPE | engine.last_val << F_VAL
+                 | engine.is_first_round << F_FIRST | engine.wild_play_active << F_WILD
+                 | engine.over << F_OVER | (engine.winner or 0) << F_WINNER
+                 | (engine.starter_index or 0) << F_STARTER
+                 | shields << F_SHIELD | skips << F_SKIP | engine.round_count << F_ROUND)
+        hands = tuple(cards_mask(p.cards) for p in engine.players)
+        return cls(engine.logic, hands, cards_mask(engine.last_cards), cards_mask(engine.deck), flags, skills)
+
+    def to_engine(self, engine):
+        """Write this state back into an engine (cards become the shared CARDS objects)"""
+        skills = engine.logic.special_skills
+        for i, p in enumerate(engine.players):
+            p.cards = self.logic.mask_cards(self.hands[i])
+            p.shield_active = bool(self.flags >> (F_SHIELD + i) & 1)
+            p.skip_next_turn = bool(self.flags >> (F_SKIP + i) & 1)
+            p.special_skills = []
+            for s in range(len(skills)):
+                p.special_skills += [skills[s]] * self.skill_count(i, s)
+        engine.current = self.current
+        engine.pass_count = self.pass_count
+        engine.last_cards = self.logic.mask_cards(self.table)
+        engine.last_type = self.last_type
+        engine.last_val = self.last_val
+        engine.deck = self.logic.mask_cards(self.deck)
+        engine.is_first_round = self.is_first_round
+        engine.first_play_made = not self.is_first_round
+        engine.wild_play_active = bool(self.flags >> F_WILD & 1)
+        engine.over = self.over
+        engine.winner = self.winner
+        engine.starter_index = self.flags >> F_STARTER & 7
+        engine.round_count = self.round_count
+
+    def clone(self):
+        return self
+
+    def key(self):
+        return (self.hands, self.table, self.flags, self.skills)
+
+    def memory_size(self):
+        """Bytes used by this state (object, hands tuple and the ints it owns)"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.hands)
+        size += sum(sys.getsizeof(h) for h in self.hands)
+        for value in (self.table, self.deck, self.flags, self.skills):
+            size += sys.getsizeof(value)
+        return size
+
+    # --- Fields ---
+
+    @property
+    def current(self):
+        return self.flags & 7
+
+    @property
+    def pass_count(self):
+        return self.flags >> F_PASS & 7
+
+    @property
+    def last_type(self):
+        return COMBO_TYPES[self.flags >> F_TYPE & 15]
+
+    @property
+    def last_val(self):
+        return self.flags >> F_VAL & 15
+
+    @property
+    def is_first_round(self):
+        return bool(self.flags >> F_FIRST & 1)
+
+    @property
+    def over(self):
+        return bool(self.flags >> F_OVER & 1)
+
+    @property
+    def winner(self):
+        return self.flags >> F_WINNER & 7 if self.over else None
+
+    @property
+    def round_count(self):
+        return self.flags >> F_ROUND
+
+    def hand_size(self, player_index):
+        return bin(self.hands[player_index]).count('1')
+
+    def skill_count(self, player_index, skill_index):
+        return self.skills >> (player_index * SKILL_BITS + skill_index * SKILL_COUNT_BITS) & 7
+
+    # --- Actions ---
+
+    def legal_actions(self, include_skills=True):
+        if self.over:
+            return []
+        logic = self.logic
+        flags = self.flags
+        cur = flags & 7
+        plays = logic.find_valid_plays(logic.mask_cards(self.hands[cur]), self.table, self.last_type,
+                                       self.last_val, self.is_first_round, bool(flags >> F_WILD & 1))
+        actions = [cards_mask(play) for play in plays]
+        actions.append(PASS_ACTION)
+        if include_skills and self.skills >> (cur * SKILL_BITS) & ((1 << SKILL_BITS) - 1):
+            n = len(self.hands)
+            for s, skill in enumerate(logic.special_skills):
+                if not self.skill_count(cur, s):
+                    continue
+                if skill.effect_type in GameEngine.TARGETED_SKILLS:
+                    actions += [SKILL_ACTION | s << 4 | t for t in range(n) if t != cur]
+                else:
+                    actions.append(SKILL_ACTION | s << 4 | cur)
+        return actions
+
+    def greedy_action(self):
+        """The action GameEngine.ai_find_best_play would take here"""
+        logic = self.logic
+        plays = logic.find_valid_plays(logic.mask_cards(self.hands[self.current]), self.table,
+                                       self.last_type, self.last_val, self.is_first_round)
+        best = logic.choose_best_play(plays)
+        return cards_mask(best) if best else PASS_ACTION
+
+    def apply(self, action, rng=random):
+        """Return the state after action. Skill actions keep the turn with the same player"""
+        if action & SKILL_ACTION:
+            return self._apply_skill(action >> 4 & 15, action & 15, rng)
+
+        hands = list(self.hands)
+        flags = self.flags
+        cur = flags & 7
+        skills = self.skills
+        if action:
+            hands[cur] &= ~action
+            table = action
+            combo, value = self.logic.mask_combo(action)
+            clear = (7 << F_PASS | 15 << F_TYPE | 15 << F_VAL | 1 << F_FIRST | 1 << F_WILD)
+            flags = (flags & ~clear) | COMBO_TYPES.index(combo) << F_TYPE | value << F_VAL
+            if not hands[cur]:
+                flags |= 1 << F_OVER | cur << F_WINNER
+                return GameState(self.logic, tuple(hands), table, self.deck, flags, skills)
+        else:
+            table = self.table
+            flags += 1 << F_PASS
+            if flags >> F_PASS & 7 >= self.logic.compiled.pass_limit:
+                table, flags, skills = self._clear_table(flags, skills, hands, rng)
+
+        # Next player, skipping players marked to skip
+        n = len(hands)
+        starter = flags >> F_STARTER & 7
+        while True:
+            cur = (cur + 1) % n
+            flags = (flags & ~7) | cur
+            if cur == starter and not flags >> F_FIRST & 1:
+                flags += 1 << F_ROUND
+                skills = self._skill_round(flags, skills, n, rng)
+            if not flags >> (F_SKIP + cur) & 1:
+                break
+            flags &= ~(1 << (F_SKIP + cur))
+            flags += 1 << F_PASS
+            if flags >> F_PASS & 7 >= self.logic.compiled.pass_limit:
+                table, flags, skills = self._clear_table(flags, skills, hands, rng)
+
+        return GameState(self.logic, tuple(hands), table, self.deck, flags, skills)
+
+    def _clear_table(self, flags, skills, hands, rng):
+        flags &= ~(7 << F_PASS | 15 << F_TYPE | 15 << F_VAL)
+        flags += 1 << F_ROUND
+        return 0, flags, self._skill_round(flags, skills, len(hands), rng)
+
+    def _skill_round(self, flags, skills, n, rng):
+        rounds = flags >> F_ROUND
+        if flags >> F_FIRST & 1 or rounds % self.logic.rules.skill_interval or not rounds:
+            return skills
+        pool = list(range(len(self.logic.special_skills)))
+        selected = rng.sample(pool, min(n, len(pool)))
+        for i in range(n):
+            if selected:
+                s = rng.choice(selected)
+                selected.remove(s)
+                shift = i * SKILL_BITS + s * SKILL_COUNT_BITS
+                if skills >> shift & 7 < 7:
+                    skills += 1 << shift
+        return skills
+
+    def _apply_skill(self, skill_index, target, rng):
+        logic = self.logic
+        effect = logic.special_skills[skill_index].effect_type
+        hands = list(self.hands)
+        flags = self.flags
+        deck = self.deck
+        user = flags & 7
+        skills = self.skills - (1 << (user * SKILL_BITS + skill_index * SKILL_COUNT_BITS))
+
+        shielded = flags >> (F_SHIELD + target) & 1
+        if effect in ('force_discard', 'skip', 'swap') and shielded:
+            flags &= ~(1 << (F_SHIELD + target))  # Shield is consumed
+        elif effect == 'force_discard':
+            for _ in range(logic.rules.sniper_cards):
+                if hands[target]:
+                    top_rank = (hands[target].bit_length() - 1) >> 2
+                    candidates = [c for c in logic.mask_cards(hands[target]) if c.id >> 2 == top_rank]
+                    hands[target] &= ~(1 << candidates[0].id)
+        elif effect == 'skip':
+            flags |= 1 << (F_SKIP + target)
+        elif effect == 'swap':
+            if self.hand_size(target) >= 2 and self.hand_size(user) >= 2:
+                given = cards_mask(rng.sample(logic.mask_cards(hands[user]), 2))
+                taken = cards_mask(rng.sample(logic.mask_cards(hands[target]), 2))
+                hands[user] = (hands[user] & ~given) | taken
+                hands[target] = (hands[target] & ~taken) | given
+        elif effect == 'shield':
+            flags |= 1 << (F_SHIELD + user)
+        elif effect == 'chaos':
+            count = logic.rules.chaos_cards
+            if all(bin(h).count('1') >= count for h in hands):
+                passed = []
+                for h in hands:
+                    mask = 0
+                    for _ in range(count):
+                        mask |= 1 << rng.choice(logic.mask_cards(h & ~mask)).id
+                    passed.append(mask)
+                n = len(hands)
+                for i in range(n):
+                    hands[i] &= ~passed[i]
+                for i in range(n):
+                    hands[(i + 1) % n] |= passed[i]
+        elif effect == 'draw_lucky':
+            if deck:
+                # Rank terendah ada di bit terendah; suit-nya dipilih menurut urutan aturan
+                rank = ((deck & -deck).bit_length() - 1) >> 2
+                sort_key = logic.compiled.sort_key
+                low = min((c for c in range(rank * 4, rank * 4 + 4) if deck >> c & 1), key=sort_key.__getitem__)
+                deck &= ~(1 << low)
+                hands[user] |= 1 << low
+        elif effect == 'wild_play':
+            flags |= 1 << F_WILD
+        # peek tidak mengubah state
+
+        return GameState(logic, tuple(hands), self.table, deck, flags, skills)
+
+class StateStack:
+    """Apply/undo over immutable GameStates: undo just drops back to the parent"""
+    def __init__(self, state):
+        self.states = [state]
+
+    @property
+    def top(self):
+        return self.states[-1]
+
+    def apply(self, action, rng=random):
+        self.states.append(self.states[-1].apply(action, rng))
+        return self.states[-1]
+
+    def undo(self):
+        if len(self.states) > 1:
+            self.states.pop()
+        return self.states[-1]
+
+class AIPonderer:
+    """Precomputes AI replies in background threads while the human thinks.
+
+    start() takes the state at the start of the human's turn and, for each
+    likely human action, plays the AI seats forward with the greedy policy.
+    commit() keeps only the branch the human actually chose; lookup() then
+    returns the pondered action for a state, or None if it is not ready.
+    """
+    def __init__(self, workers=3, branches=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ponder")
+        self.branches = branches
+        self.generation = 0
+        self.futures = {}
+        self.answers = {}
+        self.hits = 0
+        self.misses = 0
+
+    def reset(self):
+        """Drop all pondering (new game or state changed under us)"""
+        self.generation += 1
+        for future in self.futures.values():
+            future.cancel()
+        self.futures = {}
+        self.answers = {}
+
+    def likely_actions(self, state):
+        plays = state.logic.find_valid_plays(state.logic.mask_cards(state.hands[state.current]), state.table,
+                                             state.last_type, state.last_val, state.is_first_round)
+        if not plays:
+            return [PASS_ACTION]
+        best = state.logic.choose_best_play(plays)
+        plays.sort(key=lambda play: (len(play), sum(c.get_numeric_value() for c in play)))
+        actions = [cards_mask(best)] + [cards_mask(p) for p in plays if p is not best]
+        return [PASS_ACTION] + actions[:self.branches]
+
+    def start(self, state):
+        self.reset()
+        generation = self.generation
+        human = state.current
+        for action in self.likely_actions(state):
+            self.futures[action] = self.executor.submit(self.ponder_branch, state, action, human, generation)
+
+    def ponder_branch(self, state, action, human, generation):
+        rng = random.Random(generation)
+        answers = {}
+        state = state.apply(action, rng)
+        while not state.over and state.current != human and generation == self.generation:
+            reply = state.greedy_action()
+            answers[state.key()] = reply
+            state = state.apply(reply, rng)
+        return answers
+
+    def commit(self, action):
+        """The human played action: keep its branch, discard the rest"""
+        future = self.futures.pop(action, None)
+        for other in self.futures.values():
+            other.cancel()
+        self.futures = {action: future} if future else {}
+        self.answers = {}
+
+    def lookup(self, state, count=True):
+        if not self.answers:
+            for future in self.futures.values():
+                if future.done() and not future.cancelled():
+                    self.answers.update(future.result())
+        reply = self.answers.get(state.key())
+        if count:
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return reply
+
+Hint = namedtuple('Hint', ['best', 'plays'])
+HINT_LIST_SIZE = 8  # berapa kombinasi ditampilkan di label hint
+
+class HintWorker:
+    """Computes play hints for the human in a background thread, cached per state.
+
+    A hint is the greedy AI's choice plus every legal play (all as card
+    masks), from the same find_valid_plays/choose_best_play the AI uses.
+    request() is called as soon as the human's turn starts so get() is
+    normally just a dict lookup.
+    """
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hint")
+        self.futures = {}
+        self.cache = {}
+
+    def reset(self):
+        """New game: old states can't come back"""
+        for future in self.futures.values():
+            future.cancel()
+        self.futures = {}
+        self.cache = {}
+
+    @staticmethod
+    def compute(state):
+        logic = state.logic
+        wild = bool(state.flags >> F_WILD & 1)
+        plays = logic.find_valid_plays(logic.mask_cards(state.hands[state.current]), state.table,
+                                       state.last_type, state.last_val, state.is_first_round, wild)
+        best = logic.choose_best_play(plays)
+        plays.sort(key=lambda play: (len(play), sum(c.get_numeric_value() for c in play)))
+        return Hint(cards_mask(best) if best else PASS_ACTION, [cards_mask(p) for p in plays])
+
+    def request(self, state):
+        key = state.key()
+        if key not in self.cache and key not in self.futures:
+            self.futures[key] = self.executor.submit(self.compute, state)
+
+    def get(self, state):
+        key = state.key()
+        if key not in self.cache:
+            self.request(state)
+            # Biasanya sudah selesai; kalau belum, tunggu worker yang sedang jalan
+            self.cache[key] = self.futures.pop(key).result()
+        return self.cache[key]
+
+# --- Difficulty tiers: anytime AI under a per-move deadline ---
+
+# name: (ms per decision, candidate plays searched, how skills are chosen)
+DIFFICULTY_TIERS = {
+    'easy': (0.0, 1, 'random'),
+    'normal': (25.0, 3, 'rules'),
+    'hard': (100.0, 4, 'rollouts'),
+    'expert': (400.0, 6, 'rollouts'),
+}
+
+class Deadline:
+    """Per-move time budget. Python can't interrupt a computation, so every
+    anytime loop polls expired() between steps and keeps its best answer so far"""
+    GRACE_MS = 5.0  # sedikit terlambat masih dihitung tepat waktu
+
+    def __init__(self, budget_ms):
+        self.budget_ms = budget_ms
+        self.start = time.perf_counter()
+        self.end = self.start + budget_ms / 1000.0
+
+    def expired(self):
+        return time.perf_counter() >= self.end
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000.0
+
+    def missed(self):
+        return self.elapsed_ms() > self.budget_ms + self.GRACE_MS
+
+class TierStats:
+    """Per-tier record of decision time, deadline misses and how much search fit in the budget"""
+    def __init__(self):
+        self.times = []
+        self.misses = self.fallbacks = self.changed = self.rollouts = 0
+        self.gain = 0.0
+
+    def record(self, deadline, rollouts=0, fallback=False, changed=False, gain=0.0):
+        self.times.append(deadline.elapsed_ms())
+        self.misses += deadline.missed()
+        self.fallbacks += fallback
+        self.changed += changed
+        self.rollouts += rollouts
+        self.gain += gain
+
+    def summary(self):
+        n = len(self.times)
+        if not n:
+            return None
+        times = sorted(self.times)
+        return {'decisions': n, 'median_ms': times[n // 2], 'p99_ms': times[min(n - 1, n * 99 // 100)],
+                'max_ms': times[-1], 'misses': self.misses, 'fallbacks': self.fallbacks,
+                'changed': self.changed, 'rollouts': self.rollouts / n, 'gain': self.gain / n}
+
+def determinize(state, player, rng):
+    """The state as player could imagine it: opponents' hands (and the deck)
+    redealt from the cards player can't see, keeping every hand size"""
+    hidden = [i for i in range(len(state.hands)) if i != player]
+    pool = state.deck
+    for i in hidden:
+        pool |= state.hands[i]
+    cards = [c for c in range(52) if pool >> c & 1]
+    rng.shuffle(cards)
+    hands = list(state.hands)
+    at = 0
+    for i in hidden:
+        size = state.hand_size(i)
+        hands[i] = sum(1 << c for c in cards[at:at + size])
+        at += size
+    deck = sum(1 << c for c in cards[at:])
+    return GameState(state.logic, tuple(hands), state.table, deck, state.flags, state.skills)
+
+def playout_value(state, player, deadline, rng, cards_per_hand):
+    """Greedy playout to the end: 1 for a win, otherwise up to 0.5 for cards shed.
+    None if the deadline passed first"""
+    while not state.over:
+        if deadline.expired():
+            return None
+        state = state.apply(state.greedy_action(), rng)
+    if state.winner == player:
+        return 1.0
+    # Draw Lucky / Swap / Chaos bisa membuat tangan lebih dari cards_per_hand kartu
+    return 0.5 * max(0.0, 1.0 - state.hand_size(player) / cards_per_hand)
+
+def compare_by_rollouts(state, player, actions, deadline, rng, cards_per_hand, min_rounds=4):
+    """Flat Monte Carlo over actions (actions[0] is the default) until the deadline.
+
+    Each round redeals the hidden cards once and plays every action out on
+    that same deal, so actions are compared on equal luck; only complete
+    rounds count. Returns (index, gain, rounds, rollouts): an action other
+    than the default is picked only if it beats the default by more than
+    two standard errors over at least min_rounds rounds.
+    """
+    # Selisih nilai tiap aksi terhadap aksi default pada deal yang sama
+    diffs = [0.0] * len(actions)
+    squares = [0.0] * len(actions)
+    rounds = rollouts = 0
+    while not deadline.expired():
+        world = determinize(state, player, rng)
+        seed = rng.getrandbits(32)
+        values = []
+        for action in actions:
+            playout_rng = random.Random(seed)
+            value = playout_value(world.apply(action, playout_rng), player, deadline, playout_rng,
+                                  cards_per_hand)
+            if value is None:
+                break
+            values.append(value)
+        rollouts += len(values)
+        if len(values) < len(actions):
+            break
+        rounds += 1
+        for i, value in enumerate(values):
+            diffs[i] += value - values[0]
+            squares[i] += (value - values[0]) ** 2
+
+    choice, gain = 0, 0.0
+    if rounds >= min_rounds:
+        for i in range(1, len(actions)):
+            mean = diffs[i] / rounds
+            spread = max(squares[i] / rounds - mean * mean, 0.0) ** 0.5
+            if mean > gain and mean > 2.0 * spread / rounds ** 0.5:
+                choice, gain = i, mean
+    return choice, gain, rounds, rollouts
+
+class SkillPlanner:
+    """Decides whether to use a skill now, and on whom, by rollouts.
+
+    Every (skill, target) option of skill_options becomes a GameState skill
+    action; not using a skill is the greedy play. They are evaluated together by
+    compare_by_rollouts within budget_ms. Shields and opponents' card counts
+    are part of the state, so a shielded target or a near-empty hand is
+    simply what the rollouts see. Answers are cached per state.
+    """
+    def __init__(self, budget_ms=30.0, seed=None, cache_size=4096):
+        self.budget_ms = budget_ms
+        self.rng = random.Random(seed)
+        self.cache = {}
+        self.cache_size = cache_size
+        self.hits = 0
+        self.stats = TierStats()
+
+    def choose(self, engine):
+        """(skill, target_index or None) or None, like GreedyAI.choose_skill"""
+        deadline = Deadline(self.budget_ms)
+        player = engine.current
+        options = skill_options(engine, player)
+        if len(options) == 1:
+            return None
+        state = GameState.from_engine(engine)
+        key = state.key()
+        if key in self.cache:
+            self.hits += 1
+            choice = self.cache[key]
+            return options[choice] if choice else None
+
+        skills = {s.effect_type: i for i, s in enumerate(engine.logic.special_skills)}
+        # Tanpa skill = langsung main greedy. Aksi skill mempertahankan giliran dan
+        # playout-nya juga lanjut dengan greedy, jadi kedua cabang main kartu yang sama
+        actions = [state.greedy_action()] + [SKILL_ACTION | skills[skill.effect_type] << 4
+                                             | (player if t is None else t) for skill, t in options[1:]]
+        choice, gain, rounds, rollouts = compare_by_rollouts(state, player, actions, deadline, self.rng,
+                                                             engine.rules.cards_per_hand)
+        self.stats.record(deadline, rollouts, fallback=not rounds, changed=choice != 0, gain=gain)
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[key] = choice
+        return options[choice] if choice else None
+
+class RolloutSkillAI(TunedAI):
+    """Greedy play; skill timing and targets from a SkillPlanner"""
+    name = 'rollout'
+
+    def __init__(self, params=None, budget_ms=30.0, seed=None):
+        super().__init__(params)
+        self.planner = SkillPlanner(budget_ms, seed)
+
+    def choose_skill(self, engine):
+        return self.planner.choose(engine)
+
+class TieredAI(TunedAI):
+    """Difficulty tier: the greedy move first, then compare_by_rollouts over a
+    few candidate plays until the tier's deadline; greedy stands when the
+    search finds nothing clearly better.
+
+    Skills follow the tier's skill mode: 'random' (GreedyAI), 'rules'
+    (should_ai_use_skill under the same deadline) or 'rollouts' (a
+    SkillPlanner with the tier's budget). stats['play'] / stats['skill']
+    keep a TierStats each.
+    """
+    def __init__(self, tier='normal', params=None, seed=None):
+        if tier not in DIFFICULTY_TIERS:
+            raise ValueError(f"Unknown difficulty '{tier}' (use {', '.join(DIFFICULTY_TIERS)})")
+        super().__init__(params)
+        self.name = tier
+        self.budget_ms, self.candidates, self.skill_mode = DIFFICULTY_TIERS[tier]
+        # Jawaban ponder greedy hanya cocok untuk tier tanpa search
+        self.ponderable = not self.budget_ms
+        self.rng = random.Random(seed)
+        self.planner = SkillPlanner(self.budget_ms, seed) if self.skill_mode == 'rollouts' else None
+        self.stats = {'play': TierStats(), 'skill': self.planner.stats if self.planner else TierStats()}
+
+    def candidate_actions(self, state, greedy):
+        actions = state.legal_actions(include_skills=False)
+        if state.table:
+            others = [a for a in actions if a != greedy]
+        else:
+            others = [a for a in actions if a != greedy and a != PASS_ACTION]
+        # Kombinasi termurah dulu, seperti urutan hint
+        others.sort(key=lambda a: (bin(a).count('1'), a))
+        if PASS_ACTION in others:
+            others.remove(PASS_ACTION)
+            others.insert(0, PASS_ACTION)
+        return [greedy] + others[:self.candidates - 1]
+
+    def choose_play(self, engine):
+        deadline = Deadline(self.budget_ms)
+        cards = engine.players[engine.current].cards
+        best = engine.ai_find_best_play(cards)
+        greedy = cards_mask(best) if best else PASS_ACTION
+        if self.candidates < 2 or deadline.expired():
+            self.stats['play'].record(deadline, fallback=bool(self.budget_ms))
+            return best
+        state = GameState.from_engine(engine)
+        actions = self.candidate_actions(state, greedy)
+        if len(actions) < 2:
+            self.stats['play'].record(deadline)
+            return best
+
+        choice, gain, rounds, rollouts = compare_by_rollouts(state, engine.current, actions, deadline, self.rng,
+                                                             engine.rules.cards_per_hand)
+        self.stats['play'].record(deadline, rollouts, fallback=not rounds, changed=choice != 0, gain=gain)
+        if choice == 0:
+            return best
+        return [c for c in cards if actions[choice] >> c.id & 1] or None
+
+    def choose_skill(self, engine):
+        if self.planner:
+            return self.planner.choose(engine)
+        deadline = Deadline(self.budget_ms)
+        if self.skill_mode == 'random':
+            choice = GreedyAI.choose_skill(self, engine)
+            self.stats['skill'].record(deadline)
+            return choice
+        index = engine.current
+        ai_player = engine.players[index]
+        choice = None
+        if ai_player.special_skills and engine.ai_rng.random() < self.params.skill_chance:
+            strategy = engine.ai_strategy(index)
+            for skill in ai_player.special_skills:
+                if deadline.expired():
+                    break
+                if engine.should_ai_use_skill(skill, index, strategy):
+                    choice = skill, None
+                    break
+        self.stats['skill'].record(deadline, fallback=deadline.expired() and choice is None)
+        return choice
+
+# --- Beat-probability tables ---
+
+BEAT_TYPES = {'single': 0, 'pair': 1, 'triple': 2}
+BEAT_MAGIC = b'BIG2BEAT'
+BEAT_DIMS = (3, 13, 52, 14)  # combo type, rank, kartu tak terlihat, ukuran tangan lawan
+BEAT_HEADER = struct.Struct('<8sHHHH')
+# Default file tabel, dibuat dengan 'beat-tables'
+BEAT_TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'beat_tables.f32')
+
+class BeatTable:
+    """Probability that one opponent can beat a single/pair/triple, memory-mapped on first use.
+
+    Indexed by combo type, rank, number of cards unseen by the asking player and
+    the opponent's hand size; probability() combines several opponents.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.values = None
+        self.map = None
+
+    def load(self):
+        with open(self.path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, *dims = BEAT_HEADER.unpack_from(self.map)
+        if magic != BEAT_MAGIC or tuple(dims) != BEAT_DIMS:
+            raise ValueError(f"{self.path} is not a beat-probability table")
+        self.values = memoryview(self.map)[BEAT_HEADER.size:].cast('f')
+
+    def probability(self, combo, rank, unseen, hand_sizes):
+        """Chance that at least one opponent (hand_sizes) holds a higher combo of the same type"""
+        if self.values is None:
+            self.load()
+        base = ((BEAT_TYPES[combo] * 13 + rank) * 52 + min(unseen, 51)) * 14
+        values = self.values
+        none = 1.0
+        for size in hand_sizes:
+            none *= 1.0 - values[base + min(size, 13)]
+        return 1.0 - none
+
+def best_ranks(cards):
+    """Highest rank held as a single, pair and triple (-1 when there is none)"""
+    counts = Counter(c.id >> 2 for c in cards)
+    best = [-1, -1, -1]
+    for rank, count in counts.items():
+        for t in range(min(count, 3)):
+            if rank > best[t]:
+                best[t] = rank
+    return best
+
+def build_beat_tables(rules, games, seed=None, prior=4.0):
+    """Count, over greedy self-play decisions, how often an opponent could beat each
+    single/pair/triple the deciding player holds. Returns the flat float32 table."""
+    size = BEAT_DIMS[0] * BEAT_DIMS[1] * BEAT_DIMS[2] * BEAT_DIMS[3]
+    beats = [0] * size
+    totals = [0] * size
+
+    class Sampler(GreedyAI):
+        def choose_play(self, engine):
+            me = engine.current
+            others = [p.cards for i, p in enumerate(engine.players) if i != me and p.cards]
+            unseen = min(sum(len(c) for c in others) + len(engine.deck), 51)
+            mine = Counter(c.id >> 2 for c in engine.players[me].cards)
+            opponents = [(min(len(c), 13), best_ranks(c)) for c in others]
+            for rank, count in mine.items():
+                for t in range(min(count, 3)):
+                    base = ((t * 13 + rank) * 52 + unseen) * 14
+                    for hand, best in opponents:
+                        totals[base + hand] += 1
+                        beats[base + hand] += best[t] > rank
+            return super().choose_play(engine)
+
+    engine = GameEngine(rules, seed=seed)
+    engine.seat_ai = [Sampler()] * rules.num_players
+    for _ in range(games):
+        engine.play_game()
+
+    # Sel dengan sedikit sampel ditarik ke rata-rata (type, rank, ukuran tangan)
+    table = array('f', [0.0] * size)
+    for t in range(3):
+        for rank in range(13):
+            for hand in range(14):
+                cells = [((t * 13 + rank) * 52 + u) * 14 + hand for u in range(52)]
+                total = sum(totals[i] for i in cells)
+                pooled = (sum(beats[i] for i in cells) + 0.5) / (total + 1.0)
+                if hand == 0:
+                    pooled = 0.0
+                for i in cells:
+                    table[i] = (beats[i] + prior * pooled) / (totals[i] + prior)
+    return table, sum(totals)
+
+def save_beat_tables(path, table):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(BEAT_HEADER.pack(BEAT_MAGIC, *BEAT_DIMS))
+        table.tofile(f)
+    os.replace(tmp, path)
+
+# --- Event log: append-only file of fixed-size binary records ---
+
+EVT_DEAL, EVT_PLAY, EVT_PASS, EVT_SKILL_ACQUIRED, EVT_SKILL_USED, EVT_TABLE_CLEAR, EVT_GAME_OVER, EVT_SKIPPED = range(1, 9)
+EVENT_NAMES = {EVT_DEAL: 'deal', EVT_PLAY: 'play', EVT_PASS: 'pass', EVT_SKILL_ACQUIRED: 'skill_acquired',
+               EVT_SKILL_USED: 'skill_used', EVT_TABLE_CLEAR: 'table_clear', EVT_GAME_OVER: 'game_over',
+               EVT_SKIPPED: 'skipped'}
+NO_INDEX = 255  # target/skill/combo kosong
+
+# game, seq, kind, player, target, skill, combo, value, cards (52-bit mask), turn
+EVENT_RECORD = struct.Struct('<IHBBBBBBQI')
+EVENT_FIELDS = ('game', 'seq', 'kind', 'player', 'target', 'skill', 'combo', 'value', 'cards', 'turn')
+Event = namedtuple('Event', EVENT_FIELDS)
+EVENT_MAGIC = b'BIG2EVT1'
+EVENT_KIND_OFFSET = 6  # posisi byte kind di dalam record
+
+def event_header():
+    """First record of every log: magic, version and record size"""
+    return (EVENT_MAGIC + struct.pack('<HH', 1, EVENT_RECORD.size)).ljust(EVENT_RECORD.size, b'\0')
+
+class EventLog:
+    """Appends event records to a log file, buffered; game ids continue after the existing ones"""
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.buffer = bytearray()
+        self.buffer_size = buffer_size
+        self.next_game = 0
+        if os.path.exists(path) and os.path.getsize(path):
+            archive = EventArchive(path)
+            count = len(archive)
+            if count:
+                self.next_game = archive.record(count - 1).game + 1
+            archive.close()
+            self.file = open(path, 'ab')
+            # Buang record terakhir yang terpotong supaya record baru tetap sejajar
+            self.file.truncate((count + 1) * EVENT_RECORD.size)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(event_header())
+
+    def begin_game(self):
+        game = self.next_game
+        self.next_game += 1
+        return game
+
+    def write(self, *fields):
+        self.buffer += EVENT_RECORD.pack(*fields)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+class EventArchive:
+    """Read-only, memory-mapped view of an event log.
+
+    Records are unpacked straight from the mapping; filtering by kind scans
+    only the kind byte column, so skipped records are never parsed.
+    """
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < EVENT_RECORD.size:
+            raise ValueError(f"{path} is not an event log (too short)")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:EVENT_RECORD.size] != event_header():
+            self.close()
+            raise ValueError(f"{path} is not an event log (bad header)")
+        # Record terakhir yang belum lengkap (penulisan terputus) diabaikan
+        self.count = size // EVENT_RECORD.size - 1
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        return Event._make(EVENT_RECORD.unpack_from(self.map, (index + 1) * EVENT_RECORD.size))
+
+    def __iter__(self):
+        return self.events()
+
+    def events(self, kinds=None, game=None):
+        """Iterate Events, optionally only the given kinds (names or EVT_ ids) and one game"""
+        size = EVENT_RECORD.size
+        end = (self.count + 1) * size
+        view = memoryview(self.map)[size:end]
+        if kinds is None:
+            for fields in EVENT_RECORD.iter_unpack(view):
+                if game is None or fields[0] == game:
+                    yield Event._make(fields)
+            return
+        wanted = self.kind_ids(kinds)
+        column = self.map[size + EVENT_KIND_OFFSET:end:size]
+        hits = []
+        for kind in wanted:
+            index = column.find(kind)
+            while index != -1:
+                hits.append(index)
+                index = column.find(kind, index + 1)
+        for index in sorted(hits):
+            fields = EVENT_RECORD.unpack_from(view, index * size)
+            if game is None or fields[0] == game:
+                yield Event._make(fields)
+
+    @staticmethod
+    def kind_ids(kinds):
+        by_name = {name: kind for kind, name in EVENT_NAMES.items()}
+        ids = []
+        for kind in kinds:
+            if isinstance(kind, str):
+                if kind not in by_name:
+                    raise ValueError(f"Unknown event kind '{kind}' (use {', '.join(by_name)})")
+                kind = by_name[kind]
+            ids.append(bytes([kind]))
+        return ids
+
+    def kind_counts(self):
+        size = EVENT_RECORD.size
+        column = self.map[size + EVENT_KIND_OFFSET:(self.count + 1) * size:size]
+        return {name: column.count(bytes([kind])) for kind, name in EVENT_NAMES.items()}
+
+    def to_numpy(self, kinds=None):
+        """Records as a NumPy structured array; without kinds it is a view on the mapping"""
+        if np is None:
+            raise RuntimeError("to_numpy needs NumPy (pip install numpy)")
+        formats = ['<u4', '<u2', 'u1', 'u1', 'u1', 'u1', 'u1', 'u1', '<u8', '<u4']
+        offsets = [0, 4, 6, 7, 8, 9, 10, 11, 12, 20]
+        dtype = np.dtype({'names': list(EVENT_FIELDS), 'formats': formats, 'offsets': offsets,
+                          'itemsize': EVENT_RECORD.size})
+        records = np.frombuffer(self.map, dtype=dtype, count=self.count, offset=EVENT_RECORD.size)
+        if kinds is not None:
+            wanted = [k[0] for k in self.kind_ids(kinds)]
+            records = records[np.isin(records['kind'], wanted)]
+        return records
+
+    def close(self):
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # masih ada view NumPy/memoryview yang memakai mapping
+        self.file.close()
+
+# --- Event bus: live fan-out of the event stream to many subscribers ---
+
+BUS_POLICIES = ('drop_oldest', 'drop_newest', 'coalesce')
+
+class Subscription:
+    """One subscriber's bounded queue on an EventBus.
+
+    policy says what a full queue does: drop_oldest keeps the newest maxlen
+    events, drop_newest refuses new ones until the subscriber catches up,
+    coalesce keeps only the latest event per key(event) (default: one per
+    game, all a spectator needs). drain() hands out up to batch events.
+    """
+    def __init__(self, bus, maxlen=4096, policy='drop_oldest', kinds=None, key=None, batch=256):
+        if policy not in BUS_POLICIES:
+            raise ValueError(f"Unknown policy '{policy}' (use {', '.join(BUS_POLICIES)})")
+        self.bus = bus
+        self.maxlen = maxlen
+        self.policy = policy
+        self.kinds = frozenset(kinds) if kinds else None
+        self.key = key or (lambda event: event.game)
+        self.batch = batch
+        self.queue = deque(maxlen=maxlen if policy == 'drop_oldest' else None)
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.received = self.delivered = self.dropped = 0
+        self.thread = None
+        self.closed = False
+
+    def offer(self, events):
+        """Called by EventBus.flush(); never blocks on the consumer"""
+        self.received += len(events)
+        if self.policy == 'drop_oldest':
+            overflow = len(self.queue) + len(events) - self.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self.queue.extend(events)
+        elif self.policy == 'drop_newest':
+            room = max(self.maxlen - len(self.queue), 0)
+            if room < len(events):
+                self.dropped += len(events) - room
+                events = events[:room]
+            self.queue.extend(events)
+        else:
+            with self.lock:
+                latest = self.latest
+                before = len(latest)
+                latest.update(zip(map(self.key, events), events))
+                # Event yang menimpa event lama dengan key yang sama ikut dihitung sebagai dropped
+                self.dropped += before + len(events) - len(latest)
+                while len(latest) > self.maxlen:
+                    del latest[next(iter(latest))]
+                    self.dropped += 1
+        if not self.ready.is_set():
+            self.ready.set()
+
+    def pending(self):
+        return len(self.latest) if self.policy == 'coalesce' else len(self.queue)
+
+    def drain(self, max_items=None):
+        """Up to max_items (default batch) queued events, oldest first"""
+        n = max_items or self.batch
+        if self.policy == 'coalesce':
+            with self.lock:
+                batch = [self.latest.pop(key) for key in list(islice(self.latest, n))]
+        else:
+            batch = []
+            popleft = self.queue.popleft
+            try:
+                for _ in range(n):
+                    batch.append(popleft())
+            except IndexError:
+                pass
+        self.delivered += len(batch)
+        return batch
+
+    def wait(self, timeout=None):
+        """Block until something is queued (or timeout); True if there is"""
+        self.ready.clear()
+        if self.pending():
+            return True
+        return self.ready.wait(timeout)
+
+    def start(self, callback):
+        """Deliver batches to callback(events) on a daemon thread of its own"""
+        def run():
+            while not self.closed:
+                batch = self.drain()
+                if batch:
+                    callback(batch)
+                else:
+                    self.wait(0.1)
+        self.thread = threading.Thread(target=run, daemon=True, name="bus-subscriber")
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.closed = True
+        self.bus.unsubscribe(self)
+        self.ready.set()
+
+    def stats(self):
+        return {'received': self.received, 'delivered': self.delivered, 'dropped': self.dropped,
+                'queued': self.pending()}
+
+class EventBus:
+    """Fans game Events out to many subscribers without ever waiting on them.
+
+    publish() only appends to a pending batch. Every batch events, and at
+    game over, flush() copies the batch into each subscriber's queue with
+    one extend, so the cost per event shrinks with the batch size and no
+    subscriber code runs in the turn loop. Subscriptions that filter on
+    kinds share one filtered copy of the batch per distinct filter.
+    """
+    def __init__(self, batch=32):
+        self.batch = batch
+        self.pending = []
+        self.subscribers = []
+        self.published = 0
+
+    def subscribe(self, maxlen=4096, policy='drop_oldest', kinds=None, key=None, batch=256):
+        subscription = Subscription(self, maxlen, policy, kinds, key, batch)
+        # Copy-on-write: flush() di thread lain tetap melihat daftar yang utuh
+        self.subscribers = self.subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers = [s for s in self.subscribers if s is not subscription]
+
+    def publish(self, event):
+        self.pending.append(event)
+        if len(self.pending) >= self.batch or event.kind == EVT_GAME_OVER:
+            self.flush()
+
+    def flush(self):
+        events, self.pending = self.pending, []
+        if not events:
+            return
+        self.published += len(events)
+        filtered = {}
+        for subscription in self.subscribers:
+            kinds = subscription.kinds
+            if kinds is None:
+                subscription.offer(events)
+                continue
+            batch = filtered.get(kinds)
+            if batch is None:
+                batch = filtered[kinds] = [e for e in events if e.kind in kinds]
+            if batch:
+                subscription.offer(batch)
+
+# --- Recorded games: seed + actions, replayed as a regression check ---
+
+def state_text(state):
+    """Compact text of a GameState: hands, table, deck, flags and skills in hex"""
+    return ':'.join(format(v, 'x') for v in state.hands + (state.table, state.deck, state.flags, state.skills))
+
+def state_from_text(logic, text):
+    values = [int(v, 16) for v in text.split(':')]
+    return GameState(logic, tuple(values[:-4]), *values[-4:])
+
+def describe_state_diff(logic, expected, actual):
+    """Readable lines for every field that differs between two state_text strings"""
+    exp, act = state_from_text(logic, expected), state_from_text(logic, actual)
+    cards = lambda mask: ' '.join(str(c) for c in logic.mask_cards(mask)) or '-'
+    lines = []
+    for i, (a, b) in enumerate(zip(exp.hands, act.hands)):
+        if a != b:
+            lines.append(f"hand {i}: expected {cards(a)} | got {cards(b)}")
+    for name, a, b in (('table', exp.table, act.table), ('deck', exp.deck, act.deck)):
+        if a != b:
+            lines.append(f"{name}: expected {cards(a)} | got {cards(b)}")
+    for name in ('current', 'pass_count', 'last_type', 'last_val', 'is_first_round', 'over', 'winner',
+                 'round_count'):
+        if getattr(exp, name) != getattr(act, name):
+            lines.append(f"{name}: expected {getattr(exp, name)} | got {getattr(act, name)}")
+    if exp.flags != act.flags and not lines:
+        lines.append(f"flags (shield/skip/wild): expected {exp.flags:x} | got {act.flags:x}")
+    if exp.skills != act.skills:
+        lines.append(f"skills: expected {exp.skills:x} | got {act.skills:x}")
+    return lines
+
+def skill_action(engine, skill, target_index):
+    index = [s.effect_type for s in engine.logic.special_skills].index(skill.effect_type)
+    return SKILL_ACTION | index << 4 | (engine.current if target_index is None else target_index)
+
+class GameRecord:
+    """One game as its seed, rules, lineup and the action (plus state before it) of every decision"""
+    def __init__(self, seed, rules, lineup, actions=None, states=None, final=None, winner=None):
+        self.seed = seed
+        self.rules = rules  # RuleConfig.to_dict()
+        self.lineup = lineup
+        self.actions = actions or []
+        self.states = states or []
+        self.final = final
+        self.winner = winner
+
+    def add(self, engine, action):
+        self.states.append(state_text(GameState.from_engine(engine)))
+        self.actions.append(action)
+
+    def finish(self, engine):
+        self.final = state_text(GameState.from_engine(engine))
+        self.winner = engine.winner
+
+    def to_dict(self):
+        return {'seed': self.seed, 'rules': self.rules, 'lineup': self.lineup, 'winner': self.winner,
+                'actions': ','.join(format(a, 'x') for a in self.actions),
+                'states': self.states, 'final': self.final}
+
+    @classmethod
+    def from_dict(cls, data):
+        actions = [int(a, 16) for a in data['actions'].split(',')] if data['actions'] else []
+        return cls(data['seed'], data['rules'], data['lineup'], actions, data['states'], data['final'],
+                   data['winner'])
+
+class RecordingAI:
+    """Seat AI wrapper that adds every decision of the inner AI to a GameRecord"""
+    def __init__(self, inner, record):
+        self.inner = inner
+        self.record = record
+        self.name = inner.name
+
+    def choose_skill(self, engine):
+        choice = self.inner.choose_skill(engine)
+        if choice:
+            skill, target_index = choice
+            # Target dipilih di sini (ai_rng, urutan sama) supaya tersimpan di action
+            if target_index is None and skill.effect_type in engine.TARGETED_SKILLS:
+                target_index = engine.choose_skill_target(skill, engine.current)
+            self.record.add(engine, skill_action(engine, skill, target_index))
+            choice = (skill, target_index)
+        return choice
+
+    def choose_play(self, engine):
+        play = self.inner.choose_play(engine)
+        self.record.add(engine, cards_mask(play) if play else PASS_ACTION)
+        return play
+
+class ReplayDivergence(Exception):
+    def __init__(self, index, message, expected=None, actual=None):
+        super().__init__(message)
+        self.index = index
+        self.expected = expected
+        self.actual = actual
+
+class ReplayAI:
+    """Seat AI that plays back a GameRecord, checking the state before every action.
+    With inner AIs (one per seat) it also checks they still choose the recorded action."""
+    name = 'replay'
+
+    def __init__(self, record, inner=None):
+        self.record = record
+        self.inner = inner
+        self.index = 0
+
+    def next_action(self, engine):
+        i = self.index
+        if i >= len(self.record.actions):
+            raise ReplayDivergence(i, "game goes on after the last recorded action")
+        actual = state_text(GameState.from_engine(engine))
+        if actual != self.record.states[i]:
+            raise ReplayDivergence(i, "state differs before action", self.record.states[i], actual)
+        return self.record.actions[i]
+
+    def choose_skill(self, engine):
+        recorded = (self.index < len(self.record.actions)
+                    and self.record.actions[self.index] & SKILL_ACTION)
+        if self.inner:
+            choice = self.inner[engine.current].choose_skill(engine)
+            if choice and choice[1] is None and choice[0].effect_type in engine.TARGETED_SKILLS:
+                choice = (choice[0], engine.choose_skill_target(choice[0], engine.current))
+            if bool(choice) != bool(recorded):
+                raise ReplayDivergence(self.index, f"AI {'used ' + choice[0].effect_type if choice else 'kept its skills'}"
+                                                   f", recording {'used a skill' if recorded else 'did not'}")
+        if not recorded:
+            return None
+        action = self.next_action(engine)
+        if self.inner and skill_action(engine, *choice) != action:
+            raise ReplayDivergence(self.index, f"AI chose skill action {skill_action(engine, *choice):x}, "
+                                               f"recorded {action:x}")
+        self.index += 1
+        skill = engine.logic.special_skills[action >> 4 & 15]
+        return skill, (action & 15 if skill.effect_type in engine.TARGETED_SKILLS else None)
+
+    def choose_play(self, engine):
+        action = self.next_action(engine)
+        if action & SKILL_ACTION:
+            raise ReplayDivergence(self.index, "engine asked for a play, recording has a skill")
+        if self.inner:
+            play = self.inner[engine.current].choose_play(engine)
+            if (cards_mask(play) if play else PASS_ACTION) != action:
+                raise ReplayDivergence(self.index, f"AI chose {play or 'pass'}, recorded "
+                                                   f"{engine.logic.mask_cards(action) or 'pass'}")
+        self.index += 1
+        if not action:
+            return None
+        cards = [c for c in engine.players[engine.current].cards if action >> c.id & 1]
+        if (len(cards) != bin(action).count('1')
+                or not engine.logic.is_valid_play(cards, engine.last_cards, engine.last_type, engine.last_val,
+                                                  engine.is_first_round, engine.wild_play_active)):
+            raise ReplayDivergence(self.index - 1, f"recorded play {engine.logic.mask_cards(action)} is not legal")
+        return cards
+
+def record_games(rules, games, seed, lineup):
+    """Play seeded games and return their GameRecords"""
+    engine = GameEngine(rules)
+    records = []
+    for g in range(games):
+        game_seed = seed * 1000003 + g
+        engine.reseed(game_seed)
+        record = GameRecord(game_seed, rules.to_dict(), list(lineup))
+        engine.seat_ai = [RecordingAI(make_seat_ai(spec), record) for spec in lineup]
+        engine.play_game()
+        record.finish(engine)
+        records.append(record)
+    return records
+
+def replay_game(record, check_ai=False, engine=None):
+    """Replay one GameRecord. Raises ReplayDivergence at the first difference"""
+    rules = RuleConfig(**record.rules)
+    if engine is None or engine.rules.to_dict() != record.rules:
+        engine = GameEngine(rules)
+    engine.reseed(record.seed)
+    replay = ReplayAI(record, [make_seat_ai(spec) for spec in record.lineup] if check_ai else None)
+    engine.seat_ai = [replay] * rules.num_players
+    engine.play_game()
+    if replay.index != len(record.actions):
+        raise ReplayDivergence(replay.index, f"game ended after {replay.index} of {len(record.actions)} actions")
+    final = state_text(GameState.from_engine(engine))
+    if final != record.final or engine.winner != record.winner:
+        raise ReplayDivergence(replay.index, "final state differs", record.final, final)
+    return engine
+
+def save_corpus(path, records):
+    opener = gzip.open if path.endswith('.gz') else open
+    tmp = path + '.tmp'
+    with opener(tmp, 'wt', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record.to_dict(), separators=(',', ':')) + '\n')
+    os.replace(tmp, path)
+
+def load_corpus(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield GameRecord.from_dict(json.loads(line))
+
+def run_simulation(rules, games, seed=None, seat_ai=None, event_log=None, beat_table=None, event_bus=None):
+    """Play games headless and return per-seat win counts and timing"""
+    engine = GameEngine(rules, seed=seed)
+    engine.event_log = event_log
+    engine.event_bus = event_bus
+    engine.beat_table = beat_table
+    if seat_ai:
+        engine.seat_ai = list(seat_ai)
+    wins = [0] * rules.num_players
+    unfinished = 0
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        winner = engine.play_game()
+        turns += engine.turns_played
+        if winner is None:
+            unfinished += 1
+        else:
+            wins[winner] += 1
+    elapsed = time.perf_counter() - start
+    return {'wins': wins, 'unfinished': unfinished, 'turns': turns, 'seconds': elapsed,
+            'games_per_sec': games / elapsed if elapsed else 0.0}
+
+# --- Batched engine: many skill-less games in lockstep as NumPy arrays ---
+
+class LowestComboAI(GreedyAI):
+    """Greedy limited to singles, pairs and triples, never using skills.
+    The object-engine reference for the BatchEngine policy"""
+    name = 'lowest'
+    ponderable = False
+
+    def choose_play(self, engine):
+        plays = engine.logic.find_valid_plays(engine.players[engine.current].cards, engine.last_cards,
+                                              engine.last_type, engine.last_val, engine.is_first_round)
+        return engine.logic.choose_best_play([play for play in plays if len(play) <= 3])
+
+    def choose_skill(self, engine):
+        return None
+
+class BatchEngine:
+    """K games advanced one turn per step(), all at once.
+
+    hands is a (K, players) uint64 array of 52-bit card masks; the table
+    (combo size 0-3 and rank), pass_count, current player and first-round
+    flag are (K,) arrays. The one policy is LowestComboAI's: lead with the
+    largest single/pair/triple of the lowest rank, follow with the lowest
+    rank that beats the table, taking the lowest suits of that rank; pass
+    otherwise. There are no skills and no 5-card combos. With verify=True
+    every play is also checked with GameLogic.is_valid_play (slow).
+    """
+    def __init__(self, rules, games, seed=None, verify=False):
+        if np is None:
+            raise RuntimeError("The batched engine needs NumPy")
+        compiled = rules.compile()
+        self.rules = rules
+        self.k = games
+        self.n = rules.num_players
+        self.pass_limit = compiled.pass_limit
+        self.sort_key = np.array(compiled.sort_key)
+        # Kolom suit diurutkan dari suit terendah menurut aturan
+        self.suit_cols = np.argsort([compiled.suit_value[s] for s in range(4)])
+        self.ranks = np.arange(13)
+        self.shifts = np.arange(52, dtype=np.uint64)
+        self.rng = np.random.default_rng(seed)
+        self.logic = GameLogic(rules) if verify else None
+
+    def deal(self, hands=None):
+        """New games from a (K, players) array of hand masks, or shuffled ones"""
+        k, n = self.k, self.n
+        if hands is None:
+            cards = self.rules.cards_per_hand
+            order = np.argsort(self.rng.random((k, 52)), axis=1)[:, :n * cards].reshape(k, cards, n)
+            hands = np.bitwise_or.reduce(np.uint64(1) << order.astype(np.uint64), axis=1)
+        self.hands = np.array(hands, dtype=np.uint64).reshape(k, n)
+        dealt = np.bitwise_or.reduce(self.hands, axis=1)
+        bits = (dealt[:, None] >> self.shifts) & np.uint64(1)
+        # Kartu pembuka: kartu terendah yang dibagikan; pemegangnya mulai
+        self.opening = np.where(bits == 1, self.sort_key, 1 << 20).argmin(axis=1)
+        held = (self.hands >> self.opening[:, None].astype(np.uint64)) & np.uint64(1)
+        self.current = held.argmax(axis=1)
+        self.table_size = np.zeros(k, dtype=np.int64)
+        self.table_rank = np.full(k, -1, dtype=np.int64)
+        self.pass_count = np.zeros(k, dtype=np.int64)
+        self.first = np.ones(k, dtype=bool)
+        self.over = np.zeros(k, dtype=bool)
+        self.winner = np.full(k, -1, dtype=np.int64)
+        self.turns = np.zeros(k, dtype=np.int64)
+
+    def step(self):
+        """One turn for every unfinished game. Returns how many were still playing"""
+        games = np.flatnonzero(~self.over)
+        if not len(games):
+            return 0
+        cur = self.current[games]
+        hand = self.hands[games, cur]
+        bits = ((hand[:, None] >> self.shifts) & np.uint64(1)).astype(np.int64).reshape(-1, 13, 4)
+        counts = bits.sum(axis=2)
+
+        size = self.table_size[games]
+        floor = self.table_rank[games].copy()
+        lead = size == 0
+        size = np.where(lead, np.minimum(counts.max(axis=1), 3), size)
+        first = self.first[games]
+        if first.any():
+            # Ronde pertama: kombinasi terbesar yang memuat kartu pembuka
+            opening_rank = self.opening[games] >> 2
+            opening_count = counts[np.arange(len(games)), opening_rank]
+            size = np.where(first, np.minimum(opening_count, 3), size)
+            floor = np.where(first, opening_rank - 1, floor)
+        eligible = (counts >= size[:, None]) & (self.ranks > floor[:, None])
+        if first.any():
+            eligible &= ~first[:, None] | (self.ranks == (self.opening[games] >> 2)[:, None])
+        plays = eligible.any(axis=1)
+        rank = eligible.argmax(axis=1)
+
+        # Suit terendah dulu sebanyak size kartu dari rank itu
+        rank_bits = bits[np.arange(len(games)), rank][:, self.suit_cols]
+        take = rank_bits * (np.cumsum(rank_bits, axis=1) <= size[:, None])
+        ids = (rank[:, None] * 4 + self.suit_cols).astype(np.uint64)
+        masks = np.bitwise_or.reduce(take.astype(np.uint64) << ids, axis=1)
+        masks[~plays] = 0
+        if self.logic is not None:
+            self.verify(games, masks, size, floor, first)
+
+        played = games[plays]
+        self.hands[played, cur[plays]] &= ~masks[plays]
+        self.table_size[played] = size[plays]
+        self.table_rank[played] = rank[plays]
+        self.pass_count[played] = 0
+        self.first[played] = False
+        out = played[self.hands[played, cur[plays]] == 0]
+        self.over[out] = True
+        self.winner[out] = self.current[out]
+
+        passed = games[~plays]
+        self.pass_count[passed] += 1
+        clear = passed[self.pass_count[passed] >= self.pass_limit]
+        self.table_size[clear] = 0
+        self.table_rank[clear] = -1
+        self.pass_count[clear] = 0
+
+        self.turns[games] += 1
+        moving = games[~self.over[games]]
+        self.current[moving] = (self.current[moving] + 1) % self.n
+        return len(games)
+
+    def verify(self, games, masks, size, floor, first):
+        """Check each play against GameLogic.is_valid_play on the same table"""
+        logic = self.logic
+        for i, g in enumerate(games):
+            if not masks[i]:
+                continue
+            logic.opening_id = int(self.opening[g])
+            table = []
+            if self.table_size[g]:
+                table = [CARDS[int(self.table_rank[g]) * 4 + s] for s in range(int(self.table_size[g]))]
+            last_type, last_val = logic.get_combo_type(table)
+            cards = logic.mask_cards(int(masks[i]))
+            if not logic.is_valid_play(cards, table, last_type, last_val, bool(first[i])):
+                raise AssertionError(f"game {g}: {cards} is not a valid play on {table}")
+
+    def run(self, max_turns=5000):
+        """Play every game to the end (or max_turns steps)"""
+        for _ in range(max_turns):
+            if not self.step():
+                break
+        return self.winner
+
+def run_batch_simulation(rules, games, batch=4096, seed=None, verify=False):
+    """games skill-less games on BatchEngine, batch at a time; win counts and timing"""
+    engine = BatchEngine(rules, min(batch, games), seed=seed, verify=verify)
+    wins = [0] * rules.num_players
+    turns = unfinished = played = 0
+    start = time.perf_counter()
+    while played < games:
+        if games - played < engine.k:
+            engine = BatchEngine(rules, games - played, seed=int(engine.rng.integers(1 << 31)), verify=verify)
+        engine.deal()
+        winners = engine.run()
+        counts = np.bincount(winners[winners >= 0], minlength=rules.num_players)
+        for i in range(rules.num_players):
+            wins[i] += int(counts[i])
+        unfinished += int((winners < 0).sum())
+        turns += int(engine.turns.sum())
+        played += engine.k
+    elapsed = time.perf_counter() - start
+    return {'wins': wins, 'unfinished': unfinished, 'turns': turns, 'seconds': elapsed,
+            'games_per_sec': games / elapsed if elapsed else 0.0}
+
+def compare_batch_engine(rules, games, seed=None):
+    """Play the same deals on GameEngine with LowestComboAI and on BatchEngine.
+    Returns the number of games whose winner or turn count differ"""
+    engine = GameEngine(rules, seed=seed)
+    engine.seat_ai = [LowestComboAI()] * rules.num_players
+    deals, winners, turns = [], [], []
+    for _ in range(games):
+        engine.deal()
+        deals.append([cards_mask(p.cards) for p in engine.players])
+        winners.append(engine.play_game(deal=False))
+        turns.append(engine.turns_played)
+    batch = BatchEngine(rules, games, verify=True)
+    batch.deal(deals)
+    batch.run()
+    return sum(1 for g in range(games)
+               if batch.winner[g] != winners[g] or batch.turns[g] != turns[g])
+
+# --- Checkpoints for long runs ---
+
+def rng_state(rng):
+    """random.Random state as JSON-friendly lists"""
+    version, internal, gauss = rng.getstate()
+    return [version, list(internal), gauss]
+
+def restore_rng(rng, state):
+    version, internal, gauss = state
+    rng.setstate((version, tuple(internal), gauss))
+
+class Checkpoint:
+    """Progress of a long run in a JSON file, replaced atomically (write .tmp, fsync, rename).
+
+    config identifies the run (rules, seed, sizes); load() refuses a file
+    written for another config so a resume never mixes two runs. save()
+    skips the write until every seconds have passed since the last one, so
+    it can be called after each batch without costing throughput. A path of
+    None turns checkpointing off.
+    """
+    def __init__(self, path, config, every=30.0):
+        self.path = path
+        # Lewat JSON dulu supaya tuple dan list dibandingkan sama
+        self.config = json.loads(json.dumps(config))
+        self.every = every
+        self.last_save = time.monotonic()
+        self.saves = 0
+
+    def load(self):
+        """Saved state of this run, or None if there is no checkpoint yet"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('config') != self.config:
+            raise ValueError(f"Checkpoint {self.path} belongs to a different run; delete it to start over")
+        return data['state']
+
+    def save(self, state, force=False):
+        if not self.path:
+            return False
+        now = time.monotonic()
+        if not force and now - self.last_save < self.every:
+            return False
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'config': self.config, 'state': state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.last_save = now
+        self.saves += 1
+        return True
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+# --- Learned evaluation (self-play -> shards -> train -> LearnedAI) ---
+
+SKILL_EFFECTS = ['force_discard', 'shield', 'peek', 'swap', 'skip', 'chaos', 'draw_lucky', 'wild_play']
+FEATURE_NAMES = (['hand_size', 'opp_min', 'opp_mean', 'next_size', 'twos', 'aces', 'pairs', 'table_free',
+                  'table_val', 'passes', 'skills_held', 'shield', 'first_round',
+                  'is_pass', 'play_cards', 'play_single', 'play_pair', 'play_triple', 'play_five',
+                  'play_strength', 'cards_after', 'twos_used', 'breaks_group', 'goes_out', 'is_skill']
+                 + ['skill_' + s for s in SKILL_EFFECTS] + ['target_size', 'target_shield'])
+# Baris shard = fitur + skor akhir kursi itu (kolom terakhir)
+SAMPLE_WIDTH = len(FEATURE_NAMES) + 1
+
+def state_features(engine, player_index):
+    """Features of the table as seen by player_index (first 13 of FEATURE_NAMES)"""
+    n = len(engine.players)
+    per_hand = float(engine.rules.cards_per_hand)
+    cards = engine.players[player_index].cards
+    others = [len(engine.players[i].cards) for i in range(n) if i != player_index]
+    ranks = Counter(c.id >> 2 for c in cards)
+    return [len(cards) / per_hand, min(others) / per_hand, sum(others) / len(others) / per_hand,
+            len(engine.players[(player_index + 1) % n].cards) / per_hand,
+            ranks[12] / 4.0, ranks[11] / 4.0, sum(1 for r in ranks.values() if r >= 2) / 6.0,
+            float(not engine.last_type), engine.last_val / 15.0,
+            engine.pass_count / float(engine.compiled.pass_limit),
+            len(engine.players[player_index].special_skills) / 3.0,
+            float(engine.players[player_index].shield_active), float(engine.is_first_round)]
+
+def play_features(engine, player_index, play, base=None):
+    """State features plus the features of playing play (None = pass)"""
+    row = list(base or state_features(engine, player_index))
+    cards = engine.players[player_index].cards
+    if not play:
+        return row + [1.0, 0, 0, 0, 0, 0, 0, len(cards) / float(engine.rules.cards_per_hand),
+                      0, 0, 0, 0] + [0] * len(SKILL_EFFECTS) + [0, 0]
+    combo, value = engine.logic.get_combo_type(play)
+    played = Counter(c.id >> 2 for c in play)
+    held = Counter(c.id >> 2 for c in cards)
+    breaks = sum(1 for r, k in played.items() if held[r] > k)
+    left = len(cards) - len(play)
+    return row + [0.0, len(play) / 5.0, float(combo == 'single'), float(combo == 'pair'),
+                  float(combo == 'triple'), float(combo in FIVE_CARD_TYPES), value / 15.0,
+                  left / float(engine.rules.cards_per_hand), played[12] / 4.0, breaks / 5.0,
+                  float(left == 0), 0] + [0] * len(SKILL_EFFECTS) + [0, 0]
+
+def skill_features(engine, player_index, skill, target_index, base=None):
+    """State features plus the features of using skill on target_index (skill None = keep skills)"""
+    row = list(base or state_features(engine, player_index))
+    per_hand = float(engine.rules.cards_per_hand)
+    action = [0.0] * 12 + [0.0] * len(SKILL_EFFECTS) + [0.0, 0.0]
+    action[7] = len(engine.players[player_index].cards) / per_hand
+    if skill is not None:
+        action[11] = 1.0
+        action[12 + SKILL_EFFECTS.index(skill.effect_type)] = 1.0
+        if target_index is not None:
+            target = engine.players[target_index]
+            action[-2] = len(target.cards) / per_hand
+            action[-1] = float(target.shield_active)
+    return row + action
+
+def candidate_plays(engine, cards):
+    """Valid plays for the learned AI: every small combo, the cheapest 5-card combo per
+    (type, strength), and pass when the table is not free"""
+    plays = engine.logic.find_valid_plays(cards, engine.last_cards, engine.last_type, engine.last_val,
+                                          engine.is_first_round)
+    small = [p for p in plays if len(p) < 5]
+    five = {}
+    for play in plays:
+        if len(play) == 5:
+            key = engine.logic.get_combo_type(play)
+            total = sum(engine.compiled.sort_key[c.id] for c in play)
+            if key not in five or total < five[key][0]:
+                five[key] = (total, play)
+    candidates = small + [p for _, p in five.values()]
+    if engine.last_type or not candidates:
+        candidates.append(None)
+    return candidates
+
+def skill_options(engine, player_index):
+    """(skill, target) choices for a seat, starting with (None, None) = do not use a skill"""
+    options = [(None, None)]
+    seen = set()
+    for skill in engine.players[player_index].special_skills:
+        if skill.effect_type in seen:
+            continue
+        seen.add(skill.effect_type)
+        if skill.effect_type in GameEngine.TARGETED_SKILLS:
+            options += [(skill, t) for t in range(len(engine.players)) if t != player_index]
+        else:
+            options.append((skill, None))
+    return options
+
+class EvalModel:
+    """Linear or one-hidden-layer tanh model predicting a seat's final score.
+
+    Inputs are standardized with the training mean/scale. predict() uses NumPy
+    when it is installed and plain Python otherwise, so the game can load a
+    model without NumPy.
+    """
+    def __init__(self, kind, mean, scale, layers, features=None):
+        self.kind = kind
+        self.mean = mean
+        self.scale = scale
+        self.layers = layers  # [(W rows = outputs, b)], tanh di antara layer
+        self.features = features or FEATURE_NAMES
+        if self.features != FEATURE_NAMES:
+            raise ValueError("Model was trained on a different feature set")
+        self._np_layers = None
+        if np is not None:
+            self._np_layers = [(np.array(w, dtype=np.float64), np.array(b, dtype=np.float64))
+                               for w, b in layers]
+            self._np_mean = np.array(mean)
+            self._np_scale = np.array(scale)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['kind'], data['mean'], data['scale'],
+                   [(layer['W'], layer['b']) for layer in data['layers']], data['features'])
+
+    def save(self, path):
+        data = {'kind': self.kind, 'features': self.features, 'mean': self.mean, 'scale': self.scale,
+                'layers': [{'W': w, 'b': b} for w, b in self.layers]}
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def predict(self, rows):
+        if self._np_layers is not None:
+            x = (np.array(rows, dtype=np.float64) - self._np_mean) / self._np_scale
+            for i, (w, b) in enumerate(self._np_layers):
+                x = x @ w.T + b
+                if i < len(self._np_layers) - 1:
+                    x = np.tanh(x)
+            return x[:, 0].tolist()
+
+        scores = []
+        for row in rows:
+            x = [(v - m) / s for v, m, s in zip(row, self.mean, self.scale)]
+            for i, (w, b) in enumerate(self.layers):
+                x = [sum(wi * xi for wi, xi in zip(w_row, x)) + bi for w_row, bi in zip(w, b)]
+                if i < len(self.layers) - 1:
+                    x = [math.tanh(v) for v in x]
+            scores.append(x[0])
+        return scores
+
+class LearnedAI:
+    """Seat AI that scores every candidate play / skill with an EvalModel"""
+    name = 'learned'
+
+    def __init__(self, model):
+        self.model = model
+        self.moves = 0
+        self.seconds = 0.0
+
+    def score(self, rows):
+        start = time.perf_counter()
+        scores = self.model.predict(rows)
+        self.moves += 1
+        self.seconds += time.perf_counter() - start
+        return scores
+
+    def choose_play(self, engine):
+        index = engine.current
+        candidates = candidate_plays(engine, engine.players[index].cards)
+        if len(candidates) == 1:
+            return candidates[0]
+        base = state_features(engine, index)
+        scores = self.score([play_features(engine, index, p, base) for p in candidates])
+        return candidates[scores.index(max(scores))]
+
+    def choose_skill(self, engine):
+        index = engine.current
+        options = skill_options(engine, index)
+        if len(options) == 1:
+            return None
+        base = state_features(engine, index)
+        scores = self.score([skill_features(engine, index, s, t, base) for s, t in options])
+        skill, target_index = options[scores.index(max(scores))]
+        return (skill, target_index) if skill else None
+
+    def ms_per_move(self):
+        return self.seconds / self.moves * 1000 if self.moves else 0.0
+
+class SelfPlayAI(LearnedAI):
+    """Self-play seat: learned (or greedy, without a model) choices with epsilon exploration.
+    Every decision's features are kept in rows until the game ends."""
+    name = 'selfplay'
+
+    def __init__(self, model=None, epsilon=0.1, rng=None, params=None):
+        super().__init__(model)
+        self.epsilon = epsilon
+        self.rng = rng or random.Random()
+        self.params = params or DEFAULT_AI_PARAMS
+        self.rows = []
+
+    def pick(self, engine, rows, greedy_index):
+        if self.rng.random() < self.epsilon:
+            choice = self.rng.randrange(len(rows))
+        elif self.model is not None:
+            scores = self.score(rows)
+            choice = scores.index(max(scores))
+        else:
+            choice = greedy_index
+        self.rows.append(rows[choice])
+        return choice
+
+    def choose_play(self, engine):
+        index = engine.current
+        cards = engine.players[index].cards
+        candidates = candidate_plays(engine, cards)
+        greedy = engine.ai_find_best_play(cards)
+        greedy_mask = cards_mask(greedy) if greedy else 0
+        masks = [cards_mask(p) if p else 0 for p in candidates]
+        if greedy_mask not in masks:
+            candidates.append(greedy)
+            masks.append(greedy_mask)
+        base = state_features(engine, index)
+        rows = [play_features(engine, index, p, base) for p in candidates]
+        return candidates[self.pick(engine, rows, masks.index(greedy_mask))]
+
+    def choose_skill(self, engine):
+        index = engine.current
+        options = skill_options(engine, index)
+        if len(options) == 1:
+            return None
+        # Pilihan tanpa model mengikuti GreedyAI: skill acak dengan peluang skill_chance, target acak
+        greedy = 0
+        if self.rng.random() < self.params.skill_chance:
+            greedy = self.rng.randrange(1, len(options))
+        base = state_features(engine, index)
+        rows = [skill_features(engine, index, s, t, base) for s, t in options]
+        skill, target_index = options[self.pick(engine, rows, greedy)]
+        return (skill, target_index) if skill else None
+
+class ShardWriter:
+    """Streams float32 sample rows to shard-WWW-KKKK.f32 files of at most rows_per_shard rows"""
+    def __init__(self, out_dir, worker, width=SAMPLE_WIDTH, rows_per_shard=65536):
+        self.out_dir = out_dir
+        self.worker = worker
+        self.width = width
+        self.rows_per_shard = rows_per_shard
+        self.buffer = array('f')
+        self.shards = []
+        os.makedirs(out_dir, exist_ok=True)
+
+    def append(self, row):
+        if len(row) != self.width:
+            raise ValueError(f"Sample row has {len(row)} values, expected {self.width}")
+        self.buffer.extend(row)
+        if len(self.buffer) >= self.rows_per_shard * self.width:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        name = f"shard-{self.worker:03d}-{len(self.shards):04d}.f32"
+        tmp = os.path.join(self.out_dir, name + '.tmp')
+        with open(tmp, 'wb') as f:
+            self.buffer.tofile(f)
+        os.replace(tmp, os.path.join(self.out_dir, name))
+        self.shards.append({'file': name, 'rows': len(self.buffer) // self.width})
+        self.buffer = array('f')
+
+def selfplay_worker(job):
+    """Play job['games'] self-play games and write their samples. Runs in a worker process"""
+    rules, games, seed, worker = job['rules'], job['games'], job['seed'], job['worker']
+    model = EvalModel.load(job['model']) if job.get('model') else None
+    engine = GameEngine(rules, seed=seed)
+    rng = random.Random(seed)
+    seats = [SelfPlayAI(model, job['epsilon'], rng) for _ in range(rules.num_players)]
+    engine.seat_ai = seats
+    writer = ShardWriter(job['out'], worker, rows_per_shard=job.get('rows_per_shard', 65536))
+    every = job.get('checkpoint_games', 0)
+    checkpoint = Checkpoint(os.path.join(job['out'], f"checkpoint-{worker:03d}.json") if every else None,
+                            dict(job, rules=rules.to_dict()))
+    done = 0
+    state = checkpoint.load()
+    if state:
+        # Lanjut tepat dari game berikutnya: shard lama dan posisi semua rng dipulihkan
+        done = state['games']
+        writer.shards = state['shards']
+        restore_rng(engine.rng, state['rng'])
+        restore_rng(engine.ai_rng, state['ai_rng'])
+        restore_rng(rng, state['explore_rng'])
+        engine.games_dealt = done
+    for game in range(done, games):
+        for seat in seats:
+            seat.rows = []
+        engine.play_game()
+        # Skor akhir: 1 untuk pemenang, minus sisa kartu untuk yang lain
+        for i, seat in enumerate(seats):
+            if engine.winner == i:
+                final = 1.0
+            else:
+                final = -len(engine.players[i].cards) / float(rules.cards_per_hand)
+            for row in seat.rows:
+                writer.append(row + [final])
+        if every and (game + 1) % every == 0 and game + 1 < games:
+            # Checkpoint hanya di batas shard, jadi isi buffer tidak pernah hilang
+            writer.flush()
+            checkpoint.save({'games': game + 1, 'shards': writer.shards, 'rng': rng_state(engine.rng),
+                             'ai_rng': rng_state(engine.ai_rng), 'explore_rng': rng_state(rng)}, force=True)
+    writer.flush()
+    return writer.shards
+
+def run_selfplay(rules, games, workers, out_dir, epsilon=0.1, seed=None, model_path=None, checkpoint_games=500):
+    """Split games over worker processes and write out_dir/manifest.json.
+
+    Every checkpoint_games games each worker flushes its shard and saves a
+    checkpoint in out_dir; running the same command again after a crash
+    resumes from there and writes the same shards an uninterrupted run would.
+    """
+    workers = max(1, min(workers, games))
+    os.makedirs(out_dir, exist_ok=True)
+    run = Checkpoint(os.path.join(out_dir, 'checkpoint.json') if checkpoint_games else None,
+                     {'rules': rules.to_dict(), 'games': games, 'workers': workers, 'epsilon': epsilon,
+                      'seed': seed, 'model': model_path, 'checkpoint_games': checkpoint_games})
+    state = run.load()
+    if state:
+        seed = state['seed']
+    else:
+        seed = random.randrange(1 << 30) if seed is None else seed
+        run.save({'seed': seed}, force=True)
+    jobs = [{'rules': rules, 'games': games // workers + (w < games % workers), 'seed': seed + w,
+             'worker': w, 'epsilon': epsilon, 'model': model_path, 'out': out_dir,
+             'checkpoint_games': checkpoint_games}
+            for w in range(workers)]
+    if workers == 1:
+        results = [selfplay_worker(jobs[0])]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(selfplay_worker, jobs)
+    shards = [s for shard_list in results for s in shard_list]
+    manifest = {'features': FEATURE_NAMES, 'width': SAMPLE_WIDTH, 'games': games, 'seed': seed,
+                'shards': shards}
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    # Run selesai: manifest sekarang yang jadi catatannya
+    for w in range(workers):
+        Checkpoint(os.path.join(out_dir, f"checkpoint-{w:03d}.json"), {}).remove()
+    run.remove()
+    return manifest
+
+def load_samples(data_dir):
+    """All shard rows of a self-play directory as one (rows, width) float32 array"""
+    if np is None:
+        raise RuntimeError("Training needs NumPy (pip install numpy)")
+    with open(os.path.join(data_dir, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest['features'] != FEATURE_NAMES:
+        raise ValueError("Self-play data was written with a different feature set")
+    parts = [np.fromfile(os.path.join(data_dir, s['file']), dtype=np.float32).reshape(-1, manifest['width'])
+             for s in manifest['shards']]
+    return np.concatenate(parts) if parts else np.zeros((0, manifest['width']), dtype=np.float32)
+
+def train_model(data, kind='linear', hidden=16, epochs=20, batch=256, lr=0.01, l2=1e-3, seed=0):
+    """Fit an EvalModel to (rows, features + target) data with NumPy only.
+    Returns (model, train_mse, valid_mse) using a 10% hold-out split."""
+    if np is None:
+        raise RuntimeError("Training needs NumPy (pip install numpy)")
+    rng = np.random.default_rng(seed)
+    data = data[rng.permutation(len(data))].astype(np.float64)
+    x, y = data[:, :-1], data[:, -1]
+    split = max(1, len(data) // 10)
+    raw_valid, yv, raw_train, yt = x[:split], y[:split], x[split:], y[split:]
+    mean = raw_train.mean(axis=0)
+    scale = raw_train.std(axis=0)
+    scale[scale < 1e-6] = 1.0
+    xt = (raw_train - mean) / scale
+
+    if kind == 'linear':
+        # Ridge regression, closed form
+        a = np.hstack([xt, np.ones((len(xt), 1))])
+        w = np.linalg.solve(a.T @ a + l2 * len(xt) * np.eye(a.shape[1]), a.T @ yt)
+        layers = [(w[None, :-1], w[-1:])]
+    elif kind == 'mlp':
+        w1 = rng.normal(0, 1 / np.sqrt(x.shape[1]), (hidden, x.shape[1]))
+        b1 = np.zeros(hidden)
+        w2 = rng.normal(0, 1 / np.sqrt(hidden), (1, hidden))
+        b2 = np.zeros(1)
+        params = [w1, b1, w2, b2]
+        moments = [np.zeros_like(p) for p in params]
+        for _ in range(epochs):
+            order = rng.permutation(len(xt))
+            for start in range(0, len(xt), batch):
+                idx = order[start:start + batch]
+                xb, yb = xt[idx], yt[idx]
+                h = np.tanh(xb @ w1.T + b1)
+                err = (h @ w2.T + b2)[:, 0] - yb
+                g_out = err[:, None] * (2.0 / len(idx))
+                g_h = (g_out @ w2) * (1 - h * h)
+                grads = [g_h.T @ xb + l2 * w1, g_h.sum(axis=0), g_out.T @ h + l2 * w2, g_out.sum(axis=0)]
+                # SGD dengan momentum
+                for p, m, g in zip(params, moments, grads):
+                    m *= 0.9
+                    m += g
+                    p -= lr * m
+        layers = [(w1, b1), (w2, b2)]
+    else:
+        raise ValueError(f"Unknown model kind: {kind}")
+
+    model = EvalModel(kind, mean.tolist(), scale.tolist(),
+                      [(np.asarray(w).tolist(), np.asarray(b).tolist()) for w, b in layers])
+    train_mse = float(np.mean((np.array(model.predict(raw_train)) - yt) ** 2))
+    valid_mse = float(np.mean((np.array(model.predict(raw_valid)) - yv) ** 2))
+    return model, train_mse, valid_mse
+
+# --- Parameter search for the AI skill policy ---
+
+def evaluate_params(job):
+    """Win rate of TunedAI(params) against TunedAI(baseline) on every other seat.
+
+    Each deal is played once per seat rotation with the same seed (duplicate
+    format), so seat and deal luck cancel out. Runs in a worker process.
+    """
+    rules, params, baseline = job['rules'], AIParams(**job['params']), AIParams(**job['baseline'])
+    n = rules.num_players
+    engine = GameEngine(rules)
+    wins = games = 0
+    for deal in range(job['games']):
+        for seat in range(n):
+            engine.reseed(job['seed'] * 1000003 + deal)
+            engine.seat_ai = [TunedAI(baseline)] * n
+            engine.seat_ai[seat] = TunedAI(params)
+            wins += engine.play_game() == seat
+            games += 1
+    return wins, games
+
+def search_params(rules, candidates=24, rounds=4, games=25, workers=1, seed=None, log=print,
+                  checkpoint_path=None, checkpoint_secs=30.0):
+    """Random search with racing: every round plays games more deals for each surviving
+    candidate and drops those whose upper bound falls below the leader's lower bound.
+    With checkpoint_path the search resumes after the last saved round.
+    Returns (best AIParams, win rate, games played)."""
+    checkpoint = Checkpoint(checkpoint_path, {'rules': rules.to_dict(), 'candidates': candidates,
+                                              'rounds': rounds, 'games': games, 'seed': seed}, checkpoint_secs)
+    state = checkpoint.load()
+    if state:
+        seed = state['seed']
+        pool = [AIParams(**params) for params in state['pool']]
+        wins, played, alive = state['wins'], state['played'], state['alive']
+        first_round = rounds if len(alive) == 1 else state['round']
+        log(f"resuming at round {first_round + 1} from {checkpoint_path}")
+    else:
+        rng = random.Random(seed)
+        seed = rng.randrange(1 << 20) if seed is None else seed
+        pool = [AIParams()] + [AIParams.sample(rng) for _ in range(candidates - 1)]
+        wins = [0] * len(pool)
+        played = [0] * len(pool)
+        alive = list(range(len(pool)))
+        first_round = 0
+    baseline = DEFAULT_AI_PARAMS.to_dict()
+
+    def bounds(i):
+        rate = wins[i] / played[i]
+        margin = 2 * math.sqrt(max(rate * (1 - rate), 1e-4) / played[i])
+        return rate - margin, rate, rate + margin
+
+    executor = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        for r in range(first_round, rounds):
+            # Semua kandidat memakai deal yang sama dalam satu ronde
+            jobs = [{'rules': rules, 'params': pool[i].to_dict(), 'baseline': baseline,
+                     'games': games, 'seed': seed + r} for i in alive]
+            results = executor.map(evaluate_params, jobs) if executor else [evaluate_params(j) for j in jobs]
+            for i, (w, g) in zip(alive, results):
+                wins[i] += w
+                played[i] += g
+            leader = max(alive, key=lambda i: bounds(i)[1])
+            floor = bounds(leader)[0]
+            dropped = [i for i in alive if bounds(i)[2] < floor]
+            alive = [i for i in alive if i not in dropped]
+            log(f"round {r + 1}: leader #{leader} {bounds(leader)[1]:.3f} after {played[leader]} games, "
+                f"dropped {len(dropped)}, {len(alive)} left")
+            finished = len(alive) == 1 or r + 1 == rounds
+            checkpoint.save({'seed': seed, 'pool': [p.to_dict() for p in pool], 'wins': wins,
+                             'played': played, 'alive': alive, 'round': r + 1}, force=finished)
+            if len(alive) == 1:
+                break
+    finally:
+        if executor:
+            executor.close()
+            executor.join()
+    best = max(alive, key=lambda i: bounds(i)[1])
+    return pool[best], bounds(best)[1], played[best]
+
+# --- A/B experiments (duplicate deals + sequential test) ---
+
+def make_seat_ai(spec):
+    """Seat AI from a lineup entry: 'greedy', 'tuned', 'tuned:params.json', 'learned:model.json'
+    'rollout' (skills by SkillPlanner) or a difficulty tier ('hard', 'hard:params.json')"""
+    kind, _, path = spec.partition(':')
+    if kind == 'greedy':
+        return GreedyAI()
+    if kind == 'tuned':
+        return TunedAI(AIParams.load(path) if path else None)
+    if kind in DIFFICULTY_TIERS:
+        return TieredAI(kind, AIParams.load(path) if path else None)
+    if kind == 'lowest':
+        return LowestComboAI()
+    if kind == 'rollout':
+        return RolloutSkillAI(AIParams.load(path) if path else None)
+    if kind == 'learned' and path:
+        return LearnedAI(EvalModel.load(path))
+    if kind == 'bot' and path:
+        return ExternalBotAI(BotClient.shared(path))
+    raise ValueError(f"Unknown AI '{spec}' (use greedy, tuned[:file], lowest, rollout[:file], learned:file, "
+                     f"bot:command or a difficulty: {', '.join(DIFFICULTY_TIERS)})")
+
+# Nilai per game; focus = kursi yang ditempati AI lineup[0]
+EXPERIMENT_METRICS = {
+    'win0': lambda engine, focus: float(engine.winner == focus),
+    'turns': lambda engine, focus: float(engine.turns_played),
+    'starter_win': lambda engine, focus: float(engine.winner == engine.starter_index),
+    'cards_left': lambda engine, focus: (sum(len(p.cards) for p in engine.players)
+                                         / float(len(engine.players) - 1)),
+}
+
+def play_duplicate(rules, lineup, metric, seed, deal):
+    """Play one deal once per seat rotation. Returns the metric of every game"""
+    n = rules.num_players
+    ais = [make_seat_ai(spec) for spec in lineup]
+    engine = GameEngine(rules)
+    measure = EXPERIMENT_METRICS[metric]
+    values = []
+    # Lineup yang sama semua: setiap rotasi menghasilkan game yang identik
+    rotations = 1 if len(set(lineup)) == 1 else n
+    for rotation in range(rotations):
+        engine.reseed(seed * 1000003 + deal)
+        engine.seat_ai = [ais[(seat + rotation) % n] for seat in range(n)]
+        engine.play_game()
+        values.append(measure(engine, (n - rotation) % n))
+    return values
+
+def experiment_worker(job):
+    """Control and variant games for a range of deals. Runs in a worker process"""
+    results = []
+    for deal in job['deals']:
+        control = play_duplicate(job['control'][0], job['control'][1], job['metric'], job['seed'], deal)
+        variant = play_duplicate(job['variant'][0], job['variant'][1], job['metric'], job['seed'], deal)
+        results.append((control, variant))
+    return results
+
+def msprt_statistic(n, mean, var, tau):
+    """Mixture SPRT likelihood ratio for a zero-mean normal test, N(0, tau^2) mixing prior.
+    The test can be checked after every batch: stopping when it reaches 1/alpha
+    keeps the false positive rate below alpha."""
+    if n < 2 or var <= 0:
+        return 1.0
+    tau2 = tau * tau
+    exponent = n * n * tau2 * mean * mean / (2 * var * (var + n * tau2))
+    return math.sqrt(var / (var + n * tau2)) * math.exp(min(exponent, 700))
+
+def run_experiment(control, variant, metric='win0', max_deals=2000, batch=20, min_deals=40, alpha=0.05,
+                   tau=None, workers=1, seed=None, log=print, checkpoint_path=None, checkpoint_secs=30.0):
+    """Play control and variant (rules, lineup) arms on the same seeded deals, every seat
+    rotation, until the paired difference is significant or max_deals is reached.
+    Without tau the mixing prior is set once, from the first min_deals deals, and
+    kept for the rest of the run. With checkpoint_path the run resumes after the
+    last saved batch."""
+    if metric not in EXPERIMENT_METRICS:
+        raise ValueError(f"Unknown metric '{metric}' (use {', '.join(EXPERIMENT_METRICS)})")
+    for rules, lineup in (control, variant):
+        if len(lineup) != rules.num_players:
+            raise ValueError(f"Lineup has {len(lineup)} AIs for {rules.num_players} players")
+    checkpoint = Checkpoint(checkpoint_path, {
+        'control': [control[0].to_dict(), control[1]], 'variant': [variant[0].to_dict(), variant[1]],
+        'metric': metric, 'max_deals': max_deals, 'batch': batch, 'min_deals': min_deals, 'alpha': alpha,
+        'tau': tau, 'seed': seed}, checkpoint_secs)
+    state = checkpoint.load()
+    if state:
+        seed, tau = state['seed'], state.get('tau', tau)
+        diffs, control_games, variant_games = state['diffs'], state['control_games'], state['variant_games']
+        log(f"resuming after {len(diffs)} deals from {checkpoint_path}")
+    else:
+        seed = random.randrange(1 << 20) if seed is None else seed
+        diffs, control_games, variant_games = [], [], []
+
+    def sample_var(values):
+        m = sum(values) / len(values)
+        return sum((v - m) ** 2 for v in values) / (len(values) - 1) if len(values) > 1 else 0.0
+
+    def sequential_test():
+        nonlocal tau
+        n = len(diffs)
+        mean = sum(diffs) / n
+        if not tau and n >= min_deals:
+            # Tanpa tau: efek yang dicari ~ seperempat simpangan baku per deal dari min_deals
+            # deal pertama, lalu dibekukan. tau yang ikut berubah tiap look merusak jaminan alpha;
+            # hanya varians yang boleh plug-in
+            tau = 0.25 * math.sqrt(sample_var(diffs[:min_deals])) or None
+        stat = msprt_statistic(n, mean, sample_var(diffs), tau) if tau else 1.0
+        return mean, stat, n >= min_deals and stat >= 1 / alpha
+
+    stat = 1.0
+    significant = False
+    if diffs:
+        _, stat, significant = sequential_test()
+    executor = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        while len(diffs) < max_deals and not significant:
+            start = len(diffs)
+            deals = list(range(start, min(start + batch, max_deals)))
+            jobs = [{'control': control, 'variant': variant, 'metric': metric, 'seed': seed,
+                     'deals': deals[w::workers]} for w in range(workers)]
+            chunks = executor.map(experiment_worker, jobs) if executor else [experiment_worker(jobs[0])]
+            # Urut per deal, jadi hasilnya sama untuk jumlah worker berapa pun
+            results = {}
+            for job, chunk in zip(jobs, chunks):
+                results.update(zip(job['deals'], chunk))
+            for deal in deals:
+                c, v = results[deal]
+                control_games += c
+                variant_games += v
+                diffs.append(sum(v) / len(v) - sum(c) / len(c))
+
+            mean, stat, significant = sequential_test()
+            log(f"{len(diffs)} deals: effect {mean:+.4f}, LR {stat:.2f} (stop at {1 / alpha:.0f})")
+            checkpoint.save({'seed': seed, 'tau': tau, 'diffs': diffs, 'control_games': control_games,
+                             'variant_games': variant_games},
+                            force=significant or len(diffs) >= max_deals)
+    finally:
+        if executor:
+            executor.close()
+            executor.join()
+
+    n = len(diffs)
+    mean = sum(diffs) / n
+    var = sample_var(diffs)
+
+    def game_var(values):
+        m = sum(values) / len(values)
+        return sum((v - m) ** 2 for v in values) / max(len(values) - 1, 1)
+
+    played = len(control_games) + len(variant_games)
+    # Game independen (tanpa deal kembar dan rotasi) yang dibutuhkan untuk standard error yang sama
+    if var > 0:
+        independent = 2 * math.ceil((game_var(control_games) + game_var(variant_games)) * n / var)
+    else:
+        independent = played
+    return {'deals': n, 'games': played, 'significant': significant, 'effect': mean,
+            'ci95': 1.96 * math.sqrt(var / n) if n > 1 else float('inf'),
+            'control': sum(control_games) / len(control_games),
+            'variant': sum(variant_games) / len(variant_games),
+            'p_value': min(1.0, 1 / stat), 'independent_games': independent,
+            'max_games': max_deals * played // n, 'seed': seed, 'tau': tau}
+
+# --- Rating ladder (Weng-Lin Bradley-Terry ratings for free-for-all games) ---
+
+def finishing_ranks(engine):
+    """Rank per seat, 0 = best: the winner first, then fewer cards left; equal counts tie"""
+    left = [0 if i == engine.winner else len(p.cards) + 1 for i, p in enumerate(engine.players)]
+    return [sum(other < mine for other in left) for mine in left]
+
+def ladder_worker(job):
+    """Play (seed, lineup) games and return each game's finishing ranks. Runs in a worker process"""
+    engine = GameEngine(job['rules'])
+    ais = {spec: make_seat_ai(spec) for spec in set(s for _, lineup in job['games'] for s in lineup)}
+    results = []
+    for seed, lineup in job['games']:
+        engine.reseed(seed)
+        engine.seat_ai = [ais[spec] for spec in lineup]
+        engine.play_game()
+        results.append((lineup, finishing_ranks(engine)))
+    return results
+
+class RatingLadder:
+    """Incremental ratings (mu, sigma) for AIs playing free-for-all games.
+
+    update() folds one game's finishing order into the ratings with the
+    Weng-Lin Bradley-Terry full-pair update, so nothing is recomputed from
+    the game history. Its variance shrink does not depend on who won, which
+    lets pick_lineups() choose the games that cut total uncertainty most
+    before they are played.
+    """
+    MU = 25.0
+    SIGMA = 25.0 / 3
+    BETA = SIGMA / 2
+    KAPPA = 1e-4
+
+    def __init__(self, names=()):
+        self.ratings = {}
+        self.games = Counter()
+        self.wins = Counter()
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        if name not in self.ratings:
+            self.ratings[name] = [self.MU, self.SIGMA ** 2]
+
+    def pair_terms(self, lineup):
+        """Per seat: list of (other seat, c, p_win) against every seat of another AI"""
+        terms = []
+        for i, a in enumerate(lineup):
+            mu_a, var_a = self.ratings[a]
+            row = []
+            for q, b in enumerate(lineup):
+                # Melawan diri sendiri tidak memberi informasi
+                if b == a:
+                    continue
+                mu_b, var_b = self.ratings[b]
+                c = math.sqrt(var_a + var_b + 2 * self.BETA ** 2)
+                row.append((q, c, 1 / (1 + math.exp((mu_b - mu_a) / c))))
+            terms.append(row)
+        return terms
+
+    def shrink(self, lineup, terms=None):
+        """Variance factor per seat for a game of this lineup (the same whatever the result)"""
+        terms = terms or self.pair_terms(lineup)
+        factors = []
+        for i, a in enumerate(lineup):
+            var_a = self.ratings[a][1]
+            delta = sum(math.sqrt(var_a) / c * var_a / (c * c) * p * (1 - p) for _, c, p in terms[i])
+            factors.append(max(1 - delta, self.KAPPA))
+        return factors
+
+    def update(self, lineup, ranks):
+        """Fold one game in; ranks[i] is seat i's finishing place, 0 = best"""
+        for name in lineup:
+            self.add(name)
+        terms = self.pair_terms(lineup)
+        factors = self.shrink(lineup, terms)
+        # Dihitung dari rating sebelum game; AI yang duduk dua kali mendapat kedua perubahannya
+        changes = []
+        for i, a in enumerate(lineup):
+            var_a = self.ratings[a][1]
+            omega = 0.0
+            for q, c, p in terms[i]:
+                score = 1.0 if ranks[q] > ranks[i] else 0.5 if ranks[q] == ranks[i] else 0.0
+                omega += var_a / c * (score - p)
+            changes.append((a, omega, factors[i]))
+        for a, omega, factor in changes:
+            self.ratings[a][0] += omega
+            self.ratings[a][1] *= factor
+        for i, a in enumerate(lineup):
+            self.games[a] += 1
+            self.wins[a] += ranks[i] == 0 and ranks.count(0) == 1
+
+    def interval(self, name, z=1.96):
+        mu, var = self.ratings[name]
+        return mu - z * math.sqrt(var), mu + z * math.sqrt(var)
+
+    def pick_lineups(self, count, seats, rng, samples=64):
+        """count lineups that most reduce the summed variance, chosen one after another
+        on a copy of the ratings. Small pools try every combination, large ones a sample"""
+        names = sorted(self.ratings)
+        pool = names * seats if len(names) < seats else names
+        options = sorted(set(combinations(sorted(pool), seats)))
+        saved = {name: list(r) for name, r in self.ratings.items()}
+        lineups = []
+        try:
+            for _ in range(count):
+                if len(options) > samples:
+                    candidates = [tuple(sorted(rng.sample(pool, seats))) for _ in range(samples)]
+                else:
+                    candidates = options
+                best = max(candidates, key=lambda lineup: sum(
+                    self.ratings[a][1] * (1 - f) for a, f in zip(lineup, self.shrink(lineup))))
+                for a, factor in zip(best, self.shrink(best)):
+                    self.ratings[a][1] *= factor
+                lineup = list(best)
+                # Kursi diacak supaya posisi duduk tidak memihak
+                rng.shuffle(lineup)
+                lineups.append(lineup)
+        finally:
+            self.ratings = saved
+        return lineups
+
+    def standings(self):
+        """(name, mu, low, high, games, wins) sorted by the conservative estimate mu - 3 sigma"""
+        rows = [(name, mu, *self.interval(name), self.games[name], self.wins[name])
+                for name, (mu, var) in self.ratings.items()]
+        return sorted(rows, key=lambda row: self.ratings[row[0]][0] - 3 * math.sqrt(self.ratings[row[0]][1]),
+                      reverse=True)
+
+    def to_dict(self):
+        return {'ratings': self.ratings, 'games': dict(self.games), 'wins': dict(self.wins)}
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        ladder = cls()
+        ladder.ratings = {name: list(r) for name, r in data['ratings'].items()}
+        ladder.games = Counter(data['games'])
+        ladder.wins = Counter(data['wins'])
+        return ladder
+
+    def save(self, path):
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp, path)
+
+def run_ladder(rules, ladder, games, batch=32, workers=1, seed=None, log=print):
+    """Play games in batches of lineups picked by the ladder, updating as results stream in"""
+    rng = random.Random(seed)
+    played = 0
+    executor = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        while played < games:
+            lineups = ladder.pick_lineups(min(batch, games - played), rules.num_players, rng)
+            jobs = [{'rules': rules, 'games': [(rng.randrange(1 << 30), lineup) for lineup in lineups[w::workers]]}
+                    for w in range(workers)]
+            jobs = [job for job in jobs if job['games']]
+            results = executor.imap_unordered(ladder_worker, jobs) if executor else map(ladder_worker, jobs)
+            for chunk in results:
+                for lineup, ranks in chunk:
+                    ladder.update(lineup, ranks)
+            played += len(lineups)
+            leader = ladder.standings()[0]
+            log(f"{played} games: leader {leader[0]} {leader[1]:.2f} [{leader[2]:.2f}, {leader[3]:.2f}]")
+    finally:
+        if executor:
+            executor.close()
+            executor.join()
+    return ladder
+
+# --- Sampling profiler (SIGPROF timer) for long headless runs ---
+
+class SamplingProfiler:
+    """Statistical profiler on the CPU-time signal timer, standard library only.
+
+    Every interval seconds of process CPU time SIGPROF interrupts the main
+    thread and handle() counts its current stack. The handler only walks
+    frames into a tuple of code objects, so the overhead is one short
+    Python call per sample. write() saves collapsed stacks ('a;b;c count',
+    for flamegraph.pl, speedscope or inferno) and a per-function summary
+    sorted by name, which profile-diff compares between runs. Functions
+    are named file:qualname without line numbers, so edits elsewhere in
+    the file don't rename them.
+    """
+    def __init__(self, interval=0.005):
+        if not hasattr(signal, 'setitimer'):
+            raise RuntimeError("The sampling profiler needs signal.setitimer (not available on Windows)")
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.names = {}
+        self.previous = None
+        self.seconds = 0.0
+
+    def handle(self, signum, frame):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        self.stacks[tuple(codes)] += 1
+        self.samples += 1
+
+    def start(self):
+        self.previous = signal.signal(signal.SIGPROF, self.handle)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        self.seconds = time.perf_counter()
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self.previous or signal.SIG_DFL)
+        self.seconds = time.perf_counter() - self.seconds
+
+    def name(self, code):
+        name = self.names.get(code)
+        if name is None:
+            qualname = getattr(code, 'co_qualname', code.co_name)
+            name = self.names[code] = f"{os.path.basename(code.co_filename)}:{qualname}"
+        return name
+
+    def collapsed(self):
+        """Stack (root first, ';'-joined) -> samples"""
+        stacks = Counter()
+        for codes, count in self.stacks.items():
+            stacks[";".join(self.name(code) for code in reversed(codes))] += count
+        return stacks
+
+    def summary(self):
+        """function -> (self samples, total samples); total counts a function once per sample"""
+        own = Counter()
+        total = Counter()
+        for codes, count in self.stacks.items():
+            names = [self.name(code) for code in codes]
+            own[names[0]] += count
+            for name in set(names):
+                total[name] += count
+        return {name: (own[name], total[name]) for name in total}
+
+    def write(self, path):
+        """Collapsed stacks to path, the per-function summary to path + '.summary'"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.collapsed().items()):
+                f.write(f"{stack} {count}\n")
+        n = max(self.samples, 1)
+        with open(path + '.summary', 'w', encoding='utf-8') as f:
+            f.write(f"# samples {self.samples} interval_ms {self.interval * 1000:g} "
+                    f"wall_s {self.seconds:.2f}\n")
+            f.write("# self%   total%     self    total  function\n")
+            for name, (own, total) in sorted(self.summary().items()):
+                f.write(f"{own / n * 100:7.2f} {total / n * 100:7.2f} {own:8d} {total:8d}  {name}\n")
+        return path + '.summary'
+
+def load_profile_summary(path):
+    """function -> (self%, total%) from a SamplingProfiler summary file"""
+    rows = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('#') or not line.strip():
+                continue
+            own, total, _, _, name = line.split(None, 4)
+            rows[name.strip()] = (float(own), float(total))
+    return rows
+
+# --- External bots: line protocol over the bot's stdin/stdout ---
+#
+#   engine -> bot                                  bot -> engine
+#   bigtwo 1                                       id name <name>, then ready
+#   newgame players 4 cards 13 suits 0123 flush 0 twos 1 opening 0
+#   position <id> <key> <value> ...                (nothing); ids keep increasing
+#                                                  across batches
+#   go <movetime_ms>                               bestmove <id> <action> for every position
+#                                                  sent since the previous go
+#   quit
+#
+# Position keys: seat, phase (play | skill), hand, sizes, table, type, value,
+# passes, first, skills, legal. Cards are hex 52-bit masks and actions are
+# GameState actions in hex (0 = pass / no skill). The bot may answer a batch
+# in any order; positions without an answer before the deadline fall back
+# to the built-in greedy AI.
+
+BOT_PROTOCOL = 'bigtwo 1'
+
+class BotClient:
+    """One persistent external bot process, reused for every game and seat"""
+    GRACE = 0.05  # detik tambahan untuk overhead pipe
+    _shared = {}
+
+    def __init__(self, command, start_timeout=10.0):
+        args = shlex.split(command) if isinstance(command, str) else list(command)
+        self.proc = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     text=True, encoding='utf-8', bufsize=1)
+        self.lines = queue.Queue()
+        self.reader = threading.Thread(target=self.read_loop, daemon=True)
+        self.reader.start()
+        self.name = args[-1]
+        self.queries = self.positions = self.timeouts = self.stale = 0
+        self.seconds = 0.0
+        # Id position terus naik antar query, jadi jawaban telat dari query lama bisa dikenali
+        self.next_id = 0
+        self.send(BOT_PROTOCOL)
+        deadline = time.perf_counter() + start_timeout
+        while True:
+            line = self.readline(deadline)
+            if line is None:
+                self.close()
+                raise RuntimeError(f"Bot '{command}' did not answer the '{BOT_PROTOCOL}' handshake")
+            if line.startswith('id name '):
+                self.name = line[8:]
+            elif line == 'ready':
+                break
+
+    @classmethod
+    def shared(cls, command):
+        """The bot process for command in this process, started on first use"""
+        if command not in cls._shared:
+            cls._shared[command] = cls(command)
+        return cls._shared[command]
+
+    def read_loop(self):
+        for line in self.proc.stdout:
+            self.lines.put(line.strip())
+        self.lines.put(None)
+
+    def readline(self, deadline):
+        try:
+            return self.lines.get(timeout=max(0.0, deadline - time.perf_counter()))
+        except queue.Empty:
+            return None
+
+    def send(self, line):
+        self.proc.stdin.write(line + '\n')
+        self.proc.stdin.flush()
+
+    def new_game(self, rules, opening_id):
+        suits = ''.join(str(SUIT_ORDER.index(s)) for s in rules.suit_order)
+        self.send(f"newgame players {rules.num_players} cards {rules.cards_per_hand} suits {suits} "
+                  f"flush {int(rules.flush_beats_straight)} twos {int(rules.twos_in_straights)} "
+                  f"opening {opening_id}")
+
+    def query(self, positions, movetime_ms=100):
+        """Send positions (dicts with 'legal' action lists) and one go. Returns an action (or
+        None when the bot missed the deadline or answered with an illegal action) per position"""
+        start = time.perf_counter()
+        first = self.next_id
+        self.next_id += len(positions)
+        lines = []
+        for i, pos in enumerate(positions):
+            fields = ' '.join(f"{k} {v}" for k, v in pos.items() if k != 'legal')
+            lines.append(f"position {first + i} {fields} "
+                         f"legal {','.join(format(a, 'x') for a in pos['legal'])}")
+        lines.append(f"go {movetime_ms}")
+        self.proc.stdin.write('\n'.join(lines) + '\n')
+        self.proc.stdin.flush()
+
+        answers = [None] * len(positions)
+        waiting = len(positions)
+        deadline = start + movetime_ms / 1000.0 * len(positions) + self.GRACE
+        while waiting:
+            line = self.readline(deadline)
+            if line is None:
+                self.timeouts += waiting
+                break
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == 'bestmove' and parts[1].isdigit():
+                i = int(parts[1]) - first
+                if i < 0:
+                    self.stale += 1  # jawaban untuk query yang sudah timeout
+                elif i < len(positions) and answers[i] is None:
+                    action = int(parts[2], 16)
+                    answers[i] = action if action in positions[i]['legal'] else None
+                    waiting -= 1
+        self.queries += 1
+        self.positions += len(positions)
+        self.seconds += time.perf_counter() - start
+        return answers
+
+    def close(self):
+        if self.proc.poll() is None:
+            try:
+                self.send('quit')
+                self.proc.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.proc.kill()
+
+def bot_position(engine, phase, legal):
+    """Protocol fields for the current player's view of the engine"""
+    player = engine.players[engine.current]
+    skills = ','.join(s.effect_type for s in player.special_skills) or '-'
+    return {'seat': engine.current, 'phase': phase, 'hand': format(cards_mask(player.cards), 'x'),
+            'sizes': ','.join(str(len(p.cards)) for p in engine.players),
+            'table': format(cards_mask(engine.last_cards), 'x'), 'type': engine.last_type or '-',
+            'value': engine.last_val, 'passes': engine.pass_count, 'first': int(engine.is_first_round),
+            'skills': skills, 'legal': legal}
+
+class ExternalBotAI(GreedyAI):
+    """Seat AI that asks an external bot process; greedy when it misses the deadline"""
+    name = 'bot'
+
+    def __init__(self, client, movetime_ms=100):
+        super().__init__()
+        self.client = client
+        self.movetime_ms = movetime_ms
+        self.game = None
+        self.fallbacks = 0
+
+    def ask(self, engine, phase, legal):
+        game = (id(engine), engine.games_dealt)
+        if game != self.game:
+            self.game = game
+            self.client.new_game(engine.rules, engine.logic.opening_id)
+        action = self.client.query([bot_position(engine, phase, legal)], self.movetime_ms)[0]
+        if action is None:
+            self.fallbacks += 1
+        return action
+
+    def choose_play(self, engine):
+        cards = engine.players[engine.current].cards
+        plays = engine.logic.find_valid_plays(cards, engine.last_cards, engine.last_type, engine.last_val,
+                                              engine.is_first_round)
+        legal = [cards_mask(p) for p in plays] + [PASS_ACTION]
+        action = self.ask(engine, 'play', legal)
+        if action is None:
+            return super().choose_play(engine)
+        return [c for c in cards if action >> c.id & 1] or None
+
+    def choose_skill(self, engine):
+        skills = {s.effect_type: i for i, s in enumerate(engine.logic.special_skills)}
+        options = skill_options(engine, engine.current)
+        if len(options) == 1:
+            return None
+        legal = [PASS_ACTION] + [SKILL_ACTION | skills[s.effect_type] << 4 | (engine.current if t is None else t)
+                                 for s, t in options[1:]]
+        action = self.ask(engine, 'skill', legal)
+        if action is None:
+            return super().choose_skill(engine)
+        if not action:
+            return None
+        return options[legal.index(action)]
+
+def run_reference_bot(infile=sys.stdin, outfile=sys.stdout, seed=None):
+    """Reference bot for the protocol: the built-in greedy AI (ai_find_best_play)"""
+    engine = GameEngine(seed=seed)
+    positions = []
+    for line in infile:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == 'bigtwo':
+            outfile.write("id name greedy-reference\nready\n")
+        elif parts[0] == 'newgame':
+            opts = dict(zip(parts[1::2], parts[2::2]))
+            rules = RuleConfig(int(opts['players']), int(opts['cards']),
+                               tuple(SUIT_ORDER[int(i)] for i in opts['suits']),
+                               opts['flush'] == '1', opts['twos'] == '1')
+            engine = GameEngine(rules, seed=seed)
+            engine.logic.opening_id = int(opts['opening'])
+        elif parts[0] == 'position':
+            positions.append((parts[1], dict(zip(parts[2::2], parts[3::2]))))
+        elif parts[0] == 'go':
+            for pos_id, pos in positions:
+                outfile.write(f"bestmove {pos_id} {format(reference_bot_move(engine, pos), 'x')}\n")
+            positions = []
+        elif parts[0] == 'quit':
+            break
+        outfile.flush()
+
+def reference_bot_move(engine, pos):
+    legal = [int(a, 16) for a in pos['legal'].split(',')]
+    if pos['phase'] == 'skill':
+        # Seperti GreedyAI: 60% pakai skill acak
+        if engine.ai_rng.random() < DEFAULT_AI_PARAMS.skill_chance:
+            return engine.ai_rng.choice(legal[1:])
+        return PASS_ACTION
+    engine.last_cards = engine.logic.mask_cards(int(pos['table'], 16))
+    engine.last_type = None if pos['type'] == '-' else pos['type']
+    engine.last_val = int(pos['value'])
+    engine.is_first_round = pos['first'] == '1'
+    play = engine.ai_find_best_play(engine.logic.mask_cards(int(pos['hand'], 16)))
+    return cards_mask(play) if play else PASS_ACTION
+
+# Font pixel 5x7 dan simbol suit 7x7 untuk menggambar kartu ke PhotoImage
+PIXEL_FONT = {
+    '0': ["01110", "10001", "10011", "10101", "11001", "10001", "01110"],
+    '1': ["00100", "01100", "00100", "00100", "00100", "00100", "01110"],
+    '2': ["01110", "10001", "00001", "00010", "00100", "01000", "11111"],
+    '3': ["11111", "00010", "00100", "00010", "00001", "10001", "01110"],
+    '4': ["00010", "00110", "01010", "10010", "11111", "00010", "00010"],
+    '5': ["11111", "10000", "11110", "00001", "00001", "10001", "01110"],
+    '6': ["00110", "01000", "10000", "11110", "10001", "10001", "01110"],
+    '7': ["11111", "00001", "00010", "00100", "01000", "01000", "01000"],
+    '8': ["01110", "10001", "10001", "01110", "10001", "10001", "01110"],
+    '9': ["01110", "10001", "10001", "01111", "00001", "00010", "01100"],
+    'J': ["00111", "00010", "00010", "00010", "00010", "10010", "01100"],
+    'Q': ["01110", "10001", "10001", "10001", "10101", "10010", "01101"],
+    'K': ["10001", "10010", "10100", "11000", "10100", "10010", "10001"],
+    'A': ["01110", "10001", "10001", "11111", "10001", "10001", "10001"],
+    '♠': ["0001000", "0011100", "0111110", "1111111", "1111111", "0001000", "0011100"],
+    '♥': ["0110110", "1111111", "1111111", "1111111", "0111110", "0011100", "0001000"],
+    '♦': ["0001000", "0011100", "0111110", "1111111", "0111110", "0011100", "0001000"],
+    '♣': ["0011100", "0011100", "1111111", "1111111", "1111111", "0001000", "0011100"],
+}
+
+def card_pixels(label, suit, width, height):
+    """Rows of colors for a card face; label is the rank text"""
+    color = '#cc0000' if suit in ['♥', '♦'] else '#000000'
+    rows = [['#ffffff'] * width for _ in range(height)]
+    for x in range(width):
+        rows[0][x] = rows[height - 1][x] = '#777777'
+    for y in range(height):
+        rows[y][0] = rows[y][width - 1] = '#777777'
+
+    def stamp(glyph, x0, y0, scale):
+        for gy, line in enumerate(PIXEL_FONT[glyph]):
+            for gx, bit in enumerate(line):
+                if bit == '1':
+                    for dy in range(scale):
+                        for dx in range(scale):
+                            rows[y0 + gy * scale + dy][x0 + gx * scale + dx] = color
+
+    x = 4
+    for ch in label:
+        stamp(ch, x, 4, 2)
+        x += 12
+    stamp(suit, 4, 21, 2)
+    stamp(suit, (width - 28) // 2, (height - 28) // 2 + 6, 4)
+    return rows
+
+def back_pixels(width, height):
+    rows = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            if x in (0, width - 1) or y in (0, height - 1):
+                row.append('#ffffff')
+            elif (x + y) % 6 < 2:
+                row.append('#6a8cff')
+            else:
+                row.append('#4169E1')
+        rows.append(row)
+    return rows
+
+def pixels_to_data(rows):
+    return " ".join("{" + " ".join(row) + "}" for row in rows)
+
+class CardAtlas:
+    """Card face and back PhotoImages, rendered once per Tk root"""
+    WIDTH = 56
+    HEIGHT = 80
+    # Kunci objek root, bukan str(root): semua root bernama '.', dan gambar milik
+    # interpreter Tk yang sudah di-destroy tidak bisa dipakai root berikutnya
+    _atlases = weakref.WeakKeyDictionary()
+
+    def __init__(self, root):
+        self.faces = []
+        for card_id in range(52):
+            image = tk.PhotoImage(master=root, width=self.WIDTH, height=self.HEIGHT)
+            image.put(pixels_to_data(card_pixels(RANK_ORDER[card_id // 4], SUIT_ORDER[card_id % 4],
+                                                 self.WIDTH, self.HEIGHT)), to=(0, 0))
+            self.faces.append(image)
+        self.back = tk.PhotoImage(master=root, width=self.WIDTH, height=self.HEIGHT)
+        self.back.put(pixels_to_data(back_pixels(self.WIDTH, self.HEIGHT)), to=(0, 0))
+
+    @classmethod
+    def get(cls, root):
+        atlas = cls._atlases.get(root)
+        if atlas is None:
+            atlas = cls._atlases[root] = cls(root)
+        return atlas
+
+class TableView:
+    """The whole table on one Canvas.
+
+    Every card id has one image item and every AI seat a pool of back items,
+    created once. Redraws only move, show/hide and retag those items; cards
+    arriving in the center slide there with a fixed-rate animation.
+    """
+    FRAME_MS = 16
+    SELECTED_LIFT = 18
+
+    def __init__(self, parent, game):
+        self.game = game
+        self.canvas = tk.Canvas(parent, bg='#0d4f3c', highlightthickness=0)
+        self.atlas = CardAtlas.get(game.root)
+        w, h = CardAtlas.WIDTH, CardAtlas.HEIGHT
+        self.card_w, self.card_h = w, h
+
+        self.canvas.create_rectangle(0, 0, 0, 0, fill='#2d5a27', outline='#1a3f1a', width=3, tags='felt')
+        self.card_items = [self.canvas.create_image(0, 0, image=self.atlas.faces[i], anchor='nw',
+                                                    state='hidden', tags=('card',))
+                           for i in range(52)]
+        self.item_card = {item: i for i, item in enumerate(self.card_items)}
+        self.back_items = {}
+        self.seat_texts = {}
+        for seat in range(1, len(game.players)):
+            self.back_items[seat] = []
+            self.seat_texts[seat] = self.canvas.create_text(0, 0, text="", fill='white',
+                                                            font=game.player_font, anchor='nw')
+        self.center_title = self.canvas.create_text(0, 0, text="LAST PLAYED CARDS", fill='gold',
+                                                    font=('Arial', 14, 'bold'))
+        self.center_text = self.canvas.create_text(0, 0, text="", fill='white', font=game.info_font)
+
+        self.positions = {}
+        self.hand_ids = set()
+        self.hint_items = []
+        self.animating = {}
+        self.anim_job = None
+        self.frame_count = 0
+        self.frame_time = 0.0
+
+        self.canvas.tag_bind('hand', '<Button-1>', self.on_card_click)
+        self.canvas.bind('<Configure>', lambda e: self.redraw())
+
+    # --- Layout ---
+
+    def size(self):
+        return max(self.canvas.winfo_width(), 600), max(self.canvas.winfo_height(), 400)
+
+    def place(self, item, x, y, animate=False):
+        x, y = int(x), int(y)
+        if self.positions.get(item) == (x, y):
+            return
+        self.positions[item] = (x, y)
+        if animate and self.canvas.itemcget(item, 'state') != 'hidden':
+            self.animating[item] = (x, y)
+            if self.anim_job is None:
+                self.anim_job = self.canvas.after(self.FRAME_MS, self.animate_step)
+        else:
+            self.animating.pop(item, None)
+            self.canvas.coords(item, x, y)
+
+    def animate_step(self):
+        start = time.perf_counter()
+        for item, (tx, ty) in list(self.animating.items()):
+            x, y = self.canvas.coords(item)
+            dx, dy = tx - x, ty - y
+            if abs(dx) < 2 and abs(dy) < 2:
+                self.canvas.coords(item, tx, ty)
+                del self.animating[item]
+            else:
+                self.canvas.move(item, dx * 0.35, dy * 0.35)
+        self.frame_count += 1
+        self.frame_time += time.perf_counter() - start
+        self.anim_job = self.canvas.after(self.FRAME_MS, self.animate_step) if self.animating else None
+
+    def show(self, item, visible=True):
+        self.canvas.itemconfigure(item, state='normal' if visible else 'hidden')
+
+    def redraw(self):
+        self.draw_hand()
+        self.draw_center()
+        for seat in self.back_items:
+            self.draw_seat(seat)
+
+    # --- Regions ---
+
+    def draw_hand(self):
+        game = self.game
+        cw, ch = self.size()
+        cards = game.players[0].cards
+        self.canvas.dtag('hand', 'hand')
+        # Kartu yang keluar dari tangan (chaos, swap, sniper) disembunyikan
+        hand_ids = {c.id for c in cards}
+        center_ids = {c.id for c in game.last_cards}
+        for card_id in self.hand_ids - hand_ids - center_ids:
+            self.show(self.card_items[card_id], False)
+        self.hand_ids = hand_ids
+        hinted = [c for c in cards if game.hint_mask >> c.id & 1]
+        while len(self.hint_items) < len(hinted):
+            self.hint_items.append(self.canvas.create_rectangle(0, 0, 0, 0, outline='gold', width=3,
+                                                                state='hidden', tags=('hint',)))
+        if not cards:
+            for rect in self.hint_items:
+                self.show(rect, False)
+            return
+        step = min(self.card_w + 6, (cw - 40 - self.card_w) / max(len(cards) - 1, 1))
+        x0 = (cw - step * (len(cards) - 1) - self.card_w) / 2
+        y = ch - self.card_h - 12
+        for i, card in enumerate(cards):
+            item = self.card_items[card.id]
+            lift = self.SELECTED_LIFT if card in game.selected else 0
+            self.canvas.addtag_withtag('hand', item)
+            self.show(item)
+            self.canvas.tag_raise(item)
+            self.place(item, x0 + i * step, y - lift)
+
+        # Bingkai emas di sekitar kombinasi yang disarankan
+        for i, rect in enumerate(self.hint_items):
+            if i < len(hinted):
+                x, y = self.positions[self.card_items[hinted[i].id]]
+                self.canvas.coords(rect, x - 2, y - 2, x + self.card_w + 2, y + self.card_h + 2)
+                self.canvas.tag_raise(rect)
+                self.show(rect)
+            else:
+                self.show(rect, False)
+
+    def draw_center(self):
+        game = self.game
+        cw, ch = self.size()
+        cx, cy = cw / 2, ch * 0.42
+        self.canvas.coords('felt', cw * 0.25, ch * 0.22, cw * 0.75, ch * 0.66)
+        self.canvas.coords(self.center_title, cx, ch * 0.22 + 20)
+        self.canvas.coords(self.center_text, cx, ch * 0.22 + 44)
+        in_hand = {c.id for c in game.players[0].cards}
+        shown = {c.id for c in game.last_cards}
+
+        if game.last_cards:
+            self.canvas.itemconfigure(self.center_text, text=" ".join(str(c) for c in game.last_cards))
+        else:
+            self.canvas.itemconfigure(self.center_text, text="No cards played yet")
+
+        x0 = cx - (len(game.last_cards) * (self.card_w + 4)) / 2
+        for i, card in enumerate(game.last_cards):
+            item = self.card_items[card.id]
+            self.canvas.tag_raise(item)
+            self.place(item, x0 + i * (self.card_w + 4), cy - self.card_h / 2 + 20,
+                       animate=game.clock.speed == 1)
+            self.show(item)
+        # Kartu lawan dan kartu yang sudah dibuang dari meja disembunyikan
+        for card_id, item in enumerate(self.card_items):
+            if card_id not in in_hand and card_id not in shown:
+                self.show(item, False)
+
+    def draw_seat(self, seat):
+        game = self.game
+        cw, ch = self.size()
+        player = game.players[seat]
+        count = len(player.cards)
+        items = self.back_items[seat]
+        while len(items) < count:
+            items.append(self.canvas.create_image(0, 0, image=self.atlas.back, anchor='nw', state='hidden'))
+
+        name = f"{player.name}  ({count} cards)"
+        if seat == 1:  # Top player (horizontal)
+            step = min(22, (cw * 0.5) / max(count, 1))
+            x0 = (cw - step * (count - 1) - self.card_w) / 2
+            coords = [(x0 + i * step, 30) for i in range(count)]
+            self.canvas.coords(self.seat_texts[seat], x0, 8)
+        else:  # Left/right player (vertical)
+            x = 16 if seat == 2 else cw - self.card_w - 16
+            step = min(18, (ch * 0.5) / max(count, 1))
+            coords = [(x, ch * 0.12 + 24 + i * step) for i in range(count)]
+            self.canvas.coords(self.seat_texts[seat], x, ch * 0.12)
+        self.canvas.itemconfigure(self.seat_texts[seat], text=name)
+
+        for i, item in enumerate(items):
+            if i < count:
+                self.place(item, *coords[i])
+                self.show(item)
+            else:
+                self.show(item, False)
+
+    def on_card_click(self, event):
+        item = self.canvas.find_withtag('current')
+        if not item:
+            return
+        card_id = self.item_card.get(item[0])
+        for card in self.game.players[0].cards:
+            if card.id == card_id:
+                self.game.toggle_selection(card)
+                return
+
+class GameClock:
+    """All game delays go through here so they can be sped up.
+
+    speed is a multiplier on the nominal delays; 0 means max speed, where
+    callbacks run back to back in short time slices and Tk still gets to
+    handle input between slices.
+    """
+    SPEEDS = [('1x', 1), ('4x', 4), ('max', 0)]
+    SLICE_MS = 12
+
+    def __init__(self, root):
+        self.root = root
+        self.speed = 1
+        self.jobs = set()
+        self.pending = deque()
+        self.pump_job = None
+
+    def after(self, delay_ms, callback):
+        if self.speed:
+            job = None
+
+            def run():
+                self.jobs.discard(job)
+                callback()
+            job = self.root.after(int(delay_ms / self.speed), run)
+            self.jobs.add(job)
+            return
+        self.pending.append(callback)
+        if self.pump_job is None:
+            self.pump_job = self.root.after(1, self.pump)
+
+    def pump(self):
+        self.pump_job = None
+        deadline = time.perf_counter() + self.SLICE_MS / 1000
+        while self.pending and time.perf_counter() < deadline:
+            self.pending.popleft()()
+        if self.pending:
+            self.pump_job = self.root.after(1, self.pump)
+
+    def cancel_all(self):
+        for job in self.jobs:
+            self.root.after_cancel(job)
+        self.jobs.clear()
+        self.pending.clear()
+
+    def set_speed(self, speed):
+        """Change speed; waiting callbacks are rescheduled at the new speed"""
+        waiting = list(self.pending)
+        self.pending.clear()
+        self.speed = speed
+        for callback in waiting:
+            self.after(0, callback)
+
+    def frame_interval(self):
+        """Minimum ms between redraws: every frame at 1x, fewer when fast"""
+        if self.speed == 1:
+            return 0
+        return 100 if self.speed == 0 else 33
+
+class AsyncTkRuntime:
+    """Runs Tk inside an asyncio event loop, on one thread.
+
+    pump() handles every pending Tk event (input, redraws, after() timers)
+    and then yields to asyncio for tick_ms, so sockets, subprocess bots,
+    worker futures and asyncio.sleep timers are plain coroutines next to
+    the window. Input waits at most one tick plus the longest step any
+    coroutine takes; gaps records the time between pumps to check that.
+    """
+    def __init__(self, root, tick_ms=4, workers=2):
+        self.root = root
+        self.tick = tick_ms / 1000
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="async-tk")
+        self.loop = None
+        self.running = False
+        self.tasks = set()
+        self.gaps = deque(maxlen=10000)
+        root.protocol('WM_DELETE_WINDOW', self.stop)
+
+    def spawn(self, coro):
+        """Start a background coroutine; its errors are reported instead of lost"""
+        task = self.loop.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.task_done)
+        return task
+
+    def task_done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Background task failed: {task.exception()!r}", file=sys.stderr)
+
+    async def in_thread(self, fn, *args):
+        """Await a blocking call (AI search, bot I/O) without stalling the window"""
+        return await self.loop.run_in_executor(self.executor, partial(fn, *args))
+
+    def stop(self):
+        self.running = False
+
+    async def pump(self):
+        last = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            self.gaps.append(now - last)
+            last = now
+            try:
+                while self.root.tk.dooneevent(tk._tkinter.DONT_WAIT):
+                    pass
+            except tk.TclError:
+                break  # jendela sudah ditutup
+            await asyncio.sleep(self.tick)
+
+    async def main(self, coros):
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+        for coro in coros:
+            self.spawn(coro)
+        try:
+            await self.pump()
+        finally:
+            self.running = False
+            tasks = list(self.tasks)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.executor.shutdown(wait=False)
+            try:
+                self.root.destroy()
+            except tk.TclError:
+                pass
+
+    def run(self, *coros):
+        """Run the window and coros until the window closes or stop() is called"""
+        asyncio.run(self.main(coros))
+
+    def lag_stats(self):
+        """(median, p99, max) ms between Tk pumps, i.e. the worst wait for input"""
+        gaps = sorted(self.gaps) or [0.0]
+        return tuple(round(g * 1000, 2) for g in (gaps[len(gaps) // 2], gaps[int(len(gaps) * 0.99)], gaps[-1]))
+
+class BigTwoGame(GameEngine):
+    def __init__(self, rules=None, seat_ai=None, mainloop=True):
+        super().__init__(rules, human=True)
+        if seat_ai:
+            self.seat_ai = list(seat_ai)
+        if os.path.exists(BEAT_TABLE_FILE):
+            # Dibuka (mmap) baru saat AI pertama kali memakainya
+            self.beat_table = BeatTable(BEAT_TABLE_FILE)
         self.root = tk.Tk()
         self.root.title("🃏 Remi Big Two Game - Special Edition")
         self.root.geometry("1400x900")
         self.root.configure(bg='#0d4f3c')
-        self.root.state('zoomed')
+        try:
+            self.root.state('zoomed')
+        except tk.TclError:
+            # X11 tidak punya state 'zoomed'
+            self.root.attributes('-zoomed', True)
         
         self.root.resizable(True, True)
         self.root.minsize(1200, 800)
 
-        self.logic = GameLogic()
-        self.players = [Player("You", True)] + [Player(f"AI Player {i}") for i in range(1, 4)]
-        self.current = 0
-        self.last_cards = []
-        self.last_type = None
-        self.last_val = 0
-        self.pass_count = 0
         self.selected = []
-        self.over = False
-        self.is_first_round = True
-        self.starter_index = None
-        self.first_play_made = False
-        self.round_count = 0
-        self.skill_phase = False
-        self.available_skills = []
-        self.pending_skill = None
-        self.deck = []
-        self.wild_play_active = False
+        self.clock = GameClock(self.root)
+        self.scheduler.attach(self.clock)
+        self.watching = False
+        self.games_watched = 0
+        # AI menghitung jawaban di background selama giliran manusia
+        self.ponder = AIPonderer()
+        # Diisi run_async(): AI lalu berpikir di thread, bukan di callback Tk
+        self.runtime = None
+        self.ai_task = None
+        # Hint untuk manusia, juga dihitung di background
+        self.hints = HintWorker()
+        self.hint_mask = 0
+        self.hint_shown = False
+        # Redraw hanya bagian yang berubah, sekali per tick
+        self.dirty = set()
+        self.flush_job = None
+        self.redraw_requests = 0
+        self.redraws = 0
 
         # Fonts
         self.card_font = font.Font(family="Arial", size=10, weight="bold")
@@ -181,7 +4191,20 @@ class BigTwoGame:
 
         self.setup_ui()
         self.new_game()
-        self.root.mainloop()
+        if mainloop:
+            self.root.mainloop()
+
+    def run_async(self, *coros, tick_ms=4):
+        """Run the window under an AsyncTkRuntime instead of mainloop; coros run alongside"""
+        self.runtime = AsyncTkRuntime(self.root, tick_ms)
+        self.runtime.run(*coros)
+        return self.runtime
+
+    def quit(self):
+        if self.runtime:
+            self.runtime.stop()
+        else:
+            self.root.quit()
 
     def setup_ui(self):
         # Main container
@@ -223,83 +4246,14 @@ class BigTwoGame:
         self.round_lbl = tk.Label(info_frame, text="Round: 1", bg='#0d4f3c', fg='gold', 
                                 font=self.info_font)
         self.round_lbl.pack(side=tk.RIGHT, padx=15)
-
-        # Main game area
-        main_container = tk.Frame(self.root, bg='#0d4f3c')
-        main_container.grid(row=2, column=0, sticky='nsew', padx=10, pady=5)
-        main_container.grid_rowconfigure(0, weight=1)
-        main_container.grid_rowconfigure(1, weight=2)
-        main_container.grid_columnconfigure(0, weight=1)
-
-        # AI Player 1 (top)
-        ai1_frame = tk.Frame(main_container, bg='#1a5f4a', bd=2, relief='raised')
-        ai1_frame.grid(row=0, column=0, sticky='ew', pady=(0, 5))
-        ai1_frame.grid_columnconfigure(1, weight=1)
-        
-        tk.Label(ai1_frame, text="AI Player 1", bg='#1a5f4a', fg='white', 
-                font=self.player_font).grid(row=0, column=0, sticky='w', padx=5, pady=2)
-        self.player2_count = tk.Label(ai1_frame, text="13 cards", bg='#1a5f4a', fg='gold', 
-                                    font=self.info_font)
-        self.player2_count.grid(row=0, column=2, sticky='e', padx=5, pady=2)
-        
-        self.player2_cards = tk.Frame(ai1_frame, bg='#1a5f4a')
-        self.player2_cards.grid(row=1, column=0, columnspan=3, sticky='ew', padx=5, pady=2)
-
-        # Middle section
-        middle_container = tk.Frame(main_container, bg='#0d4f3c')
-        middle_container.grid(row=1, column=0, sticky='nsew')
-        middle_container.grid_rowconfigure(0, weight=1)
-        middle_container.grid_columnconfigure(0, weight=1)
-        middle_container.grid_columnconfigure(1, weight=3)
-        middle_container.grid_columnconfigure(2, weight=1)
-
-        # AI Player 2 (left)
-        left_frame = tk.Frame(middle_container, bg='#1a5f4a', bd=2, relief='raised')
-        left_frame.grid(row=0, column=0, sticky='nsew', padx=(0, 5))
-        tk.Label(left_frame, text="AI Player 2", bg='#1a5f4a', fg='white', 
-                font=self.player_font).pack(anchor='w', padx=5, pady=2)
-        
-        self.player3_cards = tk.Frame(left_frame, bg='#1a5f4a')
-        self.player3_cards.pack(fill='both', expand=True, padx=5, pady=5)
-        
-        self.player3_count = tk.Label(left_frame, text="13 cards", bg='#1a5f4a', fg='gold', 
-                                    font=self.info_font)
-        self.player3_count.pack(anchor='e', padx=5, pady=2)
-
-        # Center area
-        center_frame = tk.Frame(middle_container, bg='#2d5a27', bd=3, relief='sunken')
-        center_frame.grid(row=0, column=1, sticky='nsew', padx=5)
-        center_frame.grid_rowconfigure(2, weight=1)
-        center_frame.grid_columnconfigure(0, weight=1)
-        
-        tk.Label(center_frame, text="LAST PLAYED CARDS", bg='#2d5a27', fg='gold', 
-                font=('Arial', 14, 'bold')).grid(row=0, column=0, pady=5)
-        
-        self.last_lbl = tk.Label(center_frame, text="None", bg='#2d5a27', fg='white', 
-                               font=self.info_font)
-        self.last_lbl.grid(row=1, column=0, pady=2)
         
-        # Fixed center cards frame
-        center_scroll_frame = tk.Frame(center_frame, bg='#2d5a27')
-        center_scroll_frame.grid(row=2, column=0, sticky='nsew', padx=10, pady=10)
-        center_scroll_frame.grid_rowconfigure(0, weight=1)
-        center_scroll_frame.grid_columnconfigure(0, weight=1)
-        
-        self.center_cards = tk.Frame(center_scroll_frame, bg='#2d5a27')
-        self.center_cards.grid(row=0, column=0)
+        self.redraw_lbl = tk.Label(info_frame, text="Redraws saved: 0", bg='#0d4f3c', fg='#aaaaaa', 
+                                  font=self.info_font)
+        self.redraw_lbl.pack(side=tk.RIGHT, padx=15)
 
-        # AI Player 3 (right)
-        right_frame = tk.Frame(middle_container, bg='#1a5f4a', bd=2, relief='raised')
-        right_frame.grid(row=0, column=2, sticky='nsew', padx=(5, 0))
-        tk.Label(right_frame, text="AI Player 3", bg='#1a5f4a', fg='white', 
-                font=self.player_font).pack(anchor='w', padx=5, pady=2)
-        
-        self.player4_cards = tk.Frame(right_frame, bg='#1a5f4a')
-        self.player4_cards.pack(fill='both', expand=True, padx=5, pady=5)
-        
-        self.player4_count = tk.Label(right_frame, text="13 cards", bg='#1a5f4a', fg='gold', 
-                                    font=self.info_font)
-        self.player4_count.pack(anchor='e', padx=5, pady=2)
+        # Main game area: the whole table is drawn on one canvas
+        self.table_view = TableView(self.root, self)
+        self.table_view.canvas.grid(row=2, column=0, sticky='nsew', padx=10, pady=5)
 
         # Special Skills Area
         skills_container = tk.Frame(self.root, bg='#4a1a5f', bd=2, relief='raised')
@@ -316,36 +4270,21 @@ class BigTwoGame:
         self.skills_frame = tk.Frame(skills_container, bg='#4a1a5f')
         self.skills_frame.grid(row=1, column=0, columnspan=2, sticky='ew', padx=10, pady=5)
 
-        # Player cards area
-        player_container = tk.Frame(self.root, bg='#1a5f4a', bd=2, relief='raised')
-        player_container.grid(row=4, column=0, sticky='ew', padx=10, pady=5)
-        player_container.grid_rowconfigure(1, weight=1)
-        player_container.grid_columnconfigure(0, weight=1)
-        
-        player_header = tk.Frame(player_container, bg='#1a5f4a')
-        player_header.grid(row=0, column=0, sticky='ew', padx=10, pady=5)
+        # Player info area
+        player_header = tk.Frame(self.root, bg='#1a5f4a', bd=2, relief='raised')
+        player_header.grid(row=4, column=0, sticky='ew', padx=10, pady=5)
         player_header.grid_columnconfigure(1, weight=1)
         
         tk.Label(player_header, text="YOUR CARDS", bg='#1a5f4a', fg='gold', 
-                font=('Arial', 12, 'bold')).grid(row=0, column=0, sticky='w')
+                font=('Arial', 12, 'bold')).grid(row=0, column=0, sticky='w', padx=10)
         
         self.player_skills_lbl = tk.Label(player_header, text="Skills: None", bg='#1a5f4a', fg='cyan', 
                                          font=self.info_font)
-        self.player_skills_lbl.grid(row=0, column=1, sticky='e')
+        self.player_skills_lbl.grid(row=0, column=1, sticky='e', padx=10)
         
-        # Scrollable canvas for player cards
-        player_canvas = tk.Canvas(player_container, bg='#1a5f4a', height=120)
-        player_canvas.grid(row=1, column=0, sticky='ew', padx=10, pady=5)
-        
-        player_scrollbar = ttk.Scrollbar(player_container, orient='horizontal', command=player_canvas.xview)
-        player_scrollbar.grid(row=2, column=0, sticky='ew', padx=10)
-        player_canvas.configure(xscrollcommand=player_scrollbar.set)
-        
-        self.hand_frame = tk.Frame(player_canvas, bg='#1a5f4a')
-        player_canvas.create_window((0, 0), window=self.hand_frame, anchor='nw')
-        
-        player_canvas.bind('<Configure>', lambda e: self.update_scroll_region(player_canvas, self.hand_frame))
-        self.hand_frame.bind('<Configure>', lambda e: self.update_scroll_region(player_canvas, self.hand_frame))
+        self.hint_lbl = tk.Label(player_header, text="", bg='#1a5f4a', fg='#ffe082', 
+                                font=self.info_font, anchor='w', justify='left')
+        self.hint_lbl.grid(row=1, column=0, columnspan=2, sticky='ew', padx=10)
 
         # Controls
         ctrl_frame = tk.Frame(self.root, bg='#0d4f3c', height=60)
@@ -364,15 +4303,31 @@ class BigTwoGame:
                                   bg='#9C27B0', fg='white', font=self.info_font, padx=15, height=1)
         self.skill_btn.pack(side=tk.LEFT, padx=10, pady=10)
         
+        self.hint_btn = tk.Button(ctrl_frame, text="HINT (H)", command=self.show_hint, 
+                                 bg='#795548', fg='white', font=self.info_font, padx=15, height=1)
+        self.hint_btn.pack(side=tk.LEFT, padx=10, pady=10)
+        self.root.bind('<h>', lambda e: self.show_hint())
+        self.root.bind('<H>', lambda e: self.show_hint())
+        
         tk.Button(ctrl_frame, text="NEW GAME", command=self.new_game, bg='#2196F3', fg='white',
                  font=self.info_font, padx=15, height=1).pack(side=tk.LEFT, padx=10, pady=10)
         
         tk.Button(ctrl_frame, text="HELP", command=self.show_help, bg='#607D8B', fg='white',
                  font=self.info_font, padx=15, height=1).pack(side=tk.RIGHT, padx=10, pady=10)
-
-    def update_scroll_region(self, canvas, frame):
-        canvas.configure(scrollregion=canvas.bbox("all"))
         
+        # Game speed and spectator mode
+        self.speed_btns = {}
+        for label, speed in reversed(GameClock.SPEEDS):
+            btn = tk.Button(ctrl_frame, text=label, command=lambda sp=speed: self.set_speed(sp),
+                            bg='#37474F', fg='white', font=self.info_font, width=4)
+            btn.pack(side=tk.RIGHT, padx=2, pady=10)
+            self.speed_btns[speed] = btn
+        self.speed_btns[1].config(bg='#FFC107', fg='black')
+        
+        self.watch_btn = tk.Button(ctrl_frame, text="WATCH AIs", command=self.toggle_watch,
+                                  bg='#00796B', fg='white', font=self.info_font, padx=15, height=1)
+        self.watch_btn.pack(side=tk.RIGHT, padx=10, pady=10)
+
     def center_window(self, window):
             """Center a window on the screen"""
             window.update_idletasks()
@@ -404,75 +4359,111 @@ Aturan Dasar:
         messagebox.showinfo("Bantuan", help_text)
 
     def new_game(self):
-        self.over = False
-        self.is_first_round = True
-        self.first_play_made = False
-        self.starter_index = None
-        self.round_count = 0
-        self.skill_phase = False
-        self.available_skills = []
-        self.pending_skill = None
-        self.wild_play_active = False
-        self.current, self.last_cards, self.last_type, self.last_val, self.pass_count, self.selected = 0, [], None, 0, 0, []
-        
-        self.deck = self.logic.create_deck()
-        
-        for p in self.players:
-            p.cards.clear()
-            p.special_skills.clear()
-            p.shield_active = False
-            p.skip_next_turn = False
-        
-        for _ in range(13):
-            for p in self.players:
-                if self.deck:
-                    p.add_card(self.deck.pop())
-        
-        for p in self.players:
-            p.sort_cards()
-        
-        # Find player with 3♠
-        for i, p in enumerate(self.players):
-            if any(c.value == '3' and c.suit == '♠' for c in p.cards):
-                self.current = i
-                self.starter_index = i
-                break
+        self.selected = []
+        self.clock.cancel_all()
+        if self.ai_task:
+            self.ai_task.cancel()
+            self.ai_task = None
+        self.ponder.reset()
+        self.hints.reset()
+        self.clear_hint()
+        self.deal()
         
         self.update()
+        self.start_turns(START_DELAY)
+
+    def human_turn(self):
+        return self.players[self.current].is_human and not self.over
+
+    def set_speed(self, speed):
+        self.clock.set_speed(speed)
+        for sp, btn in self.speed_btns.items():
+            btn.config(bg='#FFC107' if sp == speed else '#37474F', fg='black' if sp == speed else 'white')
+
+    def toggle_watch(self):
+        """Spectator mode: seat 0 is played by the AI too"""
+        self.watching = not self.watching
+        self.players[0].is_human = not self.watching
+        self.watch_btn.config(text="STOP WATCHING" if self.watching else "WATCH AIs")
+        self.selected = []
+        self.ponder.reset()
+        self.clear_hint()
+        self.mark_dirty('hand', 'labels')
+        if self.over:
+            self.new_game()
+        elif self.watching and self.current == 0 and self.scheduler.pending is None and self.ai_task is None:
+            self.scheduler.post(EV_TURN)
+        else:
+            self.restart_pondering()
+
+    def restart_pondering(self):
+        """Start pondering AI replies (and the hint) if it is the human's turn"""
+        self.clear_hint()
+        if self.human_turn():
+            state = GameState.from_engine(self)
+            self.hints.request(state)
+            self.ponder.start(state)
+
+    def show_hint(self):
+        """Highlight the AI's recommended play and list the plays that beat the table"""
+        if not self.human_turn():
+            return
+        hint = self.hints.get(GameState.from_engine(self))
+        self.hint_mask = hint.best
+        self.hint_shown = True
+        self.update_hint_label(hint)
+        self.mark_dirty('hand')
+
+    def clear_hint(self):
+        if self.hint_shown or self.hint_mask:
+            self.hint_mask = 0
+            self.hint_shown = False
+            self.hint_lbl.config(text="")
+            self.mark_dirty('hand')
+
+    def update_hint_label(self, hint):
+        """Legal plays for the hint label, narrowed to those containing the selected cards"""
+        if not hint.plays:
+            self.hint_lbl.config(text="💡 Nothing beats the table: PASS")
+            return
         
-        if self.current != 0:
-            self.root.after(1000, self.ai_play)
+        selected = cards_mask(self.selected)
+        plays = [m for m in hint.plays if m & selected == selected]
+        names = ["".join(str(c) for c in self.logic.mask_cards(m)) for m in plays[:HINT_LIST_SIZE]]
+        if len(plays) > HINT_LIST_SIZE:
+            names.append(f"+{len(plays) - HINT_LIST_SIZE} more")
+        if self.last_cards:
+            target = f"beat {self.last_type.replace('_', ' ').title()} ({self.last_val})"
+        else:
+            target = "free play"
+        best = " ".join(str(c) for c in self.logic.mask_cards(hint.best))
+        
+        text = f"💡 Best: {best} | {len(hint.plays)} plays ({target})"
+        if selected:
+            text += f" | {len(plays)} with your selection"
+        if names:
+            text += ": " + ", ".join(names)
+        self.hint_lbl.config(text=text)
 
     def check_skill_round(self):
             """Check if it's time for a skill round"""
-            # Pastikan game sudah dimulai
-            if not self.first_play_made:
-                return
-            
-            # Hitung round dengan benar
-            skill_round = (self.round_count % 4 == 0) and (self.round_count > 0)
-            
-            if skill_round and not self.skill_phase:
-                self.skill_phase = True
-                
-                # Ambil 4 skill secara acak
-                selected_skills = random.sample(self.logic.special_skills, 4)
-                
-                # Berikan satu skill acak untuk setiap pemain
-                for i, player in enumerate(self.players):
-                    if selected_skills:
-                        skill = random.choice(selected_skills)
-                        player.add_skill(skill)
-                        selected_skills.remove(skill)
-                        
-                        # Tampilkan pesan untuk pemain manusia
-                        if i == 0:
-                            messagebox.showinfo("Skill Acquired!", 
-                                            f"You have acquired: {skill.name}\n\n{skill.description}")
-                
-                # Reset status
-                self.skill_phase = False
+            if super().check_skill_round():
                 self.update()
+            
+    def on_skill_acquired(self, player_index, skill):
+        # Tampilkan pesan untuk pemain manusia
+        if self.players[player_index].is_human:
+            messagebox.showinfo("Skill Acquired!", 
+                            f"You have acquired: {skill.name}\n\n{skill.description}")
+
+    def notify(self, title, message, user_index):
+        if self.players[user_index].is_human:
+            messagebox.showinfo(title, message)
+
+    def on_peek(self, user_index, target_player):
+        if self.players[user_index].is_human:
+            self.show_peek_window(target_player)
+        # No message for AI
 
     def show_skills_menu(self):
         """Show available skills for the human player"""
@@ -528,6 +4519,7 @@ Aturan Dasar:
         
         # Apply skill effect
         self.apply_skill_effect(skill, 0)  # Player 0 uses skill
+        self.restart_pondering()
         self.update()
 
     def select_target_player(self, skill, user_index):
@@ -566,51 +4558,9 @@ Aturan Dasar:
         if window:
             window.destroy()
         
-        target_player = self.players[target_index]
-        
-        # Check if target has shield
-        if target_player.shield_active and skill.effect_type in ['force_discard', 'skip', 'swap']:
-            target_player.shield_active = False  # Shield is consumed
-            if user_index == 0:
-                messagebox.showinfo("Shield!", f"{target_player.name}'s shield blocked the {skill.name}!")
-            return
-        
-        if skill.effect_type == 'force_discard':
-            if target_player.cards:
-                highest_card = max(target_player.cards, key=lambda c: c.get_numeric_value())
-                target_player.remove_cards([highest_card])
-                if user_index == 0:
-                    messagebox.showinfo("Sniper Hit!", f"Forced {target_player.name} to discard {highest_card}!")
-        
-        elif skill.effect_type == 'skip':
-            target_player.skip_next_turn = True
-            if user_index == 0:
-                messagebox.showinfo("Skip!", f"{target_player.name} will skip their next turn!")
-        
-        elif skill.effect_type == 'swap':
-            if len(target_player.cards) >= 2 and len(self.players[user_index].cards) >= 2:
-                # Swap 2 random cards
-                user_cards = random.sample(self.players[user_index].cards, 2)
-                target_cards = random.sample(target_player.cards, 2)
-                
-                self.players[user_index].remove_cards(user_cards)
-                target_player.remove_cards(target_cards)
-                
-                for card in target_cards:
-                    self.players[user_index].add_card(card)
-                for card in user_cards:
-                    target_player.add_card(card)
-                
-                self.players[user_index].sort_cards()
-                target_player.sort_cards()
-                
-                if user_index == 0:
-                    messagebox.showinfo("Swap!", f"Swapped 2 cards with {target_player.name}!")
-        
-        elif skill.effect_type == 'peek':
-            if user_index == 0:  # Human player
-                self.show_peek_window(target_player)
-            # No message for AI
+        super().execute_targeted_skill(skill, user_index, target_index)
+        if self.players[user_index].is_human:
+            self.restart_pondering()
 
     def show_peek_window(self, target_player):
         """Show peeked cards to human player"""
@@ -630,331 +4580,126 @@ Aturan Dasar:
         tk.Label(peek_window, text=f"👁️ {target_player.name}'s Cards 👁️", 
                 bg='#1a0d26', fg='gold', font=('Arial', 16, 'bold')).pack(pady=20)
         
-        # Cards frame
-        cards_frame = tk.Frame(peek_window, bg='#1a0d26')
-        cards_frame.pack(expand=True, fill='both', padx=20, pady=10)
-        
-        # Display cards
+        # Display cards from the shared image atlas
+        atlas = self.table_view.atlas
+        cards_canvas = tk.Canvas(peek_window, bg='#1a0d26', highlightthickness=0,
+                                 height=CardAtlas.HEIGHT + 10)
+        cards_canvas.pack(expand=True, fill='both', padx=20, pady=10)
+        step = min(CardAtlas.WIDTH + 4, 740 // max(len(target_player.cards), 1))
         for i, card in enumerate(target_player.cards):
-            card_btn = tk.Button(cards_frame, text=str(card), bg='white', fg='black',
-                                font=self.card_font, width=6, height=3, bd=2, relief='raised')
-            card_btn.grid(row=0, column=i, padx=2, pady=5)
+            cards_canvas.create_image(i * step, 5, image=atlas.faces[card.id], anchor='nw')
         
         tk.Button(peek_window, text="CLOSE", command=peek_window.destroy,
                  bg='#FF5722', fg='white', font=('Arial', 12, 'bold')).pack(pady=20)
 
-    def apply_skill_effect(self, skill, user_index):
+    def apply_skill_effect(self, skill, user_index, target_index=None):
         """Apply the effect of a special skill"""
-        if skill.effect_type in ['force_discard', 'skip', 'swap', 'peek']:
-            if user_index == 0:  # Human player
-                self.select_target_player(skill, user_index)
-            else:  # AI player
-                # AI selects random target
-                available_targets = [i for i in range(len(self.players)) if i != user_index]
-                if available_targets:
-                    target_index = random.choice(available_targets)
-                    self.execute_targeted_skill(skill, user_index, target_index)
-        
-        elif skill.effect_type == 'shield':
-            self.players[user_index].shield_active = True
-            if user_index == 0:
-                messagebox.showinfo("Shield Up!", "You are now protected from negative effects!")
-        
-        elif skill.effect_type == 'chaos':
-            # All players pass 1 card to next player
-            if all(len(p.cards) > 0 for p in self.players):
-                cards_to_pass = []
-                for player in self.players:
-                    card_to_pass = random.choice(player.cards)
-                    cards_to_pass.append(card_to_pass)
-                    player.remove_cards([card_to_pass])
-                
-                # Pass cards to next player
-                for i, card in enumerate(cards_to_pass):
-                    next_player_index = (i + 1) % len(self.players)
-                    self.players[next_player_index].add_card(card)
-                
-                for player in self.players:
-                    player.sort_cards()
-                
-                if user_index == 0:
-                    messagebox.showinfo("Chaos!", "All players passed 1 card to the next player!")
-                else:
-                    # Untuk AI, update tampilan sebelum melanjutkan
-                    self.update()
-                    self.root.after(2000, self.next_turn)
-        
-        elif skill.effect_type == 'draw_lucky':
-            if self.deck:
-                # Find the lowest card in deck
-                lowest_card = min(self.deck, key=lambda c: c.get_numeric_value())
-                self.deck.remove(lowest_card)
-                self.players[user_index].add_card(lowest_card)
-                self.players[user_index].sort_cards()
-                
-                if user_index == 0:
-                    messagebox.showinfo("Lucky Draw!", f"You drew the lucky card: {lowest_card}!")
-        elif skill.effect_type == 'wild_play':
-            if user_index == 0:
-                self.wild_play_active = True
-                messagebox.showinfo("Wild Play!", "You can now play any card combination, ignoring normal rules!")
-            else:
-                # AI uses wild play immediately
-                self.ai_wild_play(user_index)
-                # Beri jeda sebelum melanjutkan
-                self.root.after(2000, self.next_turn)
-
-    def ai_wild_play(self, ai_index):
-        """AI player uses wild play skill"""
-        ai_player = self.players[ai_index]
-        if ai_player.cards:
-            # AI plays their highest single card or best combination
-            if len(ai_player.cards) >= 5:
-                # Coba kombinasi 5 kartu
-                valid_play = self.ai_find_best_play(ai_player.cards, wild_play=True)
-            elif len(ai_player.cards) >= 3:
-                # Coba triple
-                valid_play = self.ai_find_triple(ai_player.cards)
-            else:
-                # Mainkan kartu tunggal tertinggi
-                valid_play = [max(ai_player.cards, key=lambda c: c.get_numeric_value())]
-            
-            if valid_play:
-                ai_player.remove_cards(valid_play)
-                self.last_cards = valid_play[:]
-                combo_type, combo_val = self.logic.get_combo_type(valid_play)
-                self.last_type = combo_type
-                self.last_val = combo_val
-                self.pass_count = 0
-                
-                # FIX: Check win condition
-                if not ai_player.cards:
-                    self.game_over(ai_index)
-                    return
-
-    def ai_find_triple(self, cards):
-        """Find a triple combination"""
-        value_counts = Counter(card.value for card in cards)
-        for value, count in value_counts.items():
-            if count >= 3:
-                return [card for card in cards if card.value == value][:3]
-        return None
-
-    def play(self):
-        if self.over or self.current != 0:
-            return
-        
-        if not self.selected:
-            messagebox.showwarning("No Cards", "Please select cards to play!")
-            return
-        
-        # Check if it's a valid play
-        is_valid = self.logic.is_valid_play(
-            self.selected, self.last_cards, self.last_type, self.last_val, 
-            self.is_first_round, self.wild_play_active
-        )
-        
-        if not is_valid:
-            if self.is_first_round:
-                messagebox.showwarning("Invalid", "First play must include 3♠!")
-            else:
-                messagebox.showwarning("Invalid", "Invalid combination or too weak!")
-            return
-        
-        # Play the cards
-        self.players[0].remove_cards(self.selected)
-        self.last_cards = self.selected[:]
-        combo_type, combo_val = self.logic.get_combo_type(self.selected)
-        self.last_type = combo_type
-        self.last_val = combo_val
-        self.pass_count = 0
-        self.selected = []
-        # FIX: Reset wild play after use
-        self.wild_play_active = False
-        
-        if self.is_first_round:
-            self.is_first_round = False
-            self.first_play_made = True
-        
-        # Check win condition
-        if not self.players[0].cards:
-            self.game_over(0)
-            return
-        
-        self.next_turn()
-
-    def pass_turn(self):
-        if self.over or self.current != 0:
-            return
-        
-        self.pass_count += 1
-        
-        # After 3 passes, clear the table
-        if self.pass_count >= 3:
-            self.last_cards = []
-            self.last_type = None
-            self.last_val = 0
-            self.pass_count = 0
-            self.round_count += 1
-            self.check_skill_round()
-        
-        self.next_turn()
-
-    def next_turn(self):
-        self.current = (self.current + 1) % 4
-        
-        # FIX: Only increment round count when a full rotation is completed
-        if self.current == self.starter_index and not self.is_first_round:
-            self.round_count += 1
-            self.check_skill_round()
-        
-        # Skip players who are marked to skip
-        if self.players[self.current].skip_next_turn:
-            self.players[self.current].skip_next_turn = False
-            self.pass_count += 1
-            if self.pass_count >= 3:
-                self.last_cards = []
-                self.last_type = None
-                self.last_val = 0
-                self.pass_count = 0
-                # Increment round count only when passes clear the table
-                self.round_count += 1
-                self.check_skill_round()
-            self.next_turn()
-            return
-        
-        self.update()
-        
-        if self.current != 0:
-            self.root.after(1500, self.ai_play)
-
-    def ai_play(self):
-        if self.over or self.current == 0:
-            return
-        
-        ai_player = self.players[self.current]
-        
-        # Prioritize using skills (60% chance)
-        if ai_player.special_skills and random.random() < 0.6:
-            skill = random.choice(ai_player.special_skills)
-            if ai_player.use_skill(skill):
-                self.apply_skill_effect(skill, self.current)
-                self.update()
-                # FIX: Beri waktu untuk efek skill terlihat
-                self.root.after(2000, self.ai_continue)
-                return
-        
-        # Continue with normal play
-        self.ai_continue()
-        
-    def ai_continue(self):
-        if self.over or self.current == 0:
+        if skill.effect_type in self.TARGETED_SKILLS and self.players[user_index].is_human and target_index is None:
+            self.select_target_player(skill, user_index)
             return
         
-        ai_player = self.players[self.current]
-        
-        # Find valid play
-        valid_play = self.ai_find_best_play(ai_player.cards)
-        
-        if valid_play:
-            ai_player.remove_cards(valid_play)
-            self.last_cards = valid_play[:]
-            combo_type, combo_val = self.logic.get_combo_type(valid_play)
-            self.last_type = combo_type
-            self.last_val = combo_val
-            self.pass_count = 0
-            
-            if self.is_first_round:
-                self.is_first_round = False
-                self.first_play_made = True
-            
-            # Check win condition
-            if not ai_player.cards:
-                self.game_over(self.current)
-                return
-        else:
-            # AI passes
-            self.pass_count += 1
-            if self.pass_count >= 3:
-                self.last_cards = []
-                self.last_type = None
-                self.last_val = 0
-                self.pass_count = 0
-                self.round_count += 1
-                self.check_skill_round()
-        
-        self.next_turn()
-    
-
+        super().apply_skill_effect(skill, user_index, target_index)
 
-    def ai_find_best_play(self, cards, wild_play=False):
-        """Find the best play for AI with enhanced strategy"""
-        if not cards:
-            return None
-        
-        # Try to find valid combinations
-        valid_plays = []
-        
-        # 1. Singles
-        for card in cards:
-            if self.logic.is_valid_play([card], self.last_cards, self.last_type, self.last_val, self.is_first_round, wild_play):
-                valid_plays.append([card])
-        
-        # 2. Pairs
-        for i in range(len(cards)):
-            for j in range(i + 1, len(cards)):
-                if cards[i].value == cards[j].value:
-                    combo = [cards[i], cards[j]]
-                    if self.logic.is_valid_play(combo, self.last_cards, self.last_type, self.last_val, self.is_first_round, wild_play):
-                        valid_plays.append(combo)
-        
-        # 3. Triples
-        value_counts = Counter(card.value for card in cards)
-        for value, count in value_counts.items():
-            if count >= 3:
-                triple_cards = [card for card in cards if card.value == value][:3]
-                if self.logic.is_valid_play(triple_cards, self.last_cards, self.last_type, self.last_val, self.is_first_round, wild_play):
-                    valid_plays.append(triple_cards)
+    def play(self):
+        if not self.human_turn():
+            return
         
-        # 4. Five-card combinations
-        if len(cards) >= 5:
-            # Generate all possible 5-card combinations
-            from itertools import combinations
-            five_card_combos = list(combinations(cards, 5))
-            
-            for combo in five_card_combos:
-                combo_list = list(combo)
-                combo_type, combo_val = self.logic.get_combo_type(combo_list)
-                if combo_type and self.logic.is_valid_play(combo_list, self.last_cards, self.last_type, self.last_val, self.is_first_round, wild_play):
-                    valid_plays.append(combo_list)
+        if not self.selected:
+            messagebox.showwarning("No Cards", "Please select cards to play!")
+            return
         
-        # If no valid plays found
-        if not valid_plays:
-            return None
+        # Check if it's a valid play
+        is_valid = self.logic.is_valid_play(
+            self.selected, self.last_cards, self.last_type, self.last_val, 
+            self.is_first_round, self.wild_play_active
+        )
         
-        # Strategy: Prefer to play more cards to reduce hand size
-        valid_plays.sort(key=lambda play: len(play), reverse=True)
+        if not is_valid:
+            if self.is_first_round:
+                opening = self.logic.card_name(self.logic.opening_id)
+                messagebox.showwarning("Invalid", f"First play must include {opening}!")
+            else:
+                messagebox.showwarning("Invalid", "Invalid combination or too weak!\n\nPress H for a hint.")
+            return
         
-        # Among plays with same number of cards, prefer lower value cards
-        best_play = valid_plays[0]
-        same_length_plays = [play for play in valid_plays if len(play) == len(best_play)]
+        # Play the cards
+        played, self.selected = self.selected, []
+        self.ponder.commit(cards_mask(played))
+        self.clear_hint()
+        if self.commit_play(played):
+            return
         
-        if len(same_length_plays) > 1:
-            # Prefer plays with lower total value
-            same_length_plays.sort(key=lambda play: sum(c.get_numeric_value() for c in play))
-            best_play = same_length_plays[0]
+        self.scheduler.post(EV_NEXT)
+
+    def pass_turn(self):
+        if not self.human_turn():
+            return
         
-        return best_play
+        self.ponder.commit(PASS_ACTION)
+        self.clear_hint()
+        self.commit_pass()
+        self.scheduler.post(EV_NEXT)
+
+    def turn_delay(self):
+        # Jawaban sudah dihitung saat giliran manusia: cukup jeda singkat
+        return 400 if self.pondered_reply(count=False) is not None else TURN_DELAY
+
+    def on_human_turn(self):
+        self.restart_pondering()
+        
+    def handle_event(self, kind):
+        if kind == EV_AI_PLAY and self.runtime and not self.over:
+            self.ai_task = self.runtime.spawn(self.ai_play_async())
+            return
+        super().handle_event(kind)
+
+    async def ai_play_async(self):
+        """EV_AI_PLAY under the asyncio runtime: choose in a worker thread, commit here"""
+        turn = (self.games_dealt, self.turns_played, self.current)
+        try:
+            play = await self.runtime.in_thread(self.ai_choose_play)
+        except Exception:
+            if turn == (self.games_dealt, self.turns_played, self.current):
+                raise
+            return  # game berubah saat AI berpikir (new game): hasilnya dibuang
+        finally:
+            if self.ai_task is asyncio.current_task():
+                self.ai_task = None
+        if self.over or turn != (self.games_dealt, self.turns_played, self.current):
+            return
+        if play:
+            if self.commit_play(play):
+                return
+        else:
+            self.commit_pass()
+        self.scheduler.post(EV_NEXT)
+
+    def pondered_reply(self, count=True):
+        """The pondered action for this turn, or None when it can't stand in for the seat AI"""
+        # Jawaban ponder dihitung dengan GameState.greedy_action, yang tidak memakai beat table
+        if not getattr(self.seat_ai[self.current], 'ponderable', False) or self.beat_table_blocks():
+            return None
+        return self.ponder.lookup(GameState.from_engine(self), count)
+
+    def ai_choose_play(self):
+        reply = self.pondered_reply()
+        if reply is None:
+            return super().ai_choose_play()
+        return [c for c in self.players[self.current].cards if reply >> c.id & 1] or None
 
     def game_over(self, winner_index):
-        self.over = True
+        super().game_over(winner_index)
         winner_name = self.players[winner_index].name
         
+        if self.watching:
+            # Spectator mode langsung lanjut ke game berikutnya
+            self.games_watched += 1
+            self.cur_lbl.config(text=f"Winner: {winner_name} | Games watched: {self.games_watched}")
+            self.clock.after(2000, self.new_game)
+            return
+        
         # Calculate scores based on remaining cards
-        scores = []
-        for i, player in enumerate(self.players):
-            score = sum(card.get_numeric_value() for card in player.cards)
-            scores.append((player.name, score, len(player.cards)))
+        scores = self.final_scores()
         
         # Create game over window
         game_over_window = tk.Toplevel(self.root)
@@ -996,7 +4741,7 @@ Aturan Dasar:
         tk.Button(button_frame, text="NEW GAME", command=lambda: [game_over_window.destroy(), self.new_game()],
                  bg='#4CAF50', fg='white', font=('Arial', 12, 'bold')).pack(side=tk.LEFT, padx=10)
         
-        tk.Button(button_frame, text="QUIT", command=self.root.quit,
+        tk.Button(button_frame, text="QUIT", command=self.quit,
                  bg='#FF5722', fg='white', font=('Arial', 12, 'bold')).pack(side=tk.LEFT, padx=10)
 
     def toggle_selection(self, card):
@@ -1004,92 +4749,60 @@ Aturan Dasar:
             self.selected.remove(card)
         else:
             self.selected.append(card)
-        self.update_hand()
+        if self.hint_shown and self.human_turn():
+            # Dari cache: daftar hint langsung menyempit ke pilihan sekarang
+            self.update_hint_label(self.hints.get(GameState.from_engine(self)))
+        self.mark_dirty('hand')
 
     def update_hand(self):
-        # Clear existing widgets
-        for widget in self.hand_frame.winfo_children():
-            widget.destroy()
-        
         # Sort cards
-        self.players[0].sort_cards()
-        
-        # Display cards
-        for i, card in enumerate(self.players[0].cards):
-            is_selected = card in self.selected
-            bg_color = '#FFD700' if is_selected else 'white'
-            text_color = 'black'
-            
-            # Determine card color
-            if card.suit in ['♥', '♦']:
-                text_color = 'red'
-            
-            card_btn = tk.Button(self.hand_frame, text=str(card), bg=bg_color, fg=text_color,
-                                font=self.card_font, width=6, height=3, bd=2, relief='raised',
-                                command=lambda c=card: self.toggle_selection(c))
-            card_btn.grid(row=0, column=i, padx=2, pady=2)
+        self.players[0].sort_cards(self.compiled.card_key)
+        self.table_view.draw_hand()
 
-    def display_ai_cards(self, player_index, frame, count_label):
-        # Clear existing widgets
-        for widget in frame.winfo_children():
-            widget.destroy()
-        
-        player = self.players[player_index]
-        card_count = len(player.cards)
-        
-        # Update count label
-        count_label.config(text=f"{card_count} cards")
-        
-        # Show card backs for AI players
-        cards_to_show = min(card_count, 10)  # Show max 10 card backs
-        
-        for i in range(cards_to_show):
-            card_back = tk.Label(frame, text="🂠", bg='#4169E1', fg='white',
-                            font=('Arial', 12), width=3, height=2, bd=1, relief='raised')
-            
-            # FIX: Proper card display for different positions
-            if player_index == 1:  # Top player (horizontal)
-                card_back.grid(row=0, column=i, padx=1)
-            elif player_index == 2:  # Left player (vertical)
-                card_back.grid(row=i, column=0, pady=1)
-            else:  # Right player (vertical)
-                card_back.grid(row=i, column=0, pady=1)
-        
-        # Show skills indicator - only for human player
-        # For AI players, we don't show any skill indicators
-        if player_index == 0 and player.special_skills:
-            skills_indicator = tk.Label(frame, text="🌟", bg='#4a1a5f', fg='gold',
-                                    font=('Arial', 14))
-            if player_index == 1:
-                skills_indicator.grid(row=1, column=0, columnspan=cards_to_show)
-            else:
-                skills_indicator.grid(row=cards_to_show, column=0)
+    def display_ai_cards(self, player_index):
+        self.table_view.draw_seat(player_index)
 
     def display_center_cards(self):
-        # Clear existing widgets
-        for widget in self.center_cards.winfo_children():
-            widget.destroy()
-        
-        if not self.last_cards:
-            tk.Label(self.center_cards, text="No cards played yet", bg='#2d5a27', fg='white',
-                    font=self.info_font).pack()
-            return
-        
-        # Display last played cards
-        cards_frame = tk.Frame(self.center_cards, bg='#2d5a27')
-        cards_frame.pack()
-        
-        for i, card in enumerate(self.last_cards):
-            text_color = 'red' if card.suit in ['♥', '♦'] else 'black'
-            
-            card_lbl = tk.Label(cards_frame, text=str(card), bg='white', fg=text_color,
-                               font=self.card_font, width=6, height=3, bd=2, relief='raised')
-            card_lbl.grid(row=0, column=i, padx=2, pady=2)
+        self.table_view.draw_center()
 
     def update(self):
+        """Request a redraw of the dirty regions; calls within one tick share one flush"""
+        self.redraw_requests += 1
+        if self.flush_job is None:
+            # Pada kecepatan tinggi frame di antaranya dilewati
+            interval = self.clock.frame_interval()
+            if interval:
+                self.flush_job = self.root.after(interval, self.flush_redraw)
+            else:
+                self.flush_job = self.root.after_idle(self.flush_redraw)
+
+    def mark_dirty(self, *regions):
+        self.dirty.update(regions)
+        self.update()
+
+    def flush_redraw(self):
+        self.flush_job = None
+        dirty, self.dirty = self.dirty, set()
         if self.over:
             return
         
+        self.redraws += 1
+        if 'labels' in dirty:
+            self.update_labels()
+        if 'skills' in dirty:
+            self.update_skills_display()
+        if 'hand' in dirty:
+            self.update_hand()
+        if 'center' in dirty:
+            self.display_center_cards()
+        for i in range(1, len(self.players)):
+            if f'seat{i}' in dirty:
+                self.display_ai_cards(i)
+        
+        saved = self.redraw_requests - self.redraws
+        self.redraw_lbl.config(text=f"Redraws saved: {saved}")
+
+    def update_labels(self):
         # Update current player indicator
         current_player_name = self.players[self.current].name
         if self.players[self.current].skip_next_turn:
@@ -1100,12 +4813,9 @@ Aturan Dasar:
         if self.last_cards:
             combo_type, combo_val = self.logic.get_combo_type(self.last_cards)
             combo_text = f"Last: {combo_type.replace('_', ' ').title()} ({combo_val})"
-            cards_text = " ".join(str(c) for c in self.last_cards)
             self.combo_lbl.config(text=combo_text)
-            self.last_lbl.config(text=cards_text)
         else:
             self.combo_lbl.config(text="Combo: Free play")
-            self.last_lbl.config(text="Any valid combination")
         
         # Update pass count
         self.pass_lbl.config(text=f"Pass Count: {self.pass_count}")
@@ -1114,8 +4824,9 @@ Aturan Dasar:
         self.round_lbl.config(text=f"Round: {self.round_count + 1}")
         
         # Update skills info
-        rounds_until_skill = 4 - ((self.round_count + 1) % 4)
-        if rounds_until_skill == 4:
+        interval = self.rules.skill_interval
+        rounds_until_skill = interval - ((self.round_count + 1) % interval)
+        if rounds_until_skill == interval:
             rounds_until_skill = 0
         
         if self.skill_phase:
@@ -1125,23 +4836,11 @@ Aturan Dasar:
         else:
             self.skills_info.config(text=f"Next skill round in {rounds_until_skill} rounds")
         
-        # Update player skills display
-        player_skills = self.players[0].special_skills
-        if player_skills:
-            skills_text = "Skills: " + ", ".join(skill.name for skill in player_skills)
-            if self.players[0].shield_active:
-                skills_text += " | 🛡️ Shield Active"
-        else:
-            skills_text = "Skills: None"
-            if self.players[0].shield_active:
-                skills_text = "Skills: None | 🛡️ Shield Active"
-        
-        self.player_skills_lbl.config(text=skills_text)
-        
         # Update button states
-        if self.current == 0 and not self.over:
+        if self.human_turn():
             self.play_btn.config(state='normal')
             self.pass_btn.config(state='normal')
+            self.hint_btn.config(state='normal')
             if self.players[0].special_skills:
                 self.skill_btn.config(state='normal')
             else:
@@ -1149,20 +4848,24 @@ Aturan Dasar:
         else:
             self.play_btn.config(state='disabled')
             self.pass_btn.config(state='disabled')
+            self.hint_btn.config(state='disabled')
             self.skill_btn.config(state='disabled')
-        
-        # Update all displays
-        self.update_hand()
-        self.display_center_cards()
-        self.display_ai_cards(1, self.player2_cards, self.player2_count)
-        self.display_ai_cards(2, self.player3_cards, self.player3_count)
-        self.display_ai_cards(3, self.player4_cards, self.player4_count)
-        
-        # Update skills display
-        self.update_skills_display()
     
     def update_skills_display(self):
         """Update the skills display area - now hides AI skills"""
+        # Update player skills display
+        player_skills = self.players[0].special_skills
+        if player_skills:
+            skills_text = "Skills: " + ", ".join(skill.name for skill in player_skills)
+            if self.players[0].shield_active:
+                skills_text += " | 🛡️ Shield Active"
+        else:
+            skills_text = "Skills: None"
+            if self.players[0].shield_active:
+                skills_text = "Skills: None | 🛡️ Shield Active"
+        
+        self.player_skills_lbl.config(text=skills_text)
+        
         # Clear existing widgets
         for widget in self.skills_frame.winfo_children():
             widget.destroy()
@@ -1370,76 +5073,1038 @@ STRATEGY TIPS:
             if 0 <= index < len(player_cards):
                 card = player_cards[index]
                 self.toggle_selection(card)
-    
-    def enhanced_ai_strategy(self, ai_index):
-        """Enhanced AI strategy with skill usage"""
-        ai_player = self.players[ai_index]
-        
-        # Analyze game state
-        total_cards_left = sum(len(p.cards) for p in self.players)
-        avg_cards = total_cards_left / 4
-        ai_card_count = len(ai_player.cards)
-        
-        # Determine AI strategy based on position
-        if ai_card_count <= 3:
-            # Aggressive - try to win
-            strategy = "aggressive"
-        elif ai_card_count > avg_cards + 2:
-            # Defensive - try to catch up
-            strategy = "defensive"
+
+# --- Soak test for the Tk client ---
+
+SoakSample = namedtuple('SoakSample', ['turns', 'games', 'seconds', 'rss_mb', 'widgets', 'tcl_commands',
+                                       'after_jobs', 'canvas_items', 'update_p95_ms', 'update_max_ms'])
+
+def start_virtual_display(width=1600, height=1000):
+    """Start Xvfb on a free display number and point DISPLAY at it; returns the process"""
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        raise RuntimeError("Xvfb not found (install xvfb or run with --no-xvfb on a real display)")
+    for number in range(99, 199):
+        if os.path.exists(f'/tmp/.X{number}-lock'):
+            continue
+        proc = subprocess.Popen([xvfb, f':{number}', '-screen', '0', f'{width}x{height}x24', '-nolisten', 'tcp'],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 10
+        while time.time() < deadline and proc.poll() is None:
+            if os.path.exists(f'/tmp/.X11-unix/X{number}'):
+                os.environ['DISPLAY'] = f':{number}'
+                return proc
+            time.sleep(0.05)
+        proc.kill()
+    raise RuntimeError("could not start Xvfb")
+
+def process_rss():
+    """Resident set size of this process in bytes (0 where /proc is missing)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+class SoakDialogs:
+    """Stands in for tkinter.messagebox during a soak run; a modal dialog would block the driver"""
+    def __init__(self):
+        self.shown = Counter()
+
+    def showinfo(self, title=None, message=None, **options):
+        self.shown[title] += 1
+        return 'ok'
+
+    showwarning = showerror = showinfo
+
+    def askokcancel(self, title=None, message=None, **options):
+        self.shown[title] += 1
+        return True
+
+class SoakDriver:
+    """Plays a BigTwoGame as the human for a long session through the real Tk loop.
+
+    Each step calls root.update() and times it. On the human's turns the
+    driver sometimes goes through the skill menu, target picker and peek
+    window, then plays the hint move; game over windows are closed and a new
+    game dealt. Every sample_every turns it records a SoakSample.
+    """
+    def __init__(self, game, seed=None, popup_chance=0.3, sample_every=200):
+        self.game = game
+        self.rng = random.Random(seed)
+        self.popup_chance = popup_chance
+        self.sample_every = sample_every
+        self.games = 0
+        self.finished_turns = 0
+        self.latencies = []
+        self.samples = []
+        self.start = time.perf_counter()
+
+    @property
+    def turns(self):
+        return self.finished_turns + self.game.turns_played
+
+    def toplevels(self):
+        return [w for w in self.game.root.winfo_children() if isinstance(w, tk.Toplevel)]
+
+    def widget_count(self, path='.'):
+        """All Tk windows under path, including ones Tcl created without a Python wrapper"""
+        tcl = self.game.root.tk
+        children = tcl.splitlist(tcl.call('winfo', 'children', path))
+        return len(children) + sum(self.widget_count(child) for child in children)
+
+    def sample(self):
+        tcl = self.game.root.tk
+        latencies = sorted(self.latencies) or [0.0]
+        self.latencies = []
+        self.samples.append(SoakSample(
+            self.turns, self.games, round(time.perf_counter() - self.start, 1),
+            round(process_rss() / 2**20, 1), self.widget_count(),
+            len(tcl.splitlist(tcl.call('info', 'commands'))),
+            len(tcl.splitlist(tcl.call('after', 'info'))),
+            len(self.game.table_view.canvas.find_all()),
+            round(latencies[int(len(latencies) * 0.95)] * 1000, 2), round(latencies[-1] * 1000, 2)))
+        return self.samples[-1]
+
+    def step(self):
+        game = self.game
+        start = time.perf_counter()
+        game.root.update()
+        self.latencies.append(time.perf_counter() - start)
+
+        # Jendela peek / game over sudah tergambar sekali: tutup
+        popups = self.toplevels()
+        for window in popups:
+            window.destroy()
+        if game.over:
+            self.games += 1
+            self.finished_turns += game.turns_played
+            game.new_game()
+        elif not popups and game.human_turn() and game.scheduler.pending is None:
+            self.human_move()
+
+    def human_move(self):
+        game = self.game
+        if self.rng.random() < self.popup_chance:
+            self.use_skill_popup()
+            if not game.human_turn():
+                return
+        game.show_hint()
+        cards = [c for c in game.players[0].cards if game.hint_mask >> c.id & 1]
+        if not cards:
+            game.pass_turn()
+            return
+        for card in cards:
+            game.toggle_selection(card)
+        game.play()
+
+    def use_skill_popup(self):
+        game = self.game
+        game.show_skills_menu()
+        skills = game.players[0].special_skills
+        if not skills:
+            return
+        skill = self.rng.choice(skills)
+        game.use_skill(skill, self.toplevels()[-1])
+        if skill.effect_type in game.TARGETED_SKILLS and self.toplevels():
+            target = self.rng.randrange(1, len(game.players))
+            game.execute_targeted_skill(skill, 0, target, self.toplevels()[-1])
+
+    def run(self, turns, on_sample=None):
+        self.game.set_speed(0)
+        next_sample = self.sample_every
+        while self.turns < turns:
+            self.step()
+            if self.turns >= next_sample:
+                next_sample += self.sample_every
+                sample = self.sample()
+                if on_sample:
+                    on_sample(sample)
+        return self.samples
+
+def soak_growth(samples, max_rss_mb=20.0, max_latency_ratio=2.0, slack=None, warmup=0.25):
+    """Compare the start and end of a soak run; returns a list of failure messages"""
+    slack = slack or {'widgets': 20, 'tcl_commands': 50, 'after_jobs': 20, 'canvas_items': 30}
+    samples = samples[int(len(samples) * warmup):]
+    if len(samples) < 6:
+        return [f"only {len(samples)} samples after warmup; run more turns"]
+    third = len(samples) // 3
+    head, tail = samples[:third], samples[-third:]
+    failures = []
+
+    rss_growth = min(s.rss_mb for s in tail) - min(s.rss_mb for s in head)
+    if rss_growth > max_rss_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MB (limit {max_rss_mb} MB)")
+    # Hitungan yang bocor naik terus: bandingkan nilai minimum tiap jendela
+    for field, limit in slack.items():
+        growth = min(getattr(s, field) for s in tail) - min(getattr(s, field) for s in head)
+        if growth > limit:
+            failures.append(f"{field} grew by {growth} (limit {limit})")
+    base = sorted(s.update_p95_ms for s in head)[third // 2]
+    end = sorted(s.update_p95_ms for s in tail)[third // 2]
+    if end > base * max_latency_ratio + 2.0:
+        failures.append(f"update() p95 grew from {base:.2f} ms to {end:.2f} ms")
+    return failures
+
+# --- Multi-table spectator dashboard ---
+
+# Satu slot int64 per field; tiap meja punya DASH_WIDTH slot di shared memory
+DASH_SEQ, DASH_GAMES, DASH_TURNS, DASH_CURRENT, DASH_TABLE, DASH_WINNER, DASH_ROUND = range(7)
+DASH_SEATS = 8
+DASH_WIDTH = DASH_ROUND + 1 + DASH_SEATS
+
+def write_snapshot(shared, table, engine, games, turns, winner):
+    """Overwrite one table's slot. seq is odd while writing so readers can spot torn copies"""
+    base = table * DASH_WIDTH
+    seats = [len(p.cards) | len(p.special_skills) << 8 | p.shield_active << 16 | p.skip_next_turn << 17
+             for p in engine.players]
+    seats += [-1] * (DASH_SEATS - len(seats))
+    shared[base] += 1
+    shared[base + 1:base + DASH_WIDTH] = ([games, turns, engine.current, cards_mask(engine.last_cards),
+                                          winner, engine.round_count] + seats)
+    shared[base] += 1
+
+def read_snapshot(shared, table, tries=4):
+    """Latest consistent snapshot of a table, or None if every try raced a write"""
+    base = table * DASH_WIDTH
+    for _ in range(tries):
+        seq = shared[base]
+        snapshot = shared[base:base + DASH_WIDTH]
+        if not seq & 1 and shared[base] == seq:
+            return snapshot
+    return None
+
+def dashboard_worker(shared, tables, rules, seed, lineup, stop, delay):
+    """Play the given tables round-robin until stop is set. Runs in a worker process"""
+    engines = {}
+    for table in tables:
+        engine = GameEngine(rules, seed=None if seed is None else seed + table)
+        if lineup:
+            engine.seat_ai = [make_seat_ai(spec) for spec in lineup]
+        engine.deal()
+        engine.start_turns()
+        engines[table] = engine
+    games = dict.fromkeys(tables, 0)
+    turns = dict.fromkeys(tables, 0)
+    winners = dict.fromkeys(tables, -1)
+    while not stop.is_set():
+        for table, engine in engines.items():
+            if engine.scheduler.pending is None or engine.turns_played >= 5000:
+                games[table] += 1
+                turns[table] += engine.turns_played
+                winners[table] = -1 if engine.winner is None else engine.winner
+                engine.deal()
+                engine.start_turns()
+            else:
+                engine.scheduler.step()
+            write_snapshot(shared, table, engine, games[table], turns[table] + engine.turns_played,
+                           winners[table])
+        if delay:
+            time.sleep(delay)
+
+class SpectatorDashboard:
+    """A grid of AI-vs-AI tables on one canvas, redrawn at a fixed rate.
+
+    Workers overwrite each table's shared snapshot as fast as they play; the
+    window reads only the latest one every 1/fps seconds, so intermediate
+    states are never drawn and the UI cost depends on the number of tables,
+    not on how fast they play. Items are created once and only retexted.
+    """
+    def __init__(self, root, rules, shared, tables, columns=4, fps=10):
+        self.root = root
+        self.logic = GameLogic(rules)
+        self.num_players = rules.num_players
+        self.shared = shared
+        self.tables = tables
+        self.columns = columns
+        self.interval = max(1, int(1000 / fps))
+        self.canvas = tk.Canvas(root, bg='#0d4f3c', highlightthickness=0)
+        self.canvas.pack(fill='both', expand=True)
+        self.header = self.canvas.create_text(10, 8, text="", fill='gold', anchor='nw',
+                                              font=('Arial', 12, 'bold'))
+        self.cells = []
+        for table in range(tables):
+            self.cells.append({
+                'box': self.canvas.create_rectangle(0, 0, 0, 0, fill='#1a5f4a', outline='#0a2f22', width=2),
+                'title': self.canvas.create_text(0, 0, text=f"Table {table + 1}", fill='gold', anchor='nw',
+                                                 font=('Arial', 10, 'bold')),
+                'seats': self.canvas.create_text(0, 0, text="", fill='white', anchor='nw',
+                                                 font=('Courier', 9)),
+                'cards': self.canvas.create_text(0, 0, text="", fill='#ffe082', anchor='nw',
+                                                 font=('Arial', 10)),
+            })
+        self.last = [None] * tables
+        self.frames = 0
+        self.render_time = 0.0
+        self.start = time.perf_counter()
+        self.canvas.bind('<Configure>', lambda e: self.layout())
+        self.job = self.root.after(self.interval, self.render)
+
+    def layout(self):
+        width = max(self.canvas.winfo_width(), 400)
+        height = max(self.canvas.winfo_height(), 300) - 30
+        rows = (self.tables + self.columns - 1) // self.columns
+        cw, ch = width / self.columns, height / rows
+        for table, cell in enumerate(self.cells):
+            x, y = (table % self.columns) * cw, 30 + (table // self.columns) * ch
+            self.canvas.coords(cell['box'], x + 3, y + 3, x + cw - 3, y + ch - 3)
+            self.canvas.coords(cell['title'], x + 10, y + 8)
+            self.canvas.coords(cell['seats'], x + 10, y + 26)
+            self.canvas.coords(cell['cards'], x + 10, y + ch - 24)
+
+    def cell_text(self, table, snapshot):
+        current = snapshot[DASH_CURRENT]
+        lines = []
+        for seat in range(self.num_players):
+            packed = snapshot[DASH_ROUND + 1 + seat]
+            marker = '▶' if seat == current else ' '
+            line = f"{marker} P{seat} {packed & 0xFF:>2} cards"
+            if packed >> 8 & 0xFF:
+                line += f"  ✦{packed >> 8 & 0xFF}"
+            if packed >> 16 & 1:
+                line += " 🛡"
+            if packed >> 17 & 1:
+                line += " ⏭"
+            lines.append(line)
+        title = f"Table {table + 1}  game {snapshot[DASH_GAMES] + 1}  round {snapshot[DASH_ROUND] + 1}"
+        if snapshot[DASH_WINNER] >= 0:
+            title += f"  last winner P{snapshot[DASH_WINNER]}"
+        table_mask = snapshot[DASH_TABLE]
+        if table_mask:
+            combo, _ = self.logic.mask_combo(table_mask)
+            played = " ".join(str(c) for c in self.logic.mask_cards(table_mask))
+            cards = f"{played}  ({combo.replace('_', ' ')})"
         else:
-            # Balanced
-            strategy = "balanced"
-        
-        # Use skills based on strategy
-        if ai_player.special_skills:
-            for skill in ai_player.special_skills[:]:  # Copy list to avoid modification during iteration
-                if self.should_ai_use_skill(skill, ai_index, strategy):
-                    ai_player.use_skill(skill)
-                    self.apply_skill_effect(skill, ai_index)
-                    self.update()
-                    return True
-        
-        return False
-    
-    def should_ai_use_skill(self, skill, ai_index, strategy):
-        """Determine if AI should use a specific skill"""
-        ai_player = self.players[ai_index]
-        
-        # Basic probability based on strategy
-        if strategy == "aggressive":
-            base_prob = 0.3
-        elif strategy == "defensive":
-            base_prob = 0.4
+            cards = "free play"
+        return title, "\n".join(lines), cards
+
+    def render(self):
+        start = time.perf_counter()
+        games = turns = 0
+        for table, cell in enumerate(self.cells):
+            snapshot = read_snapshot(self.shared, table)
+            if snapshot is None:
+                snapshot = self.last[table]
+            if snapshot is None:
+                continue
+            games += snapshot[DASH_GAMES]
+            turns += snapshot[DASH_TURNS]
+            # seq berubah = meja bergerak sejak frame terakhir
+            if self.last[table] is not None and self.last[table][DASH_SEQ] == snapshot[DASH_SEQ]:
+                continue
+            self.last[table] = snapshot
+            title, seats, cards = self.cell_text(table, snapshot)
+            self.canvas.itemconfigure(cell['title'], text=title)
+            self.canvas.itemconfigure(cell['seats'], text=seats)
+            self.canvas.itemconfigure(cell['cards'], text=cards)
+        self.frames += 1
+        self.render_time += time.perf_counter() - start
+        elapsed = time.perf_counter() - self.start
+        self.canvas.itemconfigure(self.header, text=(
+            f"{self.tables} tables | {games} games | {turns / elapsed:,.0f} turns/s | "
+            f"render {self.render_time / self.frames * 1000:.2f} ms/frame at {1000 / self.interval:.0f} Hz"))
+        self.job = self.root.after(self.interval, self.render)
+
+def run_dashboard(rules, tables=16, workers=None, columns=4, fps=10, seed=None, lineup=None, delay=0.0):
+    """Start the table workers, then show the dashboard until the window closes"""
+    workers = max(1, min(workers or os.cpu_count() or 1, tables))
+    shared = multiprocessing.Array('q', tables * DASH_WIDTH, lock=False)
+    stop = multiprocessing.Event()
+    # Worker dimulai sebelum Tk dibuat: jangan fork proses yang sudah punya Tk
+    processes = [multiprocessing.Process(target=dashboard_worker, daemon=True,
+                                         args=(shared, list(range(w, tables, workers)), rules, seed,
+                                               lineup, stop, delay))
+                 for w in range(workers)]
+    for process in processes:
+        process.start()
+    try:
+        root = tk.Tk()
+        root.title(f"🃏 Big Two - {tables} tables")
+        root.geometry("1400x900")
+        dashboard = SpectatorDashboard(root, rules, shared, tables, columns, fps)
+        root.mainloop()
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+    return dashboard
+
+def build_rules(args):
+    suit_order = tuple(args.suit_order) if args.suit_order else ('♠', '♣', '♦', '♥')
+    return RuleConfig(num_players=args.players, cards_per_hand=args.cards,
+                      suit_order=suit_order, flush_beats_straight=args.flush_beats_straight,
+                      twos_in_straights=not args.no_twos_in_straights, skill_interval=args.skill_interval,
+                      disabled_skills=args.disable_skill, sniper_cards=args.sniper_cards,
+                      chaos_cards=args.chaos_cards)
+
+def add_rule_arguments(parser):
+    parser.add_argument('--players', type=int, default=4, help="Number of players (2-8)")
+    parser.add_argument('--cards', type=int, default=None, help="Cards per hand (default 13 or 52 / players)")
+    parser.add_argument('--suit-order', default=None, help="Suits low to high, e.g. ♦♣♥♠")
+    parser.add_argument('--flush-beats-straight', action='store_true',
+                        help="5-card combos of different types can beat each other")
+    parser.add_argument('--no-twos-in-straights', action='store_true', help="Disallow 2s in straights")
+    parser.add_argument('--skill-interval', type=int, default=4, help="Hand out skills every N rounds")
+    parser.add_argument('--disable-skill', action='append', default=[], help="Skill effect to leave out, e.g. chaos")
+    parser.add_argument('--sniper-cards', type=int, default=1, help="Cards the Sniper skill discards")
+    parser.add_argument('--chaos-cards', type=int, default=1, help="Cards each player passes with Chaos")
+
+def build_seat_ai(num_players, model_path=None, seats=None, params_path=None, difficulty=None):
+    """GreedyAI (TunedAI with params_path, TieredAI with difficulty) for every seat,
+    LearnedAI (from model_path) for the listed seats"""
+    if difficulty:
+        params = AIParams.load(params_path) if params_path else None
+        seat_ai = [TieredAI(difficulty, params) for _ in range(num_players)]
+    elif params_path:
+        seat_ai = [TunedAI(AIParams.load(params_path))] * num_players
+    else:
+        seat_ai = [GreedyAI()] * num_players
+    if model_path:
+        learned = LearnedAI(EvalModel.load(model_path))
+        for i in (range(num_players) if seats is None else seats):
+            seat_ai[i] = learned
+    return seat_ai
+
+def cmd_simulate(args):
+    rules = build_rules(args)
+    seats = [int(s) for s in args.model_seats.split(',')]
+    seat_ai = build_seat_ai(rules.num_players, args.model, seats, args.params)
+    event_log = EventLog(args.log) if args.log else None
+    try:
+        beat_table = BeatTable(args.beat_tables) if args.beat_tables else None
+        result = run_simulation(rules, args.games, seed=args.seed, seat_ai=seat_ai, event_log=event_log,
+                                beat_table=beat_table)
+    finally:
+        if event_log:
+            event_log.close()
+    print(f"{args.games} games, {rules.num_players} players, {rules.cards_per_hand} cards each")
+    for i, w in enumerate(result['wins']):
+        print(f"  Seat {i} ({seat_ai[i].name}): {w} wins")
+    if result['unfinished']:
+        print(f"  Unfinished: {result['unfinished']}")
+    print(f"{result['games_per_sec']:.1f} games/sec ({result['turns']} turns in {result['seconds']:.2f}s)")
+    if args.model:
+        print(f"Learned AI: {seat_ai[seats[0]].ms_per_move():.3f} ms per decision")
+
+def cmd_tiers(args):
+    rules = build_rules(args)
+    print(f"{args.games} games per tier, tier AI in seat 0 against greedy")
+    print(f"{'tier':>7} {'budget':>7} {'win%':>6} {'median':>7} {'p99':>7} {'max':>7} {'miss':>5} "
+          f"{'fallbk':>6} {'rollouts':>8} {'changed':>7} {'gain':>6}")
+    for tier in args.tiers:
+        ai = TieredAI(tier, seed=args.seed)
+        seat_ai = [ai] + [GreedyAI()] * (rules.num_players - 1)
+        result = run_simulation(rules, args.games, seed=args.seed, seat_ai=seat_ai)
+        play = ai.stats['play'].summary()
+        skill = ai.stats['skill'].summary()
+        misses = play['misses'] + (skill['misses'] if skill else 0)
+        print(f"{tier:>7} {ai.budget_ms:>5.0f}ms {result['wins'][0] / args.games * 100:>5.1f}% "
+              f"{play['median_ms']:>5.1f}ms {play['p99_ms']:>5.1f}ms {play['max_ms']:>5.1f}ms {misses:>5} "
+              f"{play['fallbacks']:>6} {play['rollouts']:>8.1f} {play['changed']:>7} {play['gain']:>6.3f}")
+
+def cmd_selfplay(args):
+    rules = build_rules(args)
+    start = time.perf_counter()
+    manifest = run_selfplay(rules, args.games, args.workers, args.out, args.epsilon, args.seed, args.model,
+                            args.checkpoint_games)
+    rows = sum(s['rows'] for s in manifest['shards'])
+    print(f"{args.games} games -> {rows} samples in {len(manifest['shards'])} shards "
+          f"({time.perf_counter() - start:.1f}s), manifest: {os.path.join(args.out, 'manifest.json')}")
+
+def cmd_tune(args):
+    rules = build_rules(args)
+    start = time.perf_counter()
+    best, rate, games = search_params(rules, args.candidates, args.rounds, args.games, args.workers, args.seed,
+                                      checkpoint_path=args.checkpoint, checkpoint_secs=args.checkpoint_secs)
+    best.save(args.out)
+    print(f"best win rate {rate:.3f} over {games} games (even share {1 / rules.num_players:.3f}), "
+          f"{time.perf_counter() - start:.1f}s -> {args.out}")
+    for name, value in best.to_dict().items():
+        print(f"  {name} = {value:.3f}" if isinstance(value, float) else f"  {name} = {value}")
+
+def parse_overrides(items, rules, lineup):
+    """Apply KEY=VALUE overrides (RuleConfig arguments or 'lineup') to a copy of an arm"""
+    kwargs = rules.to_dict()
+    lineup = list(lineup)
+    for item in items:
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Override '{item}' must look like KEY=VALUE")
+        if key == 'lineup':
+            lineup = value.split(',')
+        elif key == 'disabled_skills':
+            kwargs[key] = [v for v in value.split(',') if v]
+        elif key in kwargs:
+            try:
+                kwargs[key] = json.loads(value)
+            except ValueError:
+                kwargs[key] = value
         else:
-            base_prob = 0.2
-        
-        # Skill-specific logic
-        if skill.effect_type == "shield":
-            # Use shield if vulnerable (many cards)
-            return len(ai_player.cards) > 8 and random.random() < base_prob
-        
-        elif skill.effect_type == "force_discard":
-            # Use sniper against player with few cards
-            min_cards = min(len(p.cards) for i, p in enumerate(self.players) if i != ai_index)
-            return min_cards <= 5 and random.random() < base_prob
-        
-        elif skill.effect_type == "skip":
-            # Use skip strategically
-            return random.random() < base_prob * 0.7
-        
-        elif skill.effect_type == "wild_play":
-            # Use wild play when stuck or to make aggressive play
-            return len(ai_player.cards) <= 4 and random.random() < base_prob * 1.5
-        
+            raise ValueError(f"Unknown override '{key}'")
+    return RuleConfig(**kwargs), lineup
+
+def cmd_experiment(args):
+    rules = build_rules(args)
+    lineup = args.lineup.split(',') if args.lineup else ['greedy'] * rules.num_players
+    control = parse_overrides(args.control, rules, lineup)
+    variant = parse_overrides(args.variant, rules, lineup)
+    result = run_experiment(control, variant, args.metric, args.max_deals, args.batch, args.min_deals,
+                            args.alpha, args.tau, args.workers, args.seed,
+                            checkpoint_path=args.checkpoint, checkpoint_secs=args.checkpoint_secs)
+    verdict = "significant" if result['significant'] else "not significant"
+    print(f"{args.metric}: control {result['control']:.4f}, variant {result['variant']:.4f}, "
+          f"effect {result['effect']:+.4f} +/- {result['ci95']:.4f} ({verdict}, p <= {result['p_value']:.3f})")
+    print(f"{result['games']} games over {result['deals']} deals (seed {result['seed']}); "
+          f"stopping early saved {result['max_games'] - result['games']} of {result['max_games']}")
+    if result['tau']:
+        print(f"test tuned for an effect of {result['tau']:.4f} per deal")
+    print(f"independent games for the same precision: {result['independent_games']} "
+          f"({result['independent_games'] / result['games']:.1f}x the games played)")
+
+def cmd_ladder(args):
+    rules = build_rules(args)
+    ladder = RatingLadder.load(args.state) if args.state and os.path.exists(args.state) else RatingLadder()
+    for spec in args.ai or ['greedy', 'tuned']:
+        make_seat_ai(spec)  # nama AI yang salah ketahuan sebelum worker mulai
+        ladder.add(spec)
+    start = time.perf_counter()
+    run_ladder(rules, ladder, args.games, args.batch, args.workers, args.seed)
+    if args.state:
+        ladder.save(args.state)
+    print(f"{args.games} games in {time.perf_counter() - start:.1f}s")
+    print(f"{'AI':<24} {'rating':>7} {'95% interval':>17} {'games':>7} {'wins':>6}")
+    for name, mu, low, high, played, wins in ladder.standings():
+        print(f"{name:<24} {mu:>7.2f} [{low:>6.2f}, {high:>6.2f}] {played:>7} {wins:>6}")
+
+def cmd_bot(args):
+    run_reference_bot(seed=args.seed)
+
+def collect_bot_positions(rules, games, seed):
+    """Play positions of greedy games as protocol dicts, with the greedy answer for each"""
+    collected = []
+
+    class Recorder(GreedyAI):
+        def choose_play(self, engine):
+            play = super().choose_play(engine)
+            cards = engine.players[engine.current].cards
+            plays = engine.logic.find_valid_plays(cards, engine.last_cards, engine.last_type,
+                                                  engine.last_val, engine.is_first_round)
+            legal = [cards_mask(p) for p in plays] + [PASS_ACTION]
+            collected.append((engine.logic.opening_id, bot_position(engine, 'play', legal),
+                              cards_mask(play) if play else PASS_ACTION))
+            return play
+
+    engine = GameEngine(rules, seed=seed)
+    engine.seat_ai = [Recorder()] * rules.num_players
+    for _ in range(games):
+        engine.play_game()
+    return collected
+
+def cmd_bot_bench(args):
+    rules = build_rules(args)
+    command = args.command_line or [sys.executable, os.path.abspath(__file__), 'bot']
+    client = BotClient(command)
+    try:
+        # 1. Game penuh: kursi 0 dimainkan bot, satu query per keputusan
+        bot = ExternalBotAI(client, args.movetime)
+        engine = GameEngine(rules, seed=args.seed)
+        engine.seat_ai = [bot] + [GreedyAI()] * (rules.num_players - 1)
+        for _ in range(args.games):
+            engine.play_game()
+        print(f"bot '{client.name}': {args.games} games, {client.queries} moves, "
+              f"{client.seconds / max(client.queries, 1) * 1000:.3f} ms round trip per move, "
+              f"{client.timeouts} timeouts, {bot.fallbacks} greedy fallbacks")
+
+        # 2. Query batch: posisi yang sama dikirim dalam batch berbagai ukuran
+        positions = collect_bot_positions(rules, args.games, args.seed)
+        local = GameEngine(rules)
+        start = time.perf_counter()
+        for opening, pos, _ in positions:
+            local.logic.opening_id = opening
+            fields = {k: str(v) for k, v in pos.items()}
+            fields['legal'] = ','.join(format(a, 'x') for a in pos['legal'])
+            reference_bot_move(local, fields)
+        in_process = (time.perf_counter() - start) / len(positions) * 1e6
+        print(f"in process: {in_process:.0f} us per position (reference bot's own work)")
+        for size in [int(b) for b in args.batch.split(',')]:
+            client.queries = client.positions = 0
+            client.seconds = 0.0
+            agree = 0
+            for start in range(0, len(positions), size):
+                chunk = positions[start:start + size]
+                # Satu batch per game: opening card harus sama untuk semua posisi
+                for opening in sorted({c[0] for c in chunk}):
+                    part = [c for c in chunk if c[0] == opening]
+                    client.new_game(rules, opening)
+                    answers = client.query([p for _, p, _ in part], args.movetime)
+                    agree += sum(a == expected for a, (_, _, expected) in zip(answers, part))
+            per_position = client.seconds / client.positions * 1e6
+            print(f"batch {size:>3}: {per_position:.0f} us per position ({per_position - in_process:.0f} us "
+                  f"protocol overhead), agrees with ai_find_best_play on {agree}/{len(positions)}")
+    finally:
+        client.close()
+
+def format_event(event):
+    text = f"game {event.game:>6} #{event.seq:<4} {EVENT_NAMES.get(event.kind, event.kind):<14} player {event.player}"
+    if event.target != NO_INDEX:
+        text += f" target {event.target}"
+    if event.skill != NO_INDEX:
+        text += f" skill {SKILL_EFFECTS[event.skill]}"
+    if event.cards:
+        text += " " + " ".join(str(c) for c in sorted(
+            (CARDS[i] for i in range(52) if event.cards >> i & 1), key=lambda c: c.id))
+    return text
+
+def cmd_events(args):
+    archive = EventArchive(args.path)
+    try:
+        if not args.kind and args.game is None:
+            games = archive.record(len(archive) - 1).game - archive.record(0).game + 1 if len(archive) else 0
+            print(f"{len(archive)} events, {games} games, {os.path.getsize(args.path)} bytes")
+            for name, count in archive.kind_counts().items():
+                print(f"  {name:<14} {count}")
+            return
+        kinds = args.kind or None
+        for i, event in enumerate(archive.events(kinds, args.game)):
+            if i >= args.limit:
+                break
+            print(format_event(event))
+    finally:
+        archive.close()
+
+def cmd_record(args):
+    rules = build_rules(args)
+    lineup = args.lineup.split(',') if args.lineup else ['greedy'] * rules.num_players
+    start = time.perf_counter()
+    records = record_games(rules, args.games, args.seed, lineup)
+    save_corpus(args.out, records)
+    actions = sum(len(r.actions) for r in records)
+    print(f"recorded {len(records)} games ({actions} actions) in {time.perf_counter() - start:.1f}s -> {args.out}")
+
+def cmd_replay(args):
+    start = time.perf_counter()
+    games = actions = 0
+    failures = []
+    engine = None
+    for number, record in enumerate(load_corpus(args.corpus)):
+        try:
+            engine = replay_game(record, args.check_ai, engine)
+        except ReplayDivergence as e:
+            failures.append((number, record, e))
+            if len(failures) >= args.max_failures:
+                break
+        games += 1
+        actions += len(record.actions)
+    elapsed = time.perf_counter() - start
+    print(f"replayed {games} games ({actions} actions) in {elapsed:.2f}s "
+          f"({actions / elapsed if elapsed else 0:.0f} actions/sec), {len(failures)} diverged")
+    for number, record, e in failures:
+        print(f"game {number} (seed {record.seed}), action {e.index}: {e}")
+        if e.expected and e.actual:
+            logic = GameLogic(RuleConfig(**record.rules))
+            for line in describe_state_diff(logic, e.expected, e.actual):
+                print(f"    {line}")
+    if failures:
+        sys.exit(1)
+
+def cmd_beat_tables(args):
+    rules = build_rules(args)
+    start = time.perf_counter()
+    table, samples = build_beat_tables(rules, args.games, args.seed)
+    save_beat_tables(args.out, table)
+    print(f"{samples} samples from {args.games} games in {time.perf_counter() - start:.1f}s -> {args.out}")
+    lookup = BeatTable(args.out)
+    for combo in BEAT_TYPES:
+        row = ' '.join(f"{RANK_ORDER[r]}:{lookup.probability(combo, r, 39, [13, 13, 13]):.2f}" for r in range(13))
+        print(f"  {combo:<6} vs three 13-card hands: {row}")
+
+def cmd_soak(args):
+    global messagebox
+    xvfb = None
+    if not args.no_xvfb:
+        try:
+            xvfb = start_virtual_display()
+        except RuntimeError as e:
+            sys.exit(f"soak: {e}")
+        print(f"Xvfb on {os.environ['DISPLAY']}")
+    dialogs = SoakDialogs()
+    saved, messagebox = messagebox, dialogs
+    try:
+        game = BigTwoGame(build_rules(args), mainloop=False)
+        game.reseed(args.seed)
+        game.new_game()
+        driver = SoakDriver(game, args.seed, args.popup_chance, args.sample_every)
+        out = open(args.out, 'w') if args.out else None
+        print(f"{'turns':>7} {'games':>5} {'sec':>7} {'rss MB':>7} {'widgets':>7} {'tcl cmds':>8} "
+              f"{'after':>5} {'items':>5} {'p95 ms':>7} {'max ms':>7}")
+
+        def report(sample):
+            print(f"{sample.turns:>7} {sample.games:>5} {sample.seconds:>7} {sample.rss_mb:>7} {sample.widgets:>7} "
+                  f"{sample.tcl_commands:>8} {sample.after_jobs:>5} {sample.canvas_items:>5} "
+                  f"{sample.update_p95_ms:>7} {sample.update_max_ms:>7}")
+            if out:
+                out.write(json.dumps(sample._asdict()) + "\n")
+                out.flush()
+
+        samples = driver.run(args.turns, report)
+        if out:
+            out.close()
+        game.root.destroy()
+    finally:
+        messagebox = saved
+        if xvfb:
+            xvfb.terminate()
+
+    print(f"Games: {driver.games}, dialogs: {dict(dialogs.shown)}")
+    failures = soak_growth(samples, args.max_rss_growth, args.max_latency_ratio)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK: no growth in memory, widgets, after queue or update() latency")
+
+def cmd_dashboard(args):
+    lineup = args.lineup.split(',') if args.lineup else None
+    dashboard = run_dashboard(build_rules(args), args.tables, args.workers, args.columns, args.fps,
+                              args.seed, lineup, args.turn_delay)
+    if dashboard.frames:
+        print(f"{dashboard.frames} frames, {dashboard.render_time / dashboard.frames * 1000:.2f} ms per frame")
+
+def cmd_train(args):
+    data = load_samples(args.data)
+    model, train_mse, valid_mse = train_model(data, args.model, hidden=args.hidden, epochs=args.epochs,
+                                              seed=args.seed)
+    model.save(args.out)
+    print(f"{args.model} model on {len(data)} samples: train mse {train_mse:.4f}, "
+          f"validation mse {valid_mse:.4f} -> {args.out}")
+
+def cmd_bench_state(args):
+    rules = build_rules(args)
+    engine = GameEngine(rules, seed=args.seed)
+    rng = random.Random(args.seed)
+    clones = applies = 0
+    sizes = []
+    clone_time = apply_time = 0.0
+    for _ in range(args.games):
+        engine.deal()
+        stack = StateStack(GameState.from_engine(engine))
+        while not stack.top.over:
+            actions = stack.top.legal_actions()
+            start = time.perf_counter()
+            for _ in range(100):
+                stack.top.clone()
+            clone_time += time.perf_counter() - start
+            clones += 100
+
+            # Coba semua aksi lalu undo, seperti satu level lookahead
+            start = time.perf_counter()
+            for action in actions:
+                stack.apply(action, rng)
+                stack.undo()
+            apply_time += time.perf_counter() - start
+            applies += len(actions)
+
+            sizes.append(stack.top.memory_size())
+            stack.apply(rng.choice(actions), rng)
+    print(f"clone: {clone_time / clones * 1e9:.0f} ns, apply+undo: {apply_time / applies * 1e6:.2f} us")
+    print(f"state size: avg {sum(sizes) / len(sizes):.0f} bytes, max {max(sizes)} bytes")
+
+def cmd_batch_sim(args):
+    rules = build_rules(args)
+    if np is None:
+        sys.exit("batch-sim needs NumPy")
+    if args.check:
+        diffs = compare_batch_engine(rules, args.check, seed=args.seed)
+        print(f"check: {args.check} deals on both engines, {diffs} differ (every batched play verified)")
+        if diffs:
+            sys.exit(1)
+    # Satu proses = satu core untuk kedua engine
+    batched = run_batch_simulation(rules, args.games, batch=args.batch, seed=args.seed)
+    objects = run_simulation(rules, args.object_games, seed=args.seed,
+                             seat_ai=[LowestComboAI()] * rules.num_players)
+    for name, result, games in (('batched', batched, args.games), ('object', objects, args.object_games)):
+        wins = ", ".join(f"{w / games * 100:.1f}%" for w in result['wins'])
+        print(f"{name:>8}: {games} games in {result['seconds']:.2f}s, "
+              f"{result['games_per_sec']:.0f} games/sec per core (seat wins {wins})")
+    print(f"speedup: {batched['games_per_sec'] / objects['games_per_sec']:.1f}x")
+
+def cmd_profile_diff(args):
+    before = load_profile_summary(args.before)
+    after = load_profile_summary(args.after)
+    rows = []
+    for name in set(before) | set(after):
+        own0, total0 = before.get(name, (0.0, 0.0))
+        own1, total1 = after.get(name, (0.0, 0.0))
+        rows.append((own1 - own0, total1 - total0, own0, own1, name))
+    rows.sort(key=lambda row: (-abs(row[0]), row[4]))
+    print(f"{'self% before':>12} {'after':>7} {'delta':>7} {'total% delta':>12}  function")
+    for d_own, d_total, own0, own1, name in rows[:args.top]:
+        print(f"{own0:>12.2f} {own1:>7.2f} {d_own:>+7.2f} {d_total:>+12.2f}  {name}")
+
+def cmd_bus_bench(args):
+    rules = build_rules(args)
+    # Event nyata dari satu simulasi, lalu dipublish ulang untuk mengukur bus saja
+    recorder = EventBus()
+    tape = recorder.subscribe(maxlen=1 << 30)
+    run_simulation(rules, args.games, seed=args.seed, event_bus=recorder)
+    events = list(tape.queue)
+    print(f"{len(events)} events from {args.games} games")
+    print(f"{'subscribers':>11} {'batch':>6} {'us/event':>9} {'dropped':>9}")
+    for count in args.subscribers:
+        for batch in (1, args.batch):
+            bus = EventBus(batch=batch)
+            subs = [bus.subscribe(maxlen=args.maxlen, policy=BUS_POLICIES[i % len(BUS_POLICIES)])
+                    for i in range(count)]
+            start = time.perf_counter()
+            for event in events:
+                bus.publish(event)
+            bus.flush()
+            elapsed = time.perf_counter() - start
+            print(f"{count:>11} {batch:>6} {elapsed / len(events) * 1e6:>9.2f} "
+                  f"{sum(s.dropped for s in subs):>9}")
+
+    # Turn loop dengan dan tanpa pengamat yang sengaja lambat
+    base = run_simulation(rules, args.games, seed=args.seed)
+    bus = EventBus(batch=args.batch)
+    slow = bus.subscribe(maxlen=args.maxlen).start(lambda batch: time.sleep(0.01))
+    live = bus.subscribe(maxlen=args.maxlen, policy='coalesce').start(lambda batch: None)
+    result = run_simulation(rules, args.games, seed=args.seed, event_bus=bus)
+    slow.close()
+    live.close()
+    print(f"no bus: {base['games_per_sec']:.1f} games/sec, "
+          f"bus + slow observer: {result['games_per_sec']:.1f} games/sec")
+    for name, sub in (('slow', slow), ('coalesce', live)):
+        stats = sub.stats()
+        print(f"  {name}: received {stats['received']}, delivered {stats['delivered']}, "
+              f"dropped {stats['dropped']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remi Big Two - Special Edition")
+    parser.add_argument('--model', default=None, help="Weights file for the AI players in the window")
+    parser.add_argument('--difficulty', choices=list(DIFFICULTY_TIERS), default=None,
+                        help="AI difficulty tier (per-move time budget) for the window")
+    parser.add_argument('--profile', default=None, metavar='PATH',
+                        help="Sample the run with a SIGPROF timer; collapsed stacks to PATH, "
+                             "per-function summary to PATH.summary (pool workers are not sampled)")
+    parser.add_argument('--profile-interval', type=float, default=5.0, metavar='MS',
+                        help="CPU milliseconds between profiler samples")
+    parser.add_argument('--async', dest='async_loop', action='store_true',
+                        help="Run the window on an asyncio loop; AI moves are computed off the UI thread")
+    subparsers = parser.add_subparsers(dest='command')
+
+    sim = subparsers.add_parser('simulate', help="Play AI-only games without the window")
+    sim.add_argument('--games', type=int, default=100)
+    sim.add_argument('--seed', type=int, default=None)
+    sim.add_argument('--model', default=None, help="Weights file from 'train' for the learned AI")
+    sim.add_argument('--model-seats', default='0', help="Comma-separated seats that use --model")
+    sim.add_argument('--params', default=None, help="AI parameter file from 'tune' for the other seats")
+    sim.add_argument('--log', default=None, help="Append every game event to this binary event log")
+    sim.add_argument('--beat-tables', default=None, help="Beat-probability table file for AI risk decisions")
+    add_rule_arguments(sim)
+    sim.set_defaults(func=cmd_simulate)
+
+    bench = subparsers.add_parser('bench-state', help="Measure GameState clone/apply cost and size")
+    bench.add_argument('--games', type=int, default=20)
+    bench.add_argument('--seed', type=int, default=None)
+    add_rule_arguments(bench)
+    bench.set_defaults(func=cmd_bench_state)
+
+    batch_sim = subparsers.add_parser('batch-sim', help="Skill-less games in lockstep NumPy batches vs the object engine")
+    batch_sim.add_argument('--games', type=int, default=100000)
+    batch_sim.add_argument('--batch', type=int, default=4096, help="Games advanced together")
+    batch_sim.add_argument('--object-games', type=int, default=500, help="Games on the object engine")
+    batch_sim.add_argument('--check', type=int, default=0, metavar='N',
+                           help="First play N identical deals on both engines and compare")
+    batch_sim.add_argument('--seed', type=int, default=None)
+    add_rule_arguments(batch_sim)
+    batch_sim.set_defaults(func=cmd_batch_sim)
+
+    prof_diff = subparsers.add_parser('profile-diff', help="Compare two --profile summaries by self time")
+    prof_diff.add_argument('before')
+    prof_diff.add_argument('after')
+    prof_diff.add_argument('--top', type=int, default=25)
+    prof_diff.set_defaults(func=cmd_profile_diff)
+
+    bus_bench = subparsers.add_parser('bus-bench', help="Measure event bus publish cost and a slow observer")
+    bus_bench.add_argument('--games', type=int, default=200)
+    bus_bench.add_argument('--seed', type=int, default=1)
+    bus_bench.add_argument('--subscribers', type=int, nargs='+', default=[1, 10, 1000])
+    bus_bench.add_argument('--batch', type=int, default=32, help="Events per flush to subscribers")
+    bus_bench.add_argument('--maxlen', type=int, default=4096, help="Queue bound per subscriber")
+    add_rule_arguments(bus_bench)
+    bus_bench.set_defaults(func=cmd_bus_bench)
+
+    tiers = subparsers.add_parser('tiers', help="Play each difficulty tier against greedy and report deadlines")
+    tiers.add_argument('--games', type=int, default=50)
+    tiers.add_argument('--seed', type=int, default=1)
+    tiers.add_argument('--tiers', nargs='+', choices=list(DIFFICULTY_TIERS), default=list(DIFFICULTY_TIERS))
+    add_rule_arguments(tiers)
+    tiers.set_defaults(func=cmd_tiers)
+
+    selfplay = subparsers.add_parser('selfplay', help="Write self-play training samples to shards")
+    selfplay.add_argument('--games', type=int, default=1000)
+    selfplay.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    selfplay.add_argument('--out', default='selfplay_data')
+    selfplay.add_argument('--epsilon', type=float, default=0.1, help="Chance of a random exploring move")
+    selfplay.add_argument('--seed', type=int, default=None)
+    selfplay.add_argument('--model', default=None, help="Play with these weights instead of greedy")
+    selfplay.add_argument('--checkpoint-games', type=int, default=500,
+                          help="Games per worker between checkpoints in --out (0 disables resume)")
+    add_rule_arguments(selfplay)
+    selfplay.set_defaults(func=cmd_selfplay)
+
+    train = subparsers.add_parser('train', help="Fit the learned AI on self-play data (needs NumPy)")
+    train.add_argument('--data', default='selfplay_data')
+    train.add_argument('--model', choices=['linear', 'mlp'], default='linear')
+    train.add_argument('--hidden', type=int, default=16)
+    train.add_argument('--epochs', type=int, default=20)
+    train.add_argument('--seed', type=int, default=0)
+    train.add_argument('--out', default='ai_model.json')
+    train.set_defaults(func=cmd_train)
+
+    tune = subparsers.add_parser('tune', help="Search the AI skill parameters with simulated matches")
+    tune.add_argument('--candidates', type=int, default=24)
+    tune.add_argument('--rounds', type=int, default=4)
+    tune.add_argument('--games', type=int, default=25, help="Deals per candidate per round (x players rotations)")
+    tune.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    tune.add_argument('--seed', type=int, default=None)
+    tune.add_argument('--out', default=AI_PARAMS_FILE)
+    tune.add_argument('--checkpoint', default=None, help="Save progress here and resume from it if it exists")
+    tune.add_argument('--checkpoint-secs', type=float, default=30.0, help="Minimum seconds between checkpoints")
+    add_rule_arguments(tune)
+    tune.set_defaults(func=cmd_tune)
+
+    exp = subparsers.add_parser('experiment', help="A/B test a rule or AI change on duplicate deals")
+    exp.add_argument('--control', action='append', default=[], metavar='KEY=VALUE',
+                     help="Override for the control arm, e.g. sniper_cards=1 or lineup=tuned,greedy,greedy,greedy")
+    exp.add_argument('--variant', action='append', default=[], metavar='KEY=VALUE',
+                     help="Override for the variant arm")
+    exp.add_argument('--lineup', default=None, help="Comma-separated AIs for both arms (greedy, tuned[:file], "
+                                                    "learned:file); lineup[0] is the focus AI for win0")
+    exp.add_argument('--metric', choices=sorted(EXPERIMENT_METRICS), default='turns')
+    exp.add_argument('--max-deals', type=int, default=2000)
+    exp.add_argument('--min-deals', type=int, default=40)
+    exp.add_argument('--batch', type=int, default=20, help="Deals played between significance checks")
+    exp.add_argument('--alpha', type=float, default=0.05)
+    exp.add_argument('--tau', type=float, default=None,
+                     help="Effect size the test is tuned for (default: a quarter of the per-deal "
+                          "standard deviation over the first --min-deals deals, fixed from then on)")
+    exp.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    exp.add_argument('--seed', type=int, default=None)
+    exp.add_argument('--checkpoint', default=None, help="Save progress here and resume from it if it exists")
+    exp.add_argument('--checkpoint-secs', type=float, default=30.0, help="Minimum seconds between checkpoints")
+    add_rule_arguments(exp)
+    exp.set_defaults(func=cmd_experiment)
+
+    ladder = subparsers.add_parser('ladder', help="Rate AI variants on 4-player games, pairing by uncertainty")
+    ladder.add_argument('--ai', action='append', default=[], metavar='SPEC',
+                        help="AI to rate (greedy, tuned[:file], learned:file, bot:command); repeatable")
+    ladder.add_argument('--games', type=int, default=500)
+    ladder.add_argument('--batch', type=int, default=32, help="Games picked and played between rating updates")
+    ladder.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    ladder.add_argument('--seed', type=int, default=None)
+    ladder.add_argument('--state', default=None, help="Ratings file to continue from and save to")
+    add_rule_arguments(ladder)
+    ladder.set_defaults(func=cmd_ladder)
+
+    bot = subparsers.add_parser('bot', help="Run the reference bot on stdin/stdout (external bot protocol)")
+    bot.add_argument('--seed', type=int, default=None)
+    bot.set_defaults(func=cmd_bot)
+
+    bot_bench = subparsers.add_parser('bot-bench', help="Measure the round trip to an external bot process")
+    bot_bench.add_argument('--command-line', default=None, help="Bot command (default: the reference bot)")
+    bot_bench.add_argument('--games', type=int, default=20)
+    bot_bench.add_argument('--movetime', type=int, default=100, help="Milliseconds allowed per move")
+    bot_bench.add_argument('--batch', default='1,8,64', help="Batch sizes to measure")
+    bot_bench.add_argument('--seed', type=int, default=None)
+    add_rule_arguments(bot_bench)
+    bot_bench.set_defaults(func=cmd_bot_bench)
+
+    events = subparsers.add_parser('events', help="Summarize or list the records of an event log")
+    events.add_argument('path')
+    events.add_argument('--kind', action='append', default=[], choices=list(EVENT_NAMES.values()))
+    events.add_argument('--game', type=int, default=None)
+    events.add_argument('--limit', type=int, default=50)
+    events.set_defaults(func=cmd_events)
+
+    record = subparsers.add_parser('record', help="Record seeded AI games into a golden replay corpus")
+    record.add_argument('--games', type=int, default=2000)
+    record.add_argument('--seed', type=int, default=1)
+    record.add_argument('--lineup', default=None, help="Comma-separated AIs (default greedy for every seat)")
+    record.add_argument('--out', default='golden_games.jsonl.gz')
+    add_rule_arguments(record)
+    record.set_defaults(func=cmd_record)
+
+    replay = subparsers.add_parser('replay', help="Replay a corpus and fail on the first divergence per game")
+    replay.add_argument('corpus', nargs='?', default='golden_games.jsonl.gz')
+    replay.add_argument('--check-ai', action='store_true', help="Also check the AI still picks every recorded action")
+    replay.add_argument('--max-failures', type=int, default=5)
+    replay.set_defaults(func=cmd_replay)
+
+    beat = subparsers.add_parser('beat-tables', help="Precompute the AI's beat-probability tables")
+    beat.add_argument('--games', type=int, default=2000)
+    beat.add_argument('--seed', type=int, default=None)
+    beat.add_argument('--out', default=BEAT_TABLE_FILE)
+    add_rule_arguments(beat)
+    beat.set_defaults(func=cmd_beat_tables)
+
+    soak = subparsers.add_parser('soak', help="Drive the Tk client for a long session and fail on growth")
+    soak.add_argument('--turns', type=int, default=20000)
+    soak.add_argument('--seed', type=int, default=1)
+    soak.add_argument('--sample-every', type=int, default=200, help="Turns between samples")
+    soak.add_argument('--popup-chance', type=float, default=0.3, help="Chance the human opens the skill menu")
+    soak.add_argument('--max-rss-growth', type=float, default=20.0, help="Allowed RSS growth in MB")
+    soak.add_argument('--max-latency-ratio', type=float, default=2.0, help="Allowed update() p95 growth factor")
+    soak.add_argument('--no-xvfb', action='store_true', help="Use the current DISPLAY instead of starting Xvfb")
+    soak.add_argument('--out', default=None, help="Write the samples as JSON lines")
+    add_rule_arguments(soak)
+    soak.set_defaults(func=cmd_soak)
+
+    dash = subparsers.add_parser('dashboard', help="Watch many AI-vs-AI tables at once in one window")
+    dash.add_argument('--tables', type=int, default=16)
+    dash.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    dash.add_argument('--columns', type=int, default=4)
+    dash.add_argument('--fps', type=float, default=10.0, help="Redraws per second for the whole grid")
+    dash.add_argument('--turn-delay', type=float, default=0.0, help="Seconds each worker sleeps between turns")
+    dash.add_argument('--seed', type=int, default=None)
+    dash.add_argument('--lineup', default=None, help="Comma-separated AIs (default greedy for every seat)")
+    add_rule_arguments(dash)
+    dash.set_defaults(func=cmd_dashboard)
+
+    args = parser.parse_args(argv)
+    profiler = None
+    if args.profile:
+        profiler = SamplingProfiler(args.profile_interval / 1000.0)
+        profiler.start()
+    try:
+        run_command(args)
+    finally:
+        if profiler:
+            profiler.stop()
+            summary = profiler.write(args.profile)
+            print(f"profile: {profiler.samples} samples in {profiler.seconds:.1f}s -> {args.profile}, {summary}")
+
+def run_command(args):
+    if args.command is None:
+        params_path = AI_PARAMS_FILE if os.path.exists(AI_PARAMS_FILE) else None
+        seat_ai = None
+        if args.model or params_path or args.difficulty:
+            seat_ai = build_seat_ai(RuleConfig().num_players, args.model, None, params_path, args.difficulty)
+        if args.async_loop:
+            runtime = BigTwoGame(seat_ai=seat_ai, mainloop=False).run_async()
+            median, p99, worst = runtime.lag_stats()
+            print(f"input wait between Tk pumps: median {median} ms, p99 {p99} ms, max {worst} ms")
         else:
-            # General usage
-            return random.random() < base_prob
+            BigTwoGame(seat_ai=seat_ai)
+    else:
+        args.func(args)
 
 # Initialize and run the game
 if __name__ == "__main__":
     try:
-        game = BigTwoGame()
+        main()
     except Exception as e:
         print(f"Error starting game: {e}")
         import traceback
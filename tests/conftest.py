@@ -0,0 +1,12 @@
+"""Load Program-Big-Two.py as the module 'bigtwo' (the file name isn't importable)"""
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'bigtwo' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('bigtwo', os.path.join(ROOT, 'Program-Big-Two.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['bigtwo'] = module
+    spec.loader.exec_module(module)
@@ -0,0 +1,18 @@
+import pytest
+
+import bigtwo as bt
+
+pytestmark = pytest.mark.skipif(bt.np is None, reason='BatchEngine needs NumPy')
+
+VARIANTS = {
+    'standard': {},
+    'three_players': {'num_players': 3},
+    'two_by_nine': {'num_players': 2, 'cards_per_hand': 9},
+    'six_hearts_first': {'num_players': 6, 'suit_order': ('♥', '♦', '♣', '♠')},
+    'five_by_seven': {'num_players': 5, 'cards_per_hand': 7, 'suit_order': ('♦', '♠', '♥', '♣')},
+}
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+def test_batch_engine_matches_game_engine(variant):
+    rules = bt.RuleConfig(**VARIANTS[variant])
+    assert bt.compare_batch_engine(rules, 40, seed=11) == 0
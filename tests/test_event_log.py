@@ -0,0 +1,42 @@
+import os
+
+import bigtwo as bt
+
+def write_games(path, games, seed):
+    log = bt.EventLog(path)
+    try:
+        bt.run_simulation(bt.RuleConfig(), games, seed=seed, event_log=log)
+    finally:
+        log.close()
+
+def read_all(path):
+    archive = bt.EventArchive(path)
+    try:
+        return [archive.record(i) for i in range(len(archive))]
+    finally:
+        archive.close()
+
+def test_append_continues_game_ids(tmp_path):
+    path = str(tmp_path / 'events.bin')
+    write_games(path, 3, seed=1)
+    write_games(path, 2, seed=2)
+    records = read_all(path)
+    assert sorted({r.game for r in records}) == list(range(5))
+    assert sum(r.kind == bt.EVT_DEAL for r in records) == 5 * 4
+    assert sum(r.kind == bt.EVT_GAME_OVER for r in records) == 5
+
+def test_torn_last_record_is_dropped_before_append(tmp_path):
+    path = str(tmp_path / 'events.bin')
+    write_games(path, 4, seed=1)
+    whole = read_all(path)
+    os.truncate(path, os.path.getsize(path) - 7)
+    assert len(read_all(path)) == len(whole) - 1
+
+    write_games(path, 5, seed=2)
+    assert os.path.getsize(path) % bt.EVENT_RECORD.size == 0
+    records = read_all(path)
+    assert records[:len(whole) - 1] == whole[:-1]
+    appended = records[len(whole) - 1:]
+    assert {r.game for r in appended} == set(range(4, 9))
+    assert all(r.kind in bt.EVENT_NAMES and r.player < 4 for r in appended)
+    assert sum(r.kind == bt.EVT_DEAL for r in records) == 9 * 4
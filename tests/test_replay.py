@@ -0,0 +1,28 @@
+import pytest
+
+import bigtwo as bt
+
+@pytest.mark.parametrize('lineup', [('greedy',) * 4, ('tuned', 'greedy', 'tuned', 'greedy')])
+def test_recorded_games_replay_without_divergence(lineup):
+    rules = bt.RuleConfig()
+    records = bt.record_games(rules, 8, seed=3, lineup=lineup)
+    engine = None
+    for record in records:
+        assert record.actions and record.winner is not None
+        engine = bt.replay_game(record, check_ai=True, engine=engine)
+
+def test_corpus_round_trip_and_tampered_action_diverges(tmp_path):
+    rules = bt.RuleConfig(num_players=3)
+    records = bt.record_games(rules, 3, seed=5, lineup=('greedy',) * 3)
+    path = str(tmp_path / 'corpus.jsonl.gz')
+    bt.save_corpus(path, records)
+    loaded = list(bt.load_corpus(path))
+    assert [r.to_dict() for r in loaded] == [r.to_dict() for r in records]
+    for record in loaded:
+        bt.replay_game(record)
+
+    record = loaded[0]
+    first_play = next(i for i, a in enumerate(record.actions) if a and not a & bt.SKILL_ACTION)
+    record.actions[first_play] = bt.PASS_ACTION
+    with pytest.raises(bt.ReplayDivergence):
+        bt.replay_game(record)
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+import bigtwo as bt
+
+VARIANTS = {
+    'standard': {},
+    # Dek tidak habis dibagikan (Draw Lucky punya pilihan), skill tiap 2 ronde
+    'six_by_eight': {'num_players': 6, 'cards_per_hand': 8, 'skill_interval': 2,
+                     'suit_order': ('♥', '♦', '♣', '♠'), 'sniper_cards': 2, 'chaos_cards': 2},
+}
+
+class TransitionAI(bt.GreedyAI):
+    """Greedy seat that uses a skill whenever it has one and remembers, per decision,
+    the state, the action and the engine rng before it"""
+    def __init__(self, log):
+        super().__init__()
+        self.log = log
+
+    def note(self, engine, action):
+        self.log.append((bt.GameState.from_engine(engine), action, engine.rng.getstate()))
+
+    def choose_skill(self, engine):
+        skills = engine.players[engine.current].special_skills
+        # Wild play AI langsung memainkan kartu di dalam skill; GameState hanya menyalakan flag
+        usable = [s for s in skills if s.effect_type != 'wild_play']
+        if not usable:
+            return None
+        skill = engine.ai_rng.choice(usable)
+        target = None
+        if skill.effect_type in engine.TARGETED_SKILLS:
+            target = engine.choose_skill_target(skill, engine.current)
+        self.note(engine, bt.skill_action(engine, skill, target))
+        return skill, target
+
+    def choose_play(self, engine):
+        play = super().choose_play(engine)
+        self.note(engine, bt.cards_mask(play) if play else bt.PASS_ACTION)
+        return play
+
+def play_transitions(rules, seed):
+    engine = bt.GameEngine(rules, seed=seed)
+    log = []
+    engine.seat_ai = [TransitionAI(log)] * rules.num_players
+    engine.play_game()
+    return log, bt.GameState.from_engine(engine)
+
+@pytest.mark.parametrize('variant', sorted(VARIANTS))
+@pytest.mark.parametrize('seed', range(10))
+def test_apply_matches_engine(variant, seed):
+    rules = bt.RuleConfig(**VARIANTS[variant])
+    log, final = play_transitions(rules, seed)
+    assert log
+    after = [state for state, _, _ in log[1:]] + [final]
+    for i, ((state, action, rng_state), expected) in enumerate(zip(log, after)):
+        rng = random.Random()
+        rng.setstate(rng_state)
+        actual = state.apply(action, rng)
+        assert bt.state_text(actual) == bt.state_text(expected), f"decision {i}, action {action:x}"
+
+def test_draw_lucky_takes_lowest_card_by_rule_order():
+    rules = bt.RuleConfig(num_players=6, cards_per_hand=8, suit_order=('♥', '♦', '♣', '♠'))
+    engine = bt.GameEngine(rules, seed=0)
+    # Cari deal yang sisa deknya punya dua kartu atau lebih dari rank terendahnya
+    for seed in range(1000):
+        engine.reseed(seed)
+        engine.deal()
+        low = min(c.id >> 2 for c in engine.deck)
+        if sum(1 for c in engine.deck if c.id >> 2 == low) >= 2:
+            break
+    lowest = min(engine.deck, key=engine.compiled.card_key)
+    draw = next(s for s in engine.logic.special_skills if s.effect_type == 'draw_lucky')
+    engine.players[engine.current].add_skill(draw)
+    state = bt.GameState.from_engine(engine)
+    engine.players[engine.current].use_skill(draw)
+    engine.apply_skill_effect(draw, engine.current)
+    assert lowest in engine.players[engine.current].cards
+    expected = state.apply(bt.skill_action(engine, draw, None))
+    assert bt.state_text(bt.GameState.from_engine(engine)) == bt.state_text(expected)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_state_stack_undo_round_trips(seed):
+    engine = bt.GameEngine(seed=seed)
+    engine.deal()
+    rng = random.Random(seed)
+    stack = bt.StateStack(bt.GameState.from_engine(engine))
+    history = [stack.top.key()]
+    while not stack.top.over and len(history) < 200:
+        start = stack.top.key()
+        for action in stack.top.legal_actions():
+            stack.apply(action, rng)
+            assert stack.undo().key() == start
+        stack.apply(rng.choice(stack.top.legal_actions()), rng)
+        history.append(stack.top.key())
+    while len(history) > 1:
+        history.pop()
+        assert stack.undo().key() == history[-1]
+    assert stack.undo().key() == history[0]